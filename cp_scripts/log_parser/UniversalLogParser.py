@@ -1,11 +1,39 @@
 import argparse
+import bisect
+import bz2
+import gzip
+import io
+import lzma
 import re
-from datetime import datetime, timedelta
+import sys
+from datetime import date, datetime, timedelta
 import json
-import tempfile
 import calendar
+import contextlib
+import glob
+import hashlib
+import heapq
+import locale
+import mmap
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import tempfile
+import time
 import webbrowser
-from copy import copy
+import zipfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+try:
+    import numpy
+except ImportError:  # Optional, only makes signal quality classification faster
+    numpy = None
+
+NAN = float('nan')
 
 
 def utc_to_local(utc_dt):
@@ -20,6 +48,132 @@ def format_dt(dt):
     return dt.strftime(LogTranslator.OUTPUT_DATE_FORMAT)
 
 
+# Timestamps are carried around as integer seconds since the epoch.  Log timestamps have no timezone, so neither do
+# these: they are "naive" epoch seconds.  datetime objects and strings are only made when output is written.
+EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+          'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+
+# Logs are time-ordered, so consecutive lines almost always share the date (and minute).  Remember the last ones.
+_parseDayCache = [None, 0]  # ['YYYY-MM-DD ', seconds at midnight]
+_parseMinuteCache = [None, 0]  # ['YYYY-MM-DD HH:MM:', seconds at the start of the minute]
+_formatDayCache = [None, '']  # [day number, 'YYYY-MM-DD ']
+
+
+def dt_to_ts(dt):
+    return (dt - EPOCH) // timedelta(seconds=1)
+
+
+def ts_to_dt(ts):
+    return EPOCH + timedelta(seconds=ts)
+
+
+def parse_ts(stamp):
+    """Convert a '%Y-%m-%d %H:%M:%S' timestamp to epoch seconds by slicing out the fields.  The date part is memoized
+       across calls.  Anything not in exactly that layout goes through strptime (which raises if it's garbage)."""
+    if len(stamp) == 19:
+        try:
+            minute = stamp[:17]
+            if minute != _parseMinuteCache[0]:
+                day = stamp[:11]
+                if day != _parseDayCache[0]:
+                    if stamp[4] != '-' or stamp[7] != '-' or stamp[10] != ' ':
+                        raise ValueError
+                    days = date(int(stamp[:4]), int(stamp[5:7]), int(stamp[8:10])).toordinal() - _EPOCH_ORDINAL
+                    _parseDayCache[0] = day
+                    _parseDayCache[1] = days * 86400
+                hours = int(stamp[11:13])
+                minutes = int(stamp[14:16])
+                if stamp[13] != ':' or stamp[16] != ':' or not (0 <= hours < 24 and 0 <= minutes < 60):
+                    raise ValueError
+                _parseMinuteCache[0] = minute
+                _parseMinuteCache[1] = _parseDayCache[1] + hours * 3600 + minutes * 60
+            seconds = int(stamp[17:19])
+            if 0 <= seconds < 62:
+                return _parseMinuteCache[1] + seconds
+        except ValueError:
+            pass
+    return dt_to_ts(datetime.strptime(stamp, LogTranslator.OUTPUT_DATE_FORMAT))
+
+
+def format_ts(ts):
+    """Epoch seconds to the '%Y-%m-%d %H:%M:%S' layout.  Only the date part goes through strftime, and it is memoized"""
+    days, secs = divmod(ts, 86400)
+    if days != _formatDayCache[0]:
+        _formatDayCache[0] = days
+        _formatDayCache[1] = (EPOCH + timedelta(days=days)).strftime('%Y-%m-%d ')
+    hour, secs = divmod(secs, 3600)
+    minute, second = divmod(secs, 60)
+    return '%s%02d:%02d:%02d' % (_formatDayCache[1], hour, minute, second)
+
+
+def run_format_ts():
+    """format_ts for a run of timestamps in log order.  Consecutive events mostly share their second, so the string is
+       only made again when the timestamp changes.  One per sequence, they don't share the last string."""
+    last = [None, None]
+
+    def render(ts):
+        if ts != last[0]:
+            last[0] = ts
+            last[1] = format_ts(ts)
+        return last[1]
+    return render
+
+
+# Rows the output writers join into one write.  Keeps the data file writes big without holding the whole output
+WRITE_ROWS = 4096
+
+
+def write_rows(fd, rows):
+    """Write an iterable of row strings, WRITE_ROWS at a time"""
+    rows = iter(rows)
+    while True:
+        chunk = ''.join(islice(rows, WRITE_ROWS))
+        if not chunk:
+            break
+        fd.write(chunk)
+
+
+def write_json_lists(fd, items):
+    """Write {key: [value, ], } for (key, values) items as JSON, WRITE_ROWS values at a time.  The text is the same as
+       json.dumps of the whole dict, without the dict ever being built"""
+    fd.write('{')
+    for n, (key, values) in enumerate(items):
+        fd.write('{}{}: ['.format(', ' if n else '', json.dumps(key)))
+        values = iter(values)
+        separator = ''
+        while True:
+            chunk = list(islice(values, WRITE_ROWS))
+            if not chunk:
+                break
+            fd.write(separator + json.dumps(chunk)[1:-1])
+            separator = ', '
+        fd.write(']')
+    fd.write('}')
+
+
+def bufferRegex(regex):
+    """The line regex of a translator for matching a buffer of many lines of ASCII text (BUFFER_REGEX).  It matches
+       every line at its start like regex.match does on the line read by itself, and the match takes the whole line.
+       \\r\\n line ends are read as \\n: . doesn't match \\r, \\n and $ allow one before them.  \\s and \\S don't take
+       \\r and \\n, so a match never runs into the next line.  The escapes are only translated outside of [] sets."""
+    replace = {'.': r'[^\r\n]', '$': r'(?=\r?$)', r'\n': r'\r?\n', r'\s': r'[ \t\f\v\x1c-\x1f]',
+               r'\S': r'[^ \t\n\r\f\v\x1c-\x1f]'}
+    pattern = []
+    inSet = False
+    chars = iter(regex.pattern.lstrip('^'))
+    for char in chars:
+        if char == '\\':
+            char += next(chars)
+        elif char == '[':
+            inSet = True
+        elif char == ']':
+            inSet = False
+        pattern.append(char if inSet else replace.get(char, char))
+    return re.compile(r'(?m)^{}(?:(?<=\n)|[^\n]*\n?)'.format(''.join(pattern)))
+
+
 # Base Class for all translators
 class LogTranslator(object):
     """Base class for custom translator classes.  Translators will read a log file in one format (like
@@ -28,6 +182,8 @@ class LogTranslator(object):
     OUTPUT_FORMAT = '{} {} S= {} {} -- {}\n'
     # Out Format:   DATE IP    lvl      src      msg
     OUTPUT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+    REGEX = None  # Lines of this format match it
+    BUFFER_REGEX = None  # bufferRegex(REGEX) if translateMatch is all translateLine does, see translateRange
 
     def __init__(self):
         super().__init__()
@@ -35,14 +191,20 @@ class LogTranslator(object):
         # Interface flags
         self._abortParse = False  # Stop parsing the file (we're done with log content)
 
+    @classmethod
+    def score(cls, sample):
+        """How much the LogSample looks like a log file of this type, from 0 (not at all) to 1.  By default the
+		   share of sampled lines that match REGEX.  Override it if the format can be told some other way."""
+        if not sample.lines or cls.REGEX is None:
+            return 0
+        match = cls.REGEX.match
+        return sum(1 for line in sample.lines if match(line)) / len(sample.lines)
+
     @classmethod
     def detect(cls, logFile):
-        """Detect the source file type for this translator.  Return True if the source logFile appears
-		   to be a log file of this type, False otherwise.  Note that you should reset the file pointer
-		   if you are going to return False, as another "detector" function will be invoked using the
-		   same file pointer.  If you return True, it is acceptable to leave the pointer wherever you please,
-		   as the next method to be invoked will be the file translate method."""
-        pass
+        """Detect the source file type for this translator.  Return True if the open source logFile appears
+		   to be a log file of this type, False otherwise.  The file pointer is left where it was."""
+        return cls.score(LogSample(logFile.name)) > 0
 
     @property
     def abort(self):
@@ -50,294 +212,215 @@ class LogTranslator(object):
 		   aggregated logs that only need to look at a portion of the log file."""
         return self._abortParse
 
+    # Parallel parsing (--jobs) translates pieces of the file independently.  Translators that carry state from line to
+    # line hand it from one piece to the next with the methods below.  If that isn't possible, set CHUNKABLE = False.
+    CHUNKABLE = True
+
+    def getState(self):
+        """Return the state carried from line to line, for setState on the translator of the next piece of the file.
+           Stateless translators have None."""
+        return None
+
+    def setState(self, state):
+        pass
+
+    @property
+    def stateUsed(self):
+        """True if the lines translated so far may have depended on the state the translator started from"""
+        return False
+
+    @classmethod
+    def chainState(cls, entry, exit):
+        """State after a piece of the file that was translated from the default state and didn't use it (stateUsed was
+           False afterwards), given the state before the piece (entry) and the one it ended with (exit)"""
+        return exit
+
     def writeOutputLine(self, timestamp, ip, logLevel, msgSource, logMessage):
         """Helper method for writing output messages.  Called by translateLine"""
         return self.OUTPUT_FORMAT.format(timestamp, ip, logLevel, msgSource, logMessage)
 
     def translateLine(self, ln):
         """Translate an individual line of a log file into the common log output format.  If the line does
-		   not match, return None to avoid writing anything to the output file.  Should be overridden."""
-        return ln
+		   not match, return None to avoid writing anything to the output file.  Should be overridden, or
+		   translateMatch for translators with a REGEX."""
+        if self.REGEX is None:
+            return ln
+        mtch = self.REGEX.match(ln)
+        if mtch:
+            return self.translateMatch(mtch)
+        # This line doesn't match.  Don't return any text.
+        return None
 
+    def translateMatch(self, mtch):
+        """Translate a line from its REGEX (or BUFFER_REGEX) match into the common log output format, or return None
+		   to skip it"""
+        raise NotImplementedError
 
-# From socket listening
-class SyslogTranslator(LogTranslator):
-    @classmethod
-    def detect(cls, logFile):
-        regex = re.compile(
-            r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s*(\d+.\d+.\d+.\d+)\s*S=\s*(\S*)\s*\W(\S*)\s*--\s*(.*)')
 
-        lineNo = logFile.tell()  # Get the current file position
-        line = logFile.readline()
-        logFile.seek(lineNo)
+# Timestamp kinds of format specs (see FORMAT_SPECS).  A kind turns the text of a line's timestamp field into the common
+# '%Y-%m-%d %H:%M:%S' layout.  Every translator has its own instance, so kinds can carry state from line to line.
+class CommonTimestamp(object):
+    """Timestamps already in the common layout.  Also the base of the other kinds: convert(text, mtch) gets the
+       timestamp field and the match of the whole line.  Kinds with state have the state methods of LogTranslator,
+       which the translator hands on."""
+    CHUNKABLE = True  # False if a line's timestamp depends on lines before the previous piece of the file
+    stateUsed = False
 
-        if regex.match(line):
-            return True
-        else:
-            return False
+    def __init__(self, spec):
+        pass
 
-    def __init__(self):
-        super().__init__()
+    def convert(self, text, mtch):
+        return text
 
-    def translateLine(self, ln):
-        """Translate an individual line of a log file into the common log output format.  If the line does
-		   not match, return None to avoid writing anything to the output file.  Should be overridden."""
-        return ln
+    def getState(self):
+        return None
 
+    def setState(self, state):
+        pass
 
-# From NCM Status->System Logs when logged in locally
-class RouterUIExportTranslator(LogTranslator):
-    """Translator for log files exported from router UI "Export Log" button"""
-    REGEX = re.compile(r'(\S{3} \S{3} \d{2} \d{2}:\d{2}:\d{2} \d{4})\|([A-Z]*)\|([A-Za-z0-9_:\[\].]*)\|(.*)')
+    @classmethod
+    def chainState(cls, entry, exit):
+        return exit
 
-    def __init__(self):
-        super().__init__()
 
-    @classmethod
-    def detect(cls, logFile):
-        lineNo = logFile.tell()  # Get the current file position
-        line = logFile.readline()
-        logFile.seek(lineNo)  # Restore the file pointer
+class CtimeTimestamp(CommonTimestamp):
+    """'Wed Dec 31 18:00:07 1969', fixed layout so the fields are sliced out"""
 
-        if RouterUIExportTranslator.headerPresent(logFile) or RouterUIExportTranslator.REGEX.match(line):
-            return True
-        else:
-            return False
+    def convert(self, text, mtch):
+        month = MONTHS.get(text[4:7])
+        if month:
+            return '{}-{:02d}-{} {}'.format(text[20:24], month, text[8:10], text[11:19])
+        return datetime.strptime(text, '%a %b %d %H:%M:%S %Y').strftime(LogTranslator.OUTPUT_DATE_FORMAT)
 
-    @classmethod
-    def headerPresent(cls, logFile):
-        """
-		   Utility function to determine if the log file begins with the header at the start of the router log exported
-		   by the router UI.  Sample header:
-				Firmware Type: RELEASE
-				Firmware Version: 7.0.10.2728fcc
-				Firmware Build Date: Tue Nov 27 02:00:56 UTC 2018
-				Product Name: IBR900LP6
-		  """
-        regexes = [r'Firmware Type: \S*',
-                   r'Firmware Version: \S*',
-                   r'Firmware Build Date: \S{3} \S{3}\s*\d{1,2} \d{2}:\d{2}:\d{2} \S{3} \d{4}',
-                   r'Product Name: \S*']
-        lineNo = 0
 
-        logFile.seek(0)  # Go back to start of file.
+class SyslogTimestamp(CommonTimestamp):
+    """'Nov 27 00:05:15' (BSD syslog), without the year.  The spec's year is used, 'current' (the default) for this
+       year"""
 
-        while lineNo < 4:
-            line = logFile.readline()
-            reg = re.compile(regexes[lineNo])
-            if not reg.match(line):
-                logFile.seek(0)  # Restore the file pointer.
-                return False
-            lineNo += 1
-        # If we get here and have matched all of the items, this sure appears to be a Router UI
-        return True
+    def __init__(self, spec):
+        super().__init__(spec)
+        year = spec.get('year', 'current')
+        self._year = datetime.today().year if year == 'current' else int(year)
 
-    def translateLine(self, ln):
-        """Translate a Log file from the router UI.  Basically, parse the log, transform lines to our desired format &
-		   return for writing to the file."""
-        mtch = RouterUIExportTranslator.REGEX.match(ln)
-        if mtch:
-            timestamp_str = mtch.group(1)
-            if int(timestamp_str[20:24]) > 1970:
-                level = mtch.group(2)
-                source = mtch.group(3)
-                msg = mtch.group(4)
-                ip = '0.0.0.0'  # The log file doesn't have the IP.  Supply one.
-
-                timestamp = datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S %Y')
-                return self.writeOutputLine(timestamp.strftime(self.OUTPUT_DATE_FORMAT), ip, level, source, msg)
-            else:
-                return None
-        else:
-            # This line doesn't match.  Don't return any text.
-            return None
+    def convert(self, text, mtch):
+        month, day, time = text.split()
+        if month in MONTHS and len(day) <= 2 and len(time) == 8:
+            return '{}-{:02d}-{:02d} {}'.format(self._year, MONTHS[month], int(day), time)
+        return datetime.strptime('{} {}'.format(text, self._year),
+                                 '%b %d %H:%M:%S %Y').strftime(LogTranslator.OUTPUT_DATE_FORMAT)
 
 
-# I'm not sure what to call this, since I don't know where the log it translates originates from.
-# Works on WigleyPumpStation log in Router_Logs
-class OtherTranslater(LogTranslator):
-    REGEX = re.compile(r'(\w{3}\s+\d+ \d+:\d+:\d+) (\d+\.\d+\.\d+\.\d+)\s*.'
-                       r'(\w+:\s*[()a-zA-Z.:0-9_]*\s*\S*\s*\S*)[:=](.*)')
+class IsoTimestamp(CommonTimestamp):
+    """'2019-08-23T20:39:29-05:00', the offset is dropped"""
 
-    def __init__(self):
-        super().__init__()
+    def convert(self, text, mtch):
+        return '{} {}'.format(text[0:10], text[11:19])
 
-    @classmethod
-    def detect(cls, logFile):
-        lineNo = logFile.tell()  # Get the current file position
-        line = logFile.readline()
-        logFile.seek(lineNo)  # Restore the file pointer
 
-        if OtherTranslater.REGEX.match(line):
-            return True
-        else:
-            return False
+class StrptimeTimestamp(CommonTimestamp):
+    """Any other layout, the spec's timestamp is its strptime format.  If that has no year the spec's year is used, as
+       for SyslogTimestamp.  Slower than the kinds above, which slice the fields out"""
 
-    def translateLine(self, ln):
+    def __init__(self, spec):
+        super().__init__(spec)
+        self._format = spec['timestamp']
+        self._year = None
+        if '%Y' not in self._format and '%y' not in self._format:
+            year = spec.get('year', 'current')
+            self._year = datetime.today().year if year == 'current' else int(year)
 
-        mtch = OtherTranslater.REGEX.match(ln)
-        if mtch:
-            timestamp_str = mtch.group(1) + " " + str(datetime.today().year)
-            ip = mtch.group(2)
-            level = "INFO"
-            source = mtch.group(3)
-            if ": " in source:
-                source = source.replace(": ", ":")
-            msg = mtch.group(4)
-            if msg[0] == ' ':
-                msg = msg[1:]
-
-            timestamp = datetime.strptime(timestamp_str, '%b %d %H:%M:%S %Y')
-
-            return self.writeOutputLine(timestamp.strftime(self.OUTPUT_DATE_FORMAT), ip, level, source, msg)
-        else:
-            # This line doesn't match.  Don't return any text.
-            return None
+    def convert(self, text, mtch):
+        dt = datetime.strptime(text, self._format)
+        if self._year is not None:
+            dt = dt.replace(year=self._year)
+        return dt.strftime(LogTranslator.OUTPUT_DATE_FORMAT)
 
 
-class NCMSupportLogTranslator(LogTranslator):
-    """Translator for log files exported from NCM "Export" method"""
+class Fix1969Timestamp(CommonTimestamp):
+    """Common layout timestamps, except that routers that lost their clock log 1969 dates.  Those are moved to follow
+       the last correct date, keeping their distance from the first 1969 date"""
 
-    def __init__(self):
-        super().__init__()
-        # State variables
+    def __init__(self, spec):
+        super().__init__(spec)
         self._lastDate = None
         self._offsetDate = None
         self._lastCorrectDate = None
+        self._saw1969 = False
 
-    @classmethod
-    def detect(cls, logFile):
-        lineNo = logFile.tell()
-        logFile.seek(0)
-        for i in range(2):
-            logFile.readline()
-        line = logFile.readline()
-        # Restore the line number
-        logFile.seek(lineNo)
-        return line == "ECM Info\n"
+    def getState(self):
+        return self._lastDate, self._offsetDate, self._lastCorrectDate
 
-    def translateLine(self, ln):
-        ncm_rgx = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|\s*(\S*)\|\s*(\S*)\|(.*)$'
-        #   (           Date                    ) | (Level) | (Source)|(Message)
+    def setState(self, state):
+        self._lastDate, self._offsetDate, self._lastCorrectDate = state
 
-        matchobj = re.match(ncm_rgx, ln)
-        if matchobj:
-            curdatetime = datetime.strptime(matchobj.group(1), self.OUTPUT_DATE_FORMAT)
+    @property
+    def stateUsed(self):
+        return self._saw1969
 
-            # This stuff gets kinda janky, but it's a functioning first pass for dealing with the 1969 issue
-            if not self._offsetDate and curdatetime.year == 1969:  # Save last correct date
+    @classmethod
+    def chainState(cls, entry, exit):
+        # No 1969 lines in the piece, so only the last date can have moved
+        return exit[0] or entry[0], entry[1], entry[2]
+
+    def convert(self, text, mtch):
+        # This stuff gets kinda janky, but it's a functioning first pass for dealing with the 1969 issue
+        if text.startswith('1969'):
+            self._saw1969 = True
+            curdatetime = parse_ts(text)
+            if self._offsetDate is None and self._lastDate is not None:  # Save last correct date
                 self._offsetDate = curdatetime
-                self._lastCorrectDate = self._lastDate
-            if curdatetime.year == 1969:
-                finaldatetime = self._lastCorrectDate - (self._offsetDate - curdatetime)
-                strDateTime = finaldatetime.strftime(self.OUTPUT_DATE_FORMAT)
-            else:
-                self._lastDate = curdatetime
-                strDateTime = matchobj.group(1)
-
-            return self.writeOutputLine(strDateTime, '0.0.0.0', matchobj.group(2), matchobj.group(3),
-                                        matchobj.group(4))
-
-        # if ln == 'Status\n':
-        # self._abortParse = True
-
-        return None
-
-
-class USBLogTranslator(LogTranslator):
-    """Translator for logs collected via USB.
-        They have an annoying 'record separator' character (0x1E) at the end of each line
-        Also not sure what the timestamp on each line represents. Uptime?"""
-    REGEX = re.compile(r'(\d+)\s*([a-z.]+)\s*([A-Za-z0-9_:\[\].]+)\s*(.+)\x1E\n')
+                self._lastCorrectDate = parse_ts(self._lastDate)
+            if self._offsetDate is not None:  # Otherwise there's no correct date yet, leave it alone
+                return format_ts(self._lastCorrectDate - (self._offsetDate - curdatetime))
+        else:
+            self._lastDate = text  # Only converted if it turns out to be needed
+        return text
 
-    #       (date?) (source)  (level) (message)
 
-    def __init__(self):
-        super().__init__()
+class UptimeTimestamp(CommonTimestamp):
+    """Seconds since boot.  The first line is the spec's start (default 1969-12-31 18:00:00), the others follow it"""
+    CHUNKABLE = False  # Every timestamp is relative to the first line
 
-        self.baseDate = datetime.strptime('1969-12-31 18:00:00', self.OUTPUT_DATE_FORMAT)
+    def __init__(self, spec):
+        super().__init__(spec)
+        self.baseDate = parse_ts(spec.get('start', '1969-12-31 18:00:00'))
         self.logStartTime = None
 
-    @classmethod
-    def detect(cls, logFile):
-        lineNo = logFile.tell()  # Get the current file position
-        line = logFile.readline()
-        logFile.seek(lineNo)  # Restore the file pointer
-
-        if USBLogTranslator.REGEX.match(line):
-            return True
-        else:
-            return False
-
-    def transformTimestamp(self, time):
+    def convert(self, text, mtch):
         if self.logStartTime is None:
-            self.logStartTime = int(time)
+            self.logStartTime = int(text)
+            return format_ts(self.baseDate)
+        return format_ts(self.baseDate + int(text) - self.logStartTime)
 
-            retTime = self.baseDate
-        else:
-            diff = int(time) - self.logStartTime
 
-            retTime = self.baseDate + timedelta(seconds=diff)
+class Clock12Timestamp(CommonTimestamp):
+    """12 hour times ('01:30:12 PM') in logs that only have the date where the clock is set.  A line matching the
+       spec's clock regex (groups: local time, UTC time, UTC date as %m/%d/%y, timezone) sets the date, converted to
+       local time, and the date moves to the next day when the hour goes back.  Will not log any data before the time
+       is set, so lines before the first clock line (a partial log) get 04/25/19."""
+    CHUNKABLE = False  # The date only appears when the clock is set, and days roll over by watching the hour
 
-        return retTime.strftime(self.OUTPUT_DATE_FORMAT)
-
-    def translateLine(self, ln):
-        mtch = USBLogTranslator.REGEX.match(ln)
-        if mtch:
-            timestamp_str = self.transformTimestamp(mtch.group(1))
-            level = mtch.group(2)
-            source = mtch.group(3)
-            msg = mtch.group(4)
-            ip = '0.0.0.0'  # The log file doesn't have the IP.  Supply one.
-
-            if source.endswith(':'):
-                source = source[:-1]
-
-            return self.writeOutputLine(timestamp_str, ip, level, source, msg)
-        else:
-            # This line doesn't match.  Don't return any text.
-            return None
-
-
-# From NCM System->Administration->System Logging OR System->Diagnostics->Collect Support Log (They are the same)
-# Also translates internal router serial port logs
-# Will not log any data before the time is set.
-class LocalUISystemLogTranslator(LogTranslator):
-    REGEX = re.compile(r'^(\d{2}:\d{2}:\d{2}\s*\w{2})\s*([A-Z]+)\s*([A-Za-z0-9_:\[\].]+)\s*(.+)\n')
-    #                               (Time)               (Level)         (Source)         (Message)
-    time_regex = re.compile(r'(\d+:\d+:\d+\s+\w+).*to:\s(\d+:\d+:\d+)\s*(\d+/\d+/\d+)\s*(\w+)')
-
-    #                           (local time)         (Time)           (Date)      (Timezone)
-
-    def __init__(self):
-        super().__init__()
-        # State variables
+    def __init__(self, spec):
+        super().__init__(spec)
+        self._clock = re.compile(spec['clock'])
         self._basedate = None
+        self._basedatestr = None  # Date part of the output timestamp, changes along with _basedate
         self._next_day_flag = 0
 
-    @classmethod
-    def detect(cls, logFile):
-        lineNo = logFile.tell()
-        flag = False
-        logFile.seek(0)
-        while True:
-            line = logFile.readline()
-            if LocalUISystemLogTranslator.REGEX.match(line):
-                flag = True
-                # print(line)
-                break
-            if line == '':
-                break
-        logFile.seek(lineNo)
-        if flag:
-            return True
-        else:
-            return False
-
     # Log entry times are in local time, but the system time is UTC. Gotta convert
-    def setbasetime(self, time):
-        timestamp = datetime.strptime(time.group(3) + ' ' + time.group(2) + ' ' + time.group(4), "%m/%d/%y %H:%M:%S %Z")
+    def setbasetime(self, utcDate, utcTime, zone):
+        timestamp = datetime.strptime(utcDate + ' ' + utcTime + ' ' + zone, "%m/%d/%y %H:%M:%S %Z")
         self._basedate = utc_to_local(timestamp)
+        self._basedatestr = self._basedate.strftime('%Y-%m-%d')
+
+    def convert(self, text, mtch):
+        clock = self._clock.match(mtch.group(0))
+        if clock:
+            self.setbasetime(clock.group(3), clock.group(2), clock.group(4))
+        elif not self._basedate:
+            # The case where a base time isn't available (usually partial log) so an arbitrary one is set
+            self.setbasetime('04/25/19', text[0:8], 'UTC')
+        return self.transformtimestamp(text)
 
     # Transform time portion of the line and account for date (since this info is only present once in the entire log)
     def transformtimestamp(self, time):
@@ -349,107 +432,507 @@ class LocalUISystemLogTranslator(LogTranslator):
         # Detect if it is the next day
         if int(time[0:2]) < self._basedate.hour and self._next_day_flag == 0:
             self._basedate = self._basedate + timedelta(days=1)
+            self._basedatestr = self._basedate.strftime('%Y-%m-%d')
             self._next_day_flag = 1
         elif int(time[0:2]) > int(self._basedate.hour):
             self._next_day_flag = 0
 
-        # combine base date, which is updated as days change, and current line time
-        timestamp = datetime.combine(self._basedate.date(),
-                                     datetime.strptime(time, "%H:%M:%S %p").time(), self._basedate.tzinfo)
-        return timestamp.strftime(self.OUTPUT_DATE_FORMAT)
-
-    def translateLine(self, ln):
-        mtch = LocalUISystemLogTranslator.REGEX.match(ln)
-        if mtch:
-            time_mtch = LocalUISystemLogTranslator.time_regex.match(ln)
-            if time_mtch:
-                self.setbasetime(time_mtch)
-            if self._basedate:
-                timestamp_str = self.transformtimestamp(mtch.group(1))
-            else:
-                # The case where a base time isn't available (usually partial log) so an arbitrary one is set
-                if LocalUISystemLogTranslator.REGEX.match(ln):
-                    if not self._basedate:
-                        time_mtch = LocalUISystemLogTranslator.time_regex.match(
-                            "{} INFO clock System time set to: {} 04/25/19 UTC".format(ln[0:11], ln[0:8]))
-                        self.setbasetime(time_mtch)
-                    if self._basedate:
-                        timestamp_str = self.transformtimestamp(mtch.group(1))
-                else:
-                    return None
-            level = mtch.group(2)
-            source = mtch.group(3)
-            msg = mtch.group(4)
-            ip = '0.0.0.0'  # The log file doesn't have the IP.  Supply one.
+        # combine base date, which is updated as days change, and current line time (now 24 hour HH:MM:SS)
+        return '{} {}'.format(self._basedatestr, time[:8])
+
+
+TIMESTAMPS = {
+    'common': CommonTimestamp,  # 2019-04-24 12:51:37
+    'ctime': CtimeTimestamp,  # Wed Dec 31 18:00:07 1969
+    'syslog': SyslogTimestamp,  # Nov 27 00:05:15
+    'iso': IsoTimestamp,  # 2019-08-23T20:39:29-05:00
+    'fix1969': Fix1969Timestamp,  # 2019-04-24 12:51:37, and 1969 dates after a clock loss
+    'uptime': UptimeTimestamp,  # 28474
+    'clock12': Clock12Timestamp,  # 01:30:12 PM
+}
+
+
+def fieldTransform(field, name, *args):
+    """The source code of a transform of a format spec, changing the variable field"""
+    if name == 'strip_prefix':
+        prefix, = args
+        return 'if {0}.startswith({1!r}):\n    {0} = {0}[{2}:]'.format(field, prefix, len(prefix))
+    if name == 'strip_suffix':
+        suffix, = args
+        return 'if {0}.endswith({1!r}):\n    {0} = {0}[:-{2}]'.format(field, suffix, len(suffix))
+    if name == 'unquote':
+        return 'if {0}.startswith(\'"\'):\n    {0} = {0}[1:-1]'.format(field)
+    if name == 'replace':
+        old, new = args
+        return 'if {1!r} in {0}:\n    {0} = {0}.replace({1!r}, {2!r})'.format(field, old, new)
+    raise Exception('Unknown transform {}, use strip_prefix, strip_suffix, unquote or replace'.format(name))
+
+
+class SpecTranslator(LogTranslator):
+    """Base of the translators compileSpec makes out of format specs.  Detection can also go by a header, and the
+       state carried from line to line is the timestamp kind's."""
+    SPEC = None  # The format spec
+    FORMAT = None  # The --format name
+    HEADER = []  # Regexes the first lines of the file match, None for any line
+    HEADER_ONLY = False  # Without the header the file isn't of this format, otherwise the REGEX share of lines counts
+    TIMESTAMP = CommonTimestamp
 
-            if source.endswith(':'):
-                source = source[:-1]
+    def __init__(self):
+        super().__init__()
+        self._timestamp = self.TIMESTAMP(self.SPEC)
+        self._convert = self._timestamp.convert
 
-            return self.writeOutputLine(timestamp_str, ip, level, source, msg)
-        else:
-            return None
+    @classmethod
+    def score(cls, sample):
+        if cls.headerPresent(sample):
+            return 1
+        if cls.HEADER_ONLY:
+            return 0
+        return super().score(sample)
 
+    @classmethod
+    def headerPresent(cls, sample):
+        """True if the LogSample begins with the HEADER lines"""
+        if not cls.HEADER or len(sample.head) < len(cls.HEADER):
+            return False
+        return all(reg is None or reg.match(line) for reg, line in zip(cls.HEADER, sample.head))
 
-class CSVLogTranslator(LogTranslator):
-    """Translator for logs with a comma separated value format"""
-    REGEX = re.compile(r'^(\d{4}-\d{2}-\w{5}:\d{2}:\d{2}[\+-][0-9:]+)[, ]([A-Z]+)[, ]([A-Za-z0-9_:\[\].]+)[, ](.+)\n')
+    def getState(self):
+        return self._timestamp.getState()
 
-    def __init__(self):
-        super().__init__()
+    def setState(self, state):
+        self._timestamp.setState(state)
 
-        self.baseDate = None
-        self.logStartTime = None
+    @property
+    def stateUsed(self):
+        return self._timestamp.stateUsed
 
     @classmethod
-    def detect(cls, logFile):
-        lineNo = logFile.tell()
-        flag = False
-        logFile.seek(0)
+    def chainState(cls, entry, exit):
+        return cls.TIMESTAMP.chainState(entry, exit)
+
+
+def compileSpec(name, spec):
+    """Make the translator class of a format spec, a dict (as loaded from JSON) with:
+            class:       class name (default {Name}Translator)
+            doc:         class docstring
+            regex:       line regex (match at the start of the line)
+            passthrough: true if the lines already are in the common format, they're kept as they are.  Nothing below
+                         but header is used then
+            fields:      group number (or a fixed text) of timestamp, ip (default '0.0.0.0'), level (default 'INFO'),
+                         source and message
+            timestamp:   the timestamp kind, a TIMESTAMPS name, or a strptime format
+            year:        year of timestamps without one, 'current' (default) for this year
+            start:       (uptime) the time of the first line
+            clock:       (clock12) regex of the line that sets the clock
+            utc:         true if the timestamps are UTC, they're converted to local time
+            transforms:  {field: [[transform, args...], ]}, see fieldTransform
+            drop:        {'before': timestamp, field: regex}, lines timestamped before (a prefix of the common
+                         layout is enough, e.g. 1971) or with a field the regex searches to are skipped
+            header:      regexes the first lines of a file of this format match (null for any line)
+            header_only: true if files without the header are never of this format
+            buffer:      false if the lines can't be matched in buffers of many lines (see bufferRegex)
+            chunkable:   false if pieces of the file can't be translated independently
+       The translateMatch of the class is generated from the spec and compiled once, with the groups, transforms,
+       drop rules and output layout written out like a hand-coded translator would have them (SOURCE is its code)."""
+    if 'regex' not in spec:
+        raise Exception('Format {} has no regex'.format(name))
+    className = spec.get('class', name.title() + 'Translator')
+    attrs = {'SPEC': spec, 'FORMAT': name, 'REGEX': re.compile(spec['regex']),
+             'HEADER': [None if header is None else re.compile(header) for header in spec.get('header', [])],
+             'HEADER_ONLY': spec.get('header_only', False),
+             '__doc__': spec.get('doc', 'Translator for {} logs, made from its format spec'.format(name))}
+    if spec.get('passthrough'):
+        attrs['translateLine'] = lambda self, ln: ln
+        return type(className, (SpecTranslator,), attrs)
+
+    timestamp = spec.get('timestamp', 'common')
+    attrs['TIMESTAMP'] = TIMESTAMPS.get(timestamp, StrptimeTimestamp if '%' in timestamp else None)
+    if attrs['TIMESTAMP'] is None:
+        raise Exception('Format {}: unknown timestamp {}, use one of {} or a strptime format'.format(
+            name, timestamp, ', '.join(TIMESTAMPS)))
+    attrs['CHUNKABLE'] = attrs['TIMESTAMP'].CHUNKABLE and spec.get('chunkable', True)
+    if spec.get('buffer', True):
+        attrs['BUFFER_REGEX'] = bufferRegex(attrs['REGEX'])
+
+    fields = dict({'ip': '0.0.0.0', 'level': 'INFO'}, **spec.get('fields', {}))
+    for field in ['timestamp', 'source', 'message']:
+        if field not in fields:
+            raise Exception('Format {}: fields has no {}'.format(name, field))
+    groupFields = [field for field in ['timestamp', 'ip', 'level', 'source', 'message']
+                   if isinstance(fields[field], int)]
+    if 'timestamp' not in groupFields:
+        raise Exception('Format {}: the timestamp field has to be a group number'.format(name))
+    # Fixed fields are written into the output line
+    output = LogTranslator.OUTPUT_FORMAT.format(*[
+        '{{{}}}'.format(field) if field in groupFields else fields[field].replace('{', '{{').replace('}', '}}')
+        for field in ['timestamp', 'ip', 'level', 'source', 'message']])
+    namespace = {'toLocal': lambda stamp: format_dt(utc_to_local(
+        datetime.strptime(stamp, LogTranslator.OUTPUT_DATE_FORMAT)))}
+    groups = ', '.join(str(fields[field]) for field in groupFields)
+    # With only the timestamp group, group() isn't a tuple.  Unpack (group(n),) then
+    unpack = '{} = mtch.group({})' if len(groupFields) > 1 else '{}, = mtch.group({}),'
+    code = [unpack.format(', '.join(groupFields), groups), 'timestamp = self._convert(timestamp, mtch)']
+    drop = dict(spec.get('drop', {}))
+    if drop.get('before'):
+        code.append('if timestamp < {!r}:\n    return None'.format(drop.pop('before')))
+    for field, fieldTransforms in spec.get('transforms', {}).items():
+        if field not in groupFields:
+            raise Exception('Format {}: {} is not a group field, it can\'t be transformed'.format(name, field))
+        code.extend(fieldTransform(field, *transform) for transform in fieldTransforms)
+    for field, regex in drop.items():
+        if field not in groupFields:
+            raise Exception('Format {}: {} is not a group field, no line can be dropped by it'.format(name, field))
+        namespace['drop_' + field] = re.compile(regex).search
+        code.append('if drop_{}({}):\n    return None'.format(field, field))
+    if spec.get('utc'):
+        code.append('timestamp = toLocal(timestamp)')
+    code.append('return f{!r}'.format(output))
+    source = 'def translateMatch(self, mtch):\n' + ''.join(
+        '    ' + line.replace('\n', '\n    ') + '\n' for line in code)
+    exec(compile(source, '<{} format spec>'.format(name), 'exec'), namespace)
+    attrs['translateMatch'] = namespace['translateMatch']
+    attrs['SOURCE'] = source
+    return type(className, (SpecTranslator,), attrs)
+
+
+# The formats this script knows, by --format name.  When two formats score the same in detection, the first one listed
+# wins.  More formats can be loaded from a JSON file of specs like these (--format-file), see loadFormats.
+FORMAT_SPECS = {
+    # Syslog listener as produced by WANTester
+    'syslog': {
+        'class': 'SyslogTranslator',
+        'regex': r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s*(\d+.\d+.\d+.\d+)\s*S=\s*(\S*)\s*\W(\S*)\s*--\s*(.*)',
+        'passthrough': True},
+    # From NCM Status->System Logs when logged in locally, the router UI "Export Log" button
+    'routerui': {
+        'class': 'RouterUIExportTranslator',
+        'doc': 'Translator for log files exported from router UI "Export Log" button',
+        'regex': r'(\S{3} \S{3} \d{2} \d{2}:\d{2}:\d{2} \d{4})\|([A-Z]*)\|([A-Za-z0-9_:\[\].]*)\|(.*)',
+        'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4},
+        'timestamp': 'ctime',
+        'drop': {'before': '1971'},
+        'header': [r'Firmware Type: \S*',
+                   r'Firmware Version: \S*',
+                   r'Firmware Build Date: \S{3} \S{3}\s*\d{1,2} \d{2}:\d{2}:\d{2} \S{3} \d{4}',
+                   r'Product Name: \S*']},
+    # NCM Support log, the NCM "Export" method
+    'ncm': {
+        'class': 'NCMSupportLogTranslator',
+        'doc': 'Translator for log files exported from NCM "Export" method',
+        'regex': r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|\s*(\S*)\|\s*(\S*)\|(.*)$',
+        'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4},
+        'timestamp': 'fix1969',
+        'header': [None, None, r'ECM Info$'],  # The export has a fixed header, the third line is always this
+        'header_only': True},
+    # Logs collected via USB.  They have a 'record separator' character (0x1E) at the end of each line
+    'usb': {
+        'class': 'USBLogTranslator',
+        'doc': 'Translator for logs collected via USB',
+        'regex': r'(\d+)\s*([a-z.]+)\s*([A-Za-z0-9_:\[\].]+)\s*(.+)\x1E\n',
+        'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4},
+        'timestamp': 'uptime',
+        'transforms': {'source': [['strip_suffix', ':']]}},
+    # From NCM System->Administration->System Logging OR System->Diagnostics->Collect Support Log (They are the same).
+    # Also internal router serial port logs
+    'localui': {
+        'class': 'LocalUISystemLogTranslator',
+        'doc': 'Translator for local UI system logs and internal serial port logs',
+        'regex': r'^(\d{2}:\d{2}:\d{2}\s*\w{2})\s*([A-Z]+)\s*([A-Za-z0-9_:\[\].]+)\s*(.+)\n',
+        'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4},
+        'timestamp': 'clock12',
+        'clock': r'(\d+:\d+:\d+\s+\w+).*to:\s(\d+:\d+:\d+)\s*(\d+/\d+/\d+)\s*(\w+)',
+        'transforms': {'source': [['strip_suffix', ':']]}},
+    'csv': {
+        'class': 'CSVLogTranslator',
+        'doc': 'Translator for logs with a comma separated value format',
+        'regex': r'^(\d{4}-\d{2}-\w{5}:\d{2}:\d{2}[\+-][0-9:]+)[, ]([A-Z]+)[, ]([A-Za-z0-9_:\[\].]+)[, ](.+)\n',
+        'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4},
+        'timestamp': 'iso',
+        'drop': {'before': '1971'},
+        'transforms': {'source': [['strip_suffix', ':']], 'message': [['unquote']]}},
+    # Not sure the flavor of this log file, but it exists.  Works on WigleyPumpStation log in Router_Logs
+    'other': {
+        'class': 'OtherTranslater',
+        'regex': r'(\w{3}\s+\d+ \d+:\d+:\d+) (\d+\.\d+\.\d+\.\d+)\s*.(\w+:\s*[()a-zA-Z.:0-9_]*\s*\S*\s*\S*)[:=](.*)',
+        'fields': {'timestamp': 1, 'ip': 2, 'source': 3, 'message': 4},
+        'timestamp': 'syslog',
+        'transforms': {'source': [['replace', ': ', ':']], 'message': [['strip_prefix', ' ']]}},
+}
+
+# Every translator, by --format name
+TRANSLATORS = {}
+# (name, spec) of the formats loaded from --format-file.  Worker processes are told the --format name of a translator,
+# not given its class, and register these first (registerFormats): a spawned worker only has the built in formats
+LOADED_FORMATS = []
+
+
+def registerFormat(name, spec):
+    """Compile a format spec and add it to TRANSLATORS (last in detection order, unless it replaces a format)"""
+    translator = compileSpec(name, spec)
+    TRANSLATORS[name] = translator
+    return translator
+
+
+def loadFormats(fileName):
+    """Register the formats of a JSON file of {--format name: spec} (see compileSpec).  Returns their names"""
+    with open(fileName) as fd:
+        specs = json.load(fd)
+    if not isinstance(specs, dict):
+        raise Exception('{} should have a JSON object of format specs by name'.format(fileName))
+    for name, spec in specs.items():
+        registerFormat(name, spec)
+        LOADED_FORMATS.append((name, spec))
+    return list(specs)
+
+
+def registerFormats(specs):
+    """Register the (name, spec) formats not already in TRANSLATORS as they are.  Initializer of the worker
+       processes, with LOADED_FORMATS of the main one"""
+    for name, spec in specs:
+        if name not in TRANSLATORS or TRANSLATORS[name].SPEC != spec:
+            registerFormat(name, spec)
+
+
+for _name, _spec in FORMAT_SPECS.items():
+    registerFormat(_name, _spec)
+
+
+# Compressed logs are read through these, by the magic number at the start of the file
+DECOMPRESSORS = [(b'\x1f\x8b', gzip.open),
+                 (b'BZh', bz2.open),
+                 (b'\xfd7zXZ\x00', lzma.open)]
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz')
+
+
+def splitArchivePath(fileName):
+    """(file, member) for a log file name.  A name like bundle.zip/logs/sys_log.log, with a path that doesn't exist
+       below a zip file, is the member logs/sys_log.log of bundle.zip.  The member is None for other names"""
+    if os.path.exists(fileName):
+        return fileName, None
+    archive = fileName
+    while True:
+        parent = os.path.dirname(archive)
+        if not parent or parent == archive:
+            return fileName, None
+        archive = parent
+        if os.path.isfile(archive):
+            if zipfile.is_zipfile(archive):
+                return archive, fileName[len(archive) + 1:].replace(os.sep, '/')
+            return fileName, None
+
+
+class DecompressedReader(io.BufferedReader):
+    """Reader of the decompressed data of a compressed file object, closes that too when closed"""
+
+    def __init__(self, decompressor, compressedFD):
+        super().__init__(decompressor(compressedFD))
+        self._compressedFD = compressedFD
 
-        while True:
-            line = logFile.readline()
-            if CSVLogTranslator.REGEX.match(line):
-                flag = True
+    def close(self):
+        super().close()
+        self._compressedFD.close()
+
+
+def archiveMembers(archive):
+    """Names of the files in a zip archive"""
+    with zipfile.ZipFile(archive) as zf:
+        return [info.filename for info in zf.infolist() if not info.is_dir()]
+
+
+def openSource(fileName):
+    """Open a log file for binary reading, decompressing it on the fly if it is gzip, bzip2 or xz compressed.  A zip
+       member (see splitArchivePath) is read straight out of the archive.  A zip file itself can be given when the
+       log is the only file in it.  Nothing is extracted to disk."""
+    path, member = splitArchivePath(fileName)
+    if member is None and zipfile.is_zipfile(path):
+        members = archiveMembers(path)
+        if len(members) != 1:
+            raise Exception("{} has {} files, give the one to parse as {}/(file): {}".format(
+                path, len(members), path, ', '.join(members[:10])))
+        member = members[0]
+    if member is None:
+        fd = open(path, 'rb')
+    else:
+        with zipfile.ZipFile(path) as zf:
+            fd = zf.open(member)  # Keeps the archive file open until fd is closed
+    magic = fd.peek(6)[:6]
+    for prefix, decompressor in DECOMPRESSORS:
+        if magic.startswith(prefix):
+            return DecompressedReader(decompressor, fd)
+    return fd
+
+
+def isPlainFile(fileName):
+    """True if the log is an ordinary uncompressed file, the only kind that can be read by byte range (--jobs,
+       --follow)"""
+    if not os.path.isfile(fileName) or zipfile.is_zipfile(fileName):
+        return False
+    with open(fileName, 'rb') as fd:
+        magic = fd.read(6)
+    return not any(magic.startswith(prefix) for prefix, decompressor in DECOMPRESSORS)
+
+
+def shortName(fileName):
+    """Name of the output files for a log: its file name, without a compression suffix"""
+    name = fileName.split("/")[-1]
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class LogSample(object):
+    """A bounded sample of a log file for format detection: the lines in the first headSize bytes (head), and those
+       plus the lines of probes pieces of probeSize bytes spread over the rest of the file (lines).  Only complete
+       lines are kept, with newlines translated like reading the file in text mode does.  Compressed logs can't be
+       read at an offset without decompressing everything before it, for those lines is simply the first streamSize
+       bytes."""
+
+    def __init__(self, fileName, headSize=65536, probes=4, probeSize=16384, streamSize=1024 * 1024):
+        encoding = locale.getpreferredencoding(False)
+        if not isPlainFile(fileName):
+            with openSource(fileName) as fd:
+                data = fd.read(streamSize + 1)
+            self.head = self._lines(data[:headSize], encoding, len(data) > headSize)
+            self.lines = self._lines(data[:streamSize], encoding, len(data) > streamSize)
+            return
+        size = os.path.getsize(fileName)
+        with open(fileName, 'rb') as fd:
+            self.head = self._lines(fd.read(headSize), encoding, size > headSize)
+            self.lines = list(self.head)
+            if size > headSize + probes * probeSize:
+                for i in range(1, probes + 1):
+                    fd.seek(headSize + (size - headSize - probeSize) * i // probes)
+                    # The first line is most likely cut off
+                    self.lines.extend(self._lines(fd.read(probeSize), encoding, True)[1:])
+
+    @staticmethod
+    def _lines(data, encoding, cut):
+        """Lines of data, without the last one if it may be cut off (the file goes on)"""
+        # Not splitlines(), it also splits on characters like the USB log's record separator
+        lines = data.decode(encoding, 'replace').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        last = lines.pop()
+        lines = [line + '\n' for line in lines]
+        if last and not cut:
+            lines.append(last)
+        return lines
+
+
+def translateLines(lines, translator):
+    """The common format lines of source lines, translated by translator.  Stops when the translator aborts"""
+    translateLine = translator.translateLine
+    for ln in lines:
+        translated_line = translateLine(ln)
+        if translated_line is not None:
+            yield translated_line
+        if translator.abort:
+            break
+
+
+def readLines(fileName, start, end):
+    """Read the lines of a byte range of a text file, the same way iterating over open(fileName, 'r') would"""
+    encoding = locale.getpreferredencoding(False)
+    pos = start
+    with open(fileName, 'rb') as fd:
+        fd.seek(start)
+        for raw in fd:
+            if pos >= end:
                 break
-            if line == '':
+            pos += len(raw)
+            line = raw.decode(encoding)
+            if '\r' in line:  # Universal newlines
+                line = line.replace('\r\n', '\n').replace('\r', '\n')
+                if line.count('\n') > 1:
+                    for part in line[:-1].split('\n'):
+                        yield part + '\n'
+                    continue
+            yield line
+
+
+# translateRange cuts files in pieces of about this many bytes
+PIECE_SIZE = 1024 * 1024
+_loneReturn = re.compile(rb'\r(?!\n)').search  # A \r line end, not part of \r\n
+
+
+def translateRange(fileName, translator, start, end):
+    """Translate the lines of a byte range of a plain log file, yielding the common format lines.  Stops when the
+       translator aborts.
+
+       Translators with a BUFFER_REGEX don't read the range line by line.  The file is memory-mapped and cut in
+       pieces of about PIECE_SIZE bytes at line ends.  If a piece is ASCII with \\n or \\r\\n line ends, as exports
+       usually are, it is decoded at once and BUFFER_REGEX run over it with finditer.  Lines that don't match cost no
+       Python code at all (NCM exports are mostly other sections), the matches of those that do go to translateMatch.
+       Other pieces, and pieces of files where most lines match (finditer is slower then), are matched line by
+       line."""
+    if translator.BUFFER_REGEX is None or end <= start:
+        translateLine = translator.translateLine
+        for ln in readLines(fileName, start, end):
+            translated_line = translateLine(ln)
+            if translated_line is not None:
+                yield translated_line
+            if translator.abort:
                 break
-        logFile.seek(lineNo)
-        if flag:
-            return True
-        else:
-            return False
+        return
 
-    def translateLine(self, ln):
-        mtch = CSVLogTranslator.REGEX.match(ln)
-        if mtch:
-            timestamp_str = "{} {}".format(mtch.group(1)[0:10], mtch.group(1)[11:19])
-            if int(timestamp_str[0:4]) > 1970:
-                level = mtch.group(2)
-                source = mtch.group(3)
-                msg = mtch.group(4)
-                if msg[0] == '"':
-                    msg = msg[1:-1]
-                ip = '0.0.0.0'  # The log file doesn't have the IP.  Supply one.
-                if source.endswith(':'):
-                    source = source[:-1]
-                return self.writeOutputLine(timestamp_str, ip, level, source, msg)
+    encoding = locale.getpreferredencoding(False)
+    finditer = translator.BUFFER_REGEX.finditer
+    match = translator.REGEX.match  # translateLine, without a call per line
+    translateMatch = translator.translateMatch
+    with open(fileName, 'rb') as fd, mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        pos = start
+        pieces = 0
+        dense = False  # Most lines match.  Then matching line by line is faster, finditer is only tried now and then
+        while pos < end:
+            if end - pos <= PIECE_SIZE:
+                pieceEnd = end
             else:
-                return None
-        else:
-            return None
+                pieceEnd = buf.rfind(b'\n', pos, pos + PIECE_SIZE) + 1 or \
+                    buf.find(b'\n', pos + PIECE_SIZE, end) + 1 or end
+            piece = buf[pos:pieceEnd]
+            pos = pieceEnd
+            pieces += 1
+            if not piece.isascii() or (b'\r' in piece and _loneReturn(piece)) or (dense and pieces % 16):
+                lines = io.TextIOWrapper(io.BytesIO(piece), encoding)  # The lines reading the file as text gives
+            else:
+                matches = 0
+                for mtch in finditer(piece.decode('ascii')):
+                    matches += 1
+                    translated_line = translateMatch(mtch)
+                    if translated_line is not None:
+                        yield translated_line
+                    if translator.abort:
+                        return
+                dense = matches * 2 > piece.count(b'\n')
+                continue
+
+            for ln in lines:
+                mtch = match(ln)
+                if mtch:
+                    translated_line = translateMatch(mtch)
+                    if translated_line is not None:
+                        yield translated_line
+                    if translator.abort:
+                        return
 
 
 class LogFile(object):
-    def __init__(self, lfName):
+    def __init__(self, lfName, fileFormat=None):
         self.logFileName = lfName
-        self._fileFormat = None
+        self._fileFormat = TRANSLATORS[fileFormat] if fileFormat else None  # Detected on open if not given
+        self.formatConfidence = 1 if fileFormat else None
         self._sourceFD = None
-        self._tempFileName = None
-        self._tempFD = None
+        self._plainFile = False
+        self._commonFileName = None
+        self._commonFD = None
+        self._lines = None
         self._iterMode = 'raw'
         self._translator = None
 
     def __iter__(self):
+        if self._iterMode == 'raw':
+            # Hand out the line generator itself, saves a method call per line on big logs
+            return self._getLines()
         return self
 
     def __next__(self):
@@ -465,22 +948,44 @@ class LogFile(object):
         else:
             raise StopIteration
 
-    def _translateFile(self):
-        # For now, just read source & write to temp all at once.  Ver 2 - produce on-demand.
-        self._autoDetectFormat()
-        ln = self._sourceFD.readline()
-
-        while ln:
-            translated_line = self._translator.translateLine(ln)
+    def _getLines(self):
+        if self._lines is None:
+            self._lines = self._translateLines()
+        return self._lines
+
+    def _translateLines(self):
+        """Generator producing the common log format on-demand.  Source lines flow through the translator straight
+           to the consumer, so nothing is materialized unless the common log is being kept (-k)."""
+        self._sourceFD.seek(0)
+        self._translator = self._fileFormat()  # Translators carry state, every pass starts with a fresh one
+        commonFD = self._commonFD
+        if commonFD:
+            commonFD.seek(0)
+            commonFD.truncate()
+        if self._fileFormat.BUFFER_REGEX is not None and self._plainFile:
+            translated = translateRange(self.logFileName, self._translator, 0, os.path.getsize(self.logFileName))
+            if not commonFD:
+                yield from translated
+                return
+            for translated_line in translated:
+                commonFD.write(translated_line)
+                yield translated_line
+            commonFD.flush()
+            return
+
+        translateLine = self._translator.translateLine
+        for ln in self._sourceFD:
+            translated_line = translateLine(ln)
             if translated_line is not None:
-                self._tempFD.write(translated_line)
+                if commonFD:
+                    commonFD.write(translated_line)
+                yield translated_line
 
             if self._translator.abort:
                 break
 
-            ln = self._sourceFD.readline()
-
-        self.reset()
+        if commonFD:
+            commonFD.flush()
 
     def _tokenize(self, line):
         """Break line into its component parts.
@@ -504,24 +1009,39 @@ class LogFile(object):
         return ret
 
     def _autoDetectFormat(self):
-        # If a new translator is created, it needs to be added here
-        logFileTranslators = [SyslogTranslator,  # Syslog listener as produced by WANTester
-                              RouterUIExportTranslator,  # Log file exported from router UI
-                              NCMSupportLogTranslator,  # NCM Support log
-                              USBLogTranslator,  # USB Log file
-                              LocalUISystemLogTranslator,  # Internal Serial Port Log file and local NCM output
-                              CSVLogTranslator,
-                              OtherTranslater]  # Not sure the flavor of this log file, but it exists
-
-        for trans in logFileTranslators:
-            if trans.detect(self._sourceFD):
-                self._translator = trans()
-                # To ensure using correct function
-                # print("parsed using: {}".format(self._translator))
-                break
-
-        if self._translator is None:
+        """Score every translator against one bounded sample of the file and use the best.  formatConfidence is its
+           score, about the share of the sampled lines it recognizes"""
+        sample = LogSample(self.logFileName)
+        best = None
+        bestScore = 0
+        for trans in TRANSLATORS.values():
+            score = trans.score(sample)
+            if score > bestScore:
+                best = trans
+                bestScore = score
+
+        if best is None:
             raise Exception('Unrecognized File Format')
+        self._fileFormat = best
+        self.formatConfidence = bestScore
+
+    @property
+    def chunkable(self):
+        """True if pieces of the file can be translated independently (parallel parsing)"""
+        return self._fileFormat.CHUNKABLE and isPlainFile(self.logFileName)
+
+    def chunkRanges(self, count, minSize=4 * 1024 * 1024):
+        """Split the source file into (up to) count newline-aligned byte ranges of at least minSize bytes"""
+        size = os.path.getsize(self.logFileName)
+        count = max(1, min(count, size // minSize))
+        bounds = [0]
+        with open(self.logFileName, 'rb') as fd:
+            for i in range(1, count):
+                fd.seek(max(size * i // count, bounds[-1]))
+                fd.readline()  # Move to the start of the next line
+                bounds.append(fd.tell())
+        bounds.append(size)
+        return [(bounds[i], bounds[i + 1]) for i in range(count) if bounds[i] < bounds[i + 1]]
 
     def setIterMode(self, mode):
         if mode.lower() not in ['raw', 'tokenize']:
@@ -530,30 +1050,650 @@ class LogFile(object):
         self._iterMode = mode.lower()
 
     def open(self, keep=False):
-        # open input file, read contents and modify to generic and write to new (temp) file.
-        self._sourceFD = open(self.logFileName, 'r')
+        # open input file and detect its format.  Lines are translated to the generic format on-demand as they are
+        # read, the common format file is only written when it is kept.
+        self._sourceFD = io.TextIOWrapper(openSource(self.logFileName), locale.getpreferredencoding(False))
+        self._plainFile = isPlainFile(self.logFileName)
         if keep:
-            self._tempFD = open("common_{}".format(self.logFileName.split("/")[-1]), 'w+')
-        else:
-            self._tempFD = tempfile.NamedTemporaryFile(mode='w+')
-        self._tempFileName = self._tempFD.name
+            self._commonFD = open("common_{}".format(shortName(self.logFileName)), 'w')
+            self._commonFileName = self._commonFD.name
 
-        # Translate the file now that we've opened it.
-        self._translateFile()
+        if self._fileFormat is None:
+            self._autoDetectFormat()
+        self._translator = self._fileFormat()
+        self.reset()
         return
 
     def reset(self):
-        # reset file pointer to beginning, and reset Iterator mode.
-        self._tempFD.seek(0)
+        # Restart from the beginning of the log on the next read, and reset Iterator mode.
+        self._lines = None
         self.setIterMode('raw')
 
     def getNextLine(self):
         # return next line from the file
-        return self._tempFD.readline()
+        return next(self._getLines(), '')
 
     def close(self):
-        # close log file -- automatically deletes tmp file??
-        self._tempFD.close()
+        # close the source log, and the common format log if it was kept
+        self._sourceFD.close()
+        if self._commonFD:
+            self._commonFD.close()
+
+
+# --pipeline sends the translated lines in batches of this many, with at most PIPELINE_DEPTH batches on the way
+PIPELINE_BATCH = 4096
+PIPELINE_DEPTH = 16
+
+
+def _translateJob(fileName, fileFormat, formats, lineQueue, batchSize):
+    """--pipeline worker.  Translate a log file of the fileFormat format (formats are the LOADED_FORMATS), putting its
+       common format lines on lineQueue in lists of batchSize lines, then None.  Any exception goes on the queue
+       instead, for the parsing side to raise"""
+    try:
+        registerFormats(formats)
+        log = LogFile(fileName, fileFormat)
+        log.open()
+        lines = iter(log)
+        batch = list(islice(lines, batchSize))
+        while batch:
+            lineQueue.put(batch)
+            batch = list(islice(lines, batchSize))
+        log.close()
+        lineQueue.put(None)
+    except Exception as exc:
+        lineQueue.put(exc)
+
+
+def pipelineLines(log, batchSize=PIPELINE_BATCH, depth=PIPELINE_DEPTH):
+    """The common format lines of an open log, like iterating over it, but read and translated by another process
+       while this one parses the lines before.  Decompressing, reading and the translator's regexes then take no time
+       of the parse, which takes about as long as the slower of the two instead of both.  The queue between them is
+       bounded, the translating side waits when the parse falls behind, so memory stays at a few batches of lines"""
+    lineQueue = multiprocessing.Queue(depth)
+    worker = multiprocessing.Process(target=_translateJob, args=(log.logFileName, log._fileFormat.FORMAT,
+                                                                  LOADED_FORMATS, lineQueue, batchSize), daemon=True)
+    worker.start()
+    commonFD = log._commonFD
+    if commonFD:
+        commonFD.seek(0)
+        commonFD.truncate()
+    try:
+        while True:
+            try:
+                batch = lineQueue.get(timeout=1)
+            except queue.Empty:
+                if worker.is_alive():
+                    continue
+                raise Exception('Translating {} stopped (exit code {})'.format(log.logFileName, worker.exitcode))
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            if commonFD:
+                commonFD.writelines(batch)
+            yield from batch
+        if commonFD:
+            commonFD.flush()
+    finally:
+        if worker.is_alive():  # The parse stopped early
+            worker.terminate()
+        worker.join()
+
+
+def _records(lines):
+    """(timestamp, [lines]) records of common format lines: a line with a timestamp and the undated lines after it (a
+       traceback's), which stay together.  Undated lines before the first timestamp are a record with timestamp ''"""
+    stamp, record = '', []
+    for line in lines:
+        if '0' < line[0] < '9':
+            if record:
+                yield stamp, record
+            stamp, record = line[:19], [line]
+        else:
+            record.append(line)
+    if record:
+        yield stamp, record
+
+
+def _timeOrderRecords(log, sample=200, batchSize=4096):
+    """_records of an open log, oldest first.  Whether the log is written newest first (NCM exports) is decided on its
+       first sample records.  Those logs are spooled to a temporary file in pickled batches of records, which are
+       read back last batch first"""
+    records = _records(iter(log))
+    head = list(islice(records, sample))
+    stamps = [stamp for stamp, record in head if stamp]
+    if sum(a > b for a, b in zip(stamps, stamps[1:])) <= sum(a < b for a, b in zip(stamps, stamps[1:])):
+        yield from head
+        yield from records
+        return
+    records = chain(head, records)
+    offsets = []
+    with tempfile.TemporaryFile() as spool:
+        for batch in iter(lambda: list(islice(records, batchSize)), []):
+            offsets.append(spool.tell())
+            pickle.dump(batch, spool)
+        for offset in reversed(offsets):
+            spool.seek(offset)
+            yield from reversed(pickle.load(spool))
+
+
+def _indexedRecords(log, index):
+    """(timestamp, index, record) items of _timeOrderRecords, for mergeLogs"""
+    for stamp, record in _timeOrderRecords(log):
+        yield stamp, index, record
+
+
+def mergeLogs(logs, tags):
+    """The common format lines of several open LogFiles as one timeline, for logs of the same incident from different
+       places (router UI export, NCM support log, USB log, WANTester syslog).  A k-way merge by timestamp of the
+       logs as they are translated: heapq.merge holds one record (see _records) per log, and lines with the same
+       timestamp keep the order of logs.  The dated lines get [tag] of their log after the timestamp"""
+    # No key function, two items only tie up to the log index, never compare records
+    for stamp, index, record in heapq.merge(*[_indexedRecords(log, index) for index, log in enumerate(logs)]):
+        if stamp:
+            record[0] = '{} [{}]{}'.format(stamp, tags[index], record[0][19:])
+        if not record[-1].endswith('\n'):  # The last line of a log, lines of other logs can come after it here
+            record[-1] += '\n'
+        yield from record
+
+
+class Profile(object):
+    """Where the time of a parse goes, for --profile.  Stages get wall and CPU time, parse functions their calls,
+       matches (calls returning an event) and time, translators the lines they translated out of the source lines.
+       Nothing is measured unless a Profile is in extra_args['profile'], so parsing without one costs nothing.
+
+       Stages are named parent.child, a child's time is part of its parent's.  With --jobs the parse stages and
+       functions are summed over the worker processes, so their wall time can add up to more than the parse took."""
+
+    def __init__(self):
+        self.stages = {}  # {name: [wall seconds, CPU seconds]}
+        self.functions = {}  # {name: [calls, matches, seconds]}
+        self.translators = {}  # {name: [source lines, translated lines]}
+
+    def stage(self, name):
+        return _ProfileStage(self.stages.setdefault(name, [0.0, 0.0]))
+
+    def wrap(self, name, func, miss=None):
+        """func, counting its calls and the calls that didn't return miss (None, False, ...) as matches"""
+        counts = self.functions.setdefault(name, [0, 0, 0.0])
+        clock = time.perf_counter
+
+        def profiled(*args):
+            start = clock()
+            ret = func(*args)
+            counts[2] += clock() - start
+            counts[0] += 1
+            if ret != miss if miss is not None else ret:
+                counts[1] += 1
+            return ret
+        return profiled
+
+    def lines(self, name, lines):
+        """Iterate lines, the time spent getting each one (translating it, when lines are translated on demand) going
+           to stage name"""
+        totals = self.stages.setdefault(name, [0.0, 0.0])
+        wallClock, cpuClock = time.perf_counter, time.process_time
+        lines = iter(lines)
+        while True:
+            wall, cpu = wallClock(), cpuClock()
+            line = next(lines, None)
+            totals[0] += wallClock() - wall
+            totals[1] += cpuClock() - cpu
+            if line is None:
+                return
+            yield line
+
+    def countTranslator(self, log):
+        """Add the lines of log and how many of them its translator translated.  Reads and translates the whole
+           source again with a new translator, a line at a time like the parse reads it (a last line without a
+           newline counts too), so every source line is one hit or one miss"""
+        translator = log._fileFormat()
+        translateLine = translator.translateLine
+        sourceLines = hits = 0
+        with io.TextIOWrapper(openSource(log.logFileName), locale.getpreferredencoding(False)) as fd:
+            for ln in fd:
+                sourceLines += 1
+                if translateLine(ln) is not None:
+                    hits += 1
+                if translator.abort:
+                    break
+        counts = self.translators.setdefault(log._fileFormat.__name__, [0, 0])
+        counts[0] += sourceLines
+        counts[1] += hits
+
+    def merge(self, other):
+        """Add the measurements of another Profile, e.g. of a --jobs worker"""
+        for mine, theirs in [(self.stages, other.stages), (self.functions, other.functions),
+                             (self.translators, other.translators)]:
+            for name, values in theirs.items():
+                mine[name] = [a + b for a, b in zip(mine.get(name, [0] * len(values)), values)]
+
+    def asDict(self):
+        return {'stages': {name: {'wall': wall, 'cpu': cpu} for name, (wall, cpu) in self.stages.items()},
+                'functions': {name: {'calls': calls, 'matches': matches, 'seconds': seconds}
+                              for name, (calls, matches, seconds) in self.functions.items()},
+                'translators': {name: {'source_lines': source, 'translated': translated,
+                                       'miss_ratio': 1 - translated / source if source else 0}
+                                for name, (source, translated) in self.translators.items()}}
+
+    def report(self, fd):
+        """Write the measurements as text tables"""
+        fd.write('{:<28} {:>10} {:>10}\n'.format('stage', 'wall s', 'CPU s'))
+        for name, (wall, cpu) in self.stages.items():
+            fd.write('{:<28} {:10.3f} {:10.3f}\n'.format('  ' * name.count('.') + name.split('.')[-1], wall, cpu))
+        fd.write('\n{:<28} {:>10} {:>10} {:>10} {:>10}\n'.format('function', 'calls', 'matches', 'seconds',
+                                                                 'us/call'))
+        for name, (calls, matches, seconds) in self.functions.items():
+            fd.write('{:<28} {:10,} {:10,} {:10.3f} {:10.2f}\n'.format(name, calls, matches, seconds,
+                                                                       1e6 * seconds / calls if calls else 0))
+        fd.write('\n{:<28} {:>10} {:>10} {:>10}\n'.format('translator', 'lines', 'translated', 'missed'))
+        for name, (source, translated) in self.translators.items():
+            fd.write('{:<28} {:10,} {:10,} {:9.1f}%\n'.format(name, source, translated,
+                                                              100 * (1 - translated / source) if source else 0))
+
+
+class _ProfileStage(object):
+    """Context manager adding the wall and CPU time of its block to a Profile stage"""
+
+    def __init__(self, totals):
+        self.totals = totals
+
+    def __enter__(self):
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+
+    def __exit__(self, *exc):
+        self.totals[0] += time.perf_counter() - self.wall
+        self.totals[1] += time.process_time() - self.cpu
+
+
+def profileStage(extra_args, name):
+    """The Profile.stage of extra_args, or a context manager doing nothing when not profiling"""
+    profile = extra_args.get('profile')
+    return profile.stage(name) if profile else contextlib.nullcontext()
+
+
+# A pattern that is nothing but plain (or escaped) characters, which a substring check finds as well as a search
+_PLAIN = re.compile(r'(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])+')
+
+
+def _setEnd(pattern, i):
+    """Index after the ] of the regex set whose [ is before i"""
+    i += pattern[i:i + 1] == '^'
+    i += pattern[i:i + 1] == ']'  # A ] first in the set is part of it
+    while i < len(pattern) and pattern[i] != ']':
+        i += 2 if pattern[i] == '\\' else 1
+    return i + 1
+
+
+def requiredLiteral(pattern):
+    """The longest run of plain characters at the top level of a regex (outside groups, sets and anything made
+       optional by a quantifier), which every line the regex matches contains.  '' if the regex has a top level
+       alternation, or no run of at least 3 characters"""
+    runs = []
+    run = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == '\\':
+            escaped = pattern[i:i + 1]
+            i += 1
+            if escaped and not escaped.isalnum():  # \. \- \[ are the characters themselves
+                run += escaped
+                continue
+            # \d, \b... end the run.  The hex digits of \x41, the digits of \101 or \1 and the name of \N{...} are
+            # part of the escape, not plain characters
+            if escaped and escaped in 'xuU':
+                i += {'x': 2, 'u': 4, 'U': 8}[escaped]
+            elif escaped == 'N' and pattern[i:i + 1] == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+            elif escaped.isdigit():
+                while i < len(pattern) and pattern[i].isdigit():
+                    i += 1
+        elif char == '[':
+            i = _setEnd(pattern, i)
+        elif char == '(':
+            depth = 1
+            while i < len(pattern) and depth:
+                if pattern[i] == '\\':
+                    i += 2
+                elif pattern[i] == '[':
+                    i = _setEnd(pattern, i + 1)
+                else:
+                    depth += {'(': 1, ')': -1}.get(pattern[i], 0)
+                    i += 1
+        elif char == '|':
+            return ''
+        elif char in '*?{':
+            run = run[:-1]  # The character before is optional
+            if char == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+        elif char not in '+.^$)':
+            run += char
+            continue
+        runs.append(run)
+        run = ''
+    runs.append(run)
+    literal = max(runs, key=len)
+    return literal if len(literal) >= 3 else ''
+
+
+class RegexRules(object):
+    """The extra patterns (--regex, --regex-file, and the -e error ones) a line goes in the concise file for, compiled
+       once.  A rule is a (name, pattern) pair, match gives the name of the first rule matching the line, or None.
+       A rule with a required literal (see requiredLiteral) is only searched in lines that contain it, and a rule that
+       is only a literal is only that check: a substring check is much cheaper than a search, and most lines have
+       none of the literals.  (One alternation of all the patterns is no help, re tries every branch of it at every
+       position of the line and is several times slower than searching the patterns one by one.)"""
+
+    def __init__(self, rules):
+        self.rules = []  # [(name, required literal or '', search or None if the literal is the whole pattern), ]
+        for name, pattern in rules:
+            compiled = re.compile(pattern)  # Any bad pattern raises here
+            literal = '' if compiled.flags & ~re.UNICODE else requiredLiteral(pattern)  # (?i) and the like
+            plain = literal and _PLAIN.fullmatch(pattern)
+            self.rules.append((name, literal, None if plain else compiled.search))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, line):
+        for name, literal, search in self.rules:
+            if literal and literal not in line:
+                continue
+            if search is None or search(line):
+                return name
+        return None
+
+
+def loadRegexFile(fileName):
+    """The rules of a --regex-file: a pattern per line, or a name and a tab before it.  Blank lines and lines starting
+       with # are skipped.  Rules without a name are named after the file and line number"""
+    rules = []
+    with open(fileName) as fd:
+        for number, line in enumerate(fd, 1):
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            name, tab, pattern = line.partition('\t')
+            if not tab:
+                name, pattern = '{}:{}'.format(os.path.basename(fileName), number), line
+            rules.append((name, pattern))
+    return rules
+
+
+# Part of every ParseCache key.  Bump it when a change to translation or parsing changes what a log parses to, so old
+# cache entries are not used
+PARSER_VERSION = 2
+
+
+class ParseCache(object):
+    """On-disk cache of parsed logs, for running the parser on the same log again with other options.  An entry has
+       the translated common log ({key}.common) and the lines that can be events, with their line numbers and dates
+       ({key}.events).  Without extra regexes, a run only has to parse those lines, whatever the output format, date
+       range or debug option.  With extra regexes (-e, --regex) every line is parsed again, but from the common log,
+       without translating.  Either way, with a date range only the part of the log in it is read, found with the
+       entry's block index.
+
+       Entries are keyed by the file size and modification time, a digest of its first and last 64 KB, the detected
+       format and PARSER_VERSION.  The least recently used entries are removed when the cache grows past maxSize."""
+    sampleSize = 65536
+    blockLines = 4096  # Lines per block of the index
+
+    def __init__(self, directory=None, maxSize=2048 * 1024 * 1024):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.cache', 'UniversalLogParser')
+        self.directory = directory
+        self.maxSize = maxSize
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, log):
+        path, member = splitArchivePath(log.logFileName)  # Compressed logs are keyed by the compressed file
+        stat = os.stat(path)
+        # The format spec is part of the key, a format from --format-file may have changed since
+        digest = hashlib.sha256('{} {} {} {} {} {}'.format(PARSER_VERSION, log._fileFormat.__name__,
+                                                            json.dumps(log._fileFormat.SPEC, sort_keys=True),
+                                                            stat.st_size, stat.st_mtime_ns, member).encode())
+        with open(path, 'rb') as fd:
+            digest.update(fd.read(self.sampleSize))
+            fd.seek(max(0, stat.st_size - self.sampleSize))
+            digest.update(fd.read(self.sampleSize))
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        return os.path.join(self.directory, key + '.common'), os.path.join(self.directory, key + '.events')
+
+    def load(self, log):
+        """The cache entry for log, None if there isn't one.  An entry is a dict: common (file name of the common
+           log), candidates ([(line number, date, line), ]), index ([(byte offset, first line number, date before the
+           block, lowest date, highest date), ] for every blockLines lines of the common log, see blocks), line_num
+           and linedate (after the last line), aborted"""
+        commonName, eventsName = self._paths(self.key(log))
+        try:
+            with open(eventsName, 'rb') as fd:
+                entry = pickle.load(fd)
+            os.utime(commonName)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(eventsName)  # Most recently used
+        entry['common'] = commonName
+        return entry
+
+    def store(self, log):
+        """Translate log into a new cache entry and return it"""
+        key = self.key(log)
+        commonName, eventsName = self._paths(key)
+        firstEvent = UniversalParser._firstEvent
+        otherIndex = UniversalParser.otherIndex
+        blockLines = self.blockLines
+        candidates = []
+        index = []
+        line_num = 1
+        linedate = None
+        low = high = None  # Date range of the current block
+        log.reset()
+        with open(commonName + '.tmp', 'w') as fd:
+            for line in log:
+                if line_num % blockLines == 1:
+                    if index:
+                        index[-1][3:] = [low, high]
+                    index.append([fd.tell(), line_num, linedate, None, None])
+                    low = high = linedate
+                fd.write(line)
+                if '0' < line[0] < '9':
+                    linedate = parse_ts(line[:19])
+                    if low is None:
+                        low = high = linedate
+                    elif linedate < low:
+                        low = linedate
+                    elif linedate > high:
+                        high = linedate
+                if firstEvent(line) != otherIndex:
+                    candidates.append((line_num, linedate, line))
+                line_num += 1
+            if index:
+                index[-1][3:] = [low, high]
+            index.append([fd.tell(), line_num, linedate, None, None])  # End of the log
+        log.reset()
+        entry = {'candidates': candidates, 'index': [tuple(block) for block in index], 'line_num': line_num,
+                 'linedate': linedate, 'aborted': log._translator.abort}
+        with open(eventsName + '.tmp', 'wb') as fd:
+            pickle.dump(entry, fd, pickle.HIGHEST_PROTOCOL)
+        os.replace(commonName + '.tmp', commonName)
+        os.replace(eventsName + '.tmp', eventsName)
+        entry['common'] = commonName
+        self.evict(key)
+        return entry
+
+    @staticmethod
+    def blocks(entry, date_range):
+        """Byte ranges of the common log that can have lines in date_range, merged where they touch: [(start offset,
+           end offset, first line number, date before the first line, line number after the last line), ].  Lines
+           outside them are not in the range, skipping them doesn't change anything parsing does."""
+        date_from, date_to = [dt_to_ts(dt) for dt in date_range]
+        index = entry['index']
+        ret = []
+        for block, nextBlock in zip(index, index[1:]):
+            offset, line_num, linedate, low, high = block
+            if low is None or high <= date_from or low >= date_to:
+                continue
+            if ret and ret[-1][1] == offset:
+                ret[-1][1] = nextBlock[0]
+                ret[-1][4] = nextBlock[1]
+            else:
+                ret.append([offset, nextBlock[0], line_num, linedate, nextBlock[1]])
+        return ret
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache is no bigger than maxSize.  Never removes keep"""
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext in ('.common', '.events'):
+                stat = os.stat(os.path.join(self.directory, name))
+                size, used = entries.get(key, (0, 0))
+                entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+        total = sum(size for size, used in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][1]):
+            if total <= self.maxSize:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= entries[key][0]
+
+
+# First bytes of a result file, see ResultFile
+RESULT_MAGIC = b'ULPRSLT1'
+RESULT_VERSION = 2
+
+
+class ResultFile(object):
+    """A ParseResult saved in a binary columnar file (-o bin), so a parse can be reloaded and rendered again without
+       the log.  Opening one maps it into memory and only reads the header, the columns are memoryviews into the map.
+
+       Layout:
+         8 bytes   RESULT_MAGIC
+         8 bytes   header size, unsigned little-endian
+         header    JSON, space padded to a multiple of 8 bytes
+         columns   raw machine arrays, each one starting at a multiple of 8 bytes from the end of the header
+       The header has the version, the byte order of the columns, the log name, its short name and the Summary.
+       "signals" has an entry per uid with its sample count and band names and the offsets of its columns: ts (int64
+       epoch seconds), values (one float64 column per metric in SignalColumns.metrics, NaN where the line didn't have
+       it) and band (int32 index into bands, -1 for none).  A uid with 5G NR values also has nr, a float64 column per
+       NR metric of SignalColumns.nrFields and an int32 NR band column (indexes into bands too).  "sigOrder" is the
+       int32 position in "signals" of every signal sample in log order.  "connections" has the uids, states and
+       details tables and four columns with a row per connection event in log order: ts (int64), uid, state and
+       detail (int32 indexes into the tables).
+       Offsets are [byte offset, item count]."""
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        with open(fileName, 'rb') as fd:
+            self._map = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != RESULT_MAGIC:
+            raise Exception('{} is not a result file, make one with -o bin'.format(fileName))
+        headerSize = int.from_bytes(self._map[8:16], 'little')
+        self.header = json.loads(self._map[16:16 + headerSize].decode())
+        if self.header['version'] != RESULT_VERSION:
+            raise Exception('{} is a version {} result file, this parser reads version {}'.format(
+                fileName, self.header['version'], RESULT_VERSION))
+        self._start = 16 + headerSize
+        self.logFileName = self.header['log']
+        self.shortname = self.header['shortname']
+
+    def _column(self, typecode, offset):
+        """A column of the file as a memoryview, or a byte swapped copy if the file was written on the other byte
+           order"""
+        start = self._start + offset[0]
+        column = memoryview(self._map)[start:start + offset[1] * array(typecode).itemsize].cast(typecode)
+        if self.header['byteorder'] != sys.byteorder:
+            column = array(typecode, column)
+            column.byteswap()
+        return column
+
+    def signals(self):
+        """{uid: SignalColumns} with the columns in the file.  They can be rendered but not appended to"""
+        sigDict = {}
+        for index, entry in enumerate(self.header['signals']):
+            columns = UniversalParser.SignalColumns(entry['uid'], index)
+            columns.ts = self._column('q', entry['ts'])
+            columns.values = [self._column('d', offset) for offset in entry['values']]
+            columns.band = self._column('i', entry['band'])
+            columns.bands = entry['bands']
+            columns._bandCodes = {band: code for code, band in enumerate(entry['bands'])}
+            if 'nr' in entry:
+                columns.nr = [self._column('d', offset) for offset in entry['nr'][:3]] + [
+                    self._column('i', entry['nr'][3])]
+            sigDict[entry['uid']] = columns
+        return sigDict
+
+    def parseResult(self):
+        """The saved ParseResult, for writeoutput.  Signal samples stay in the map, connection events are made into
+           WanEvents again"""
+        result = UniversalParser.ParseResult()
+        result.sigDict = self.signals()
+        result.sigOrder = self._column('i', self.header['sigOrder'])
+        connections = self.header['connections']
+        details = [dict(entry) for entry in connections['details']]
+        for uid in connections['uids']:
+            result.connIndex[uid] = len(result.connDict)
+            result.connDict[uid] = []
+        uids = list(result.connDict.values())
+        states = [sys.intern(state) for state in connections['states']]
+        result.connOrder = self._column('i', connections['uid'])
+        for ts, uid, state, detail in zip(self._column('q', connections['ts']), result.connOrder,
+                                          self._column('i', connections['state']),
+                                          self._column('i', connections['detail'])):
+            uids[uid].append(UniversalParser.WanEvent.fromTs(ts, connections['uids'][uid], states[state],
+                                                             details[detail]))
+        result.summary.resets = self.header['summary']['resets']
+        result.summary.uids = self.header['summary']['uids']
+        return result
+
+    @staticmethod
+    def save(result, fd, logFileName, shortname):
+        """Write a ParseResult to the binary file fd in the layout above"""
+        columns = []
+        size = [0]
+
+        def add(column):
+            offset = [size[0], len(column)]
+            columns.append(column)
+            size[0] += -(-len(column) * column.itemsize // 8) * 8
+            return offset
+
+        signals = [{'uid': uid, 'count': len(sig), 'bands': sig.bands, 'ts': add(sig.ts),
+                    'values': [add(column) for column in sig.values], 'band': add(sig.band)}
+                   for uid, sig in result.sigDict.items()]
+        for entry, sig in zip(signals, result.sigDict.values()):
+            if sig.nr is not None:
+                entry['nr'] = [add(column) for column in sig.nr]
+        sigOrder = add(result.sigOrder)
+        states = {}
+        details = {}
+        connTs, connState, connDetails = array('q'), array('i'), array('i')
+        uidEvents = [iter(events) for events in result.connDict.values()]
+        for index in result.connOrder:
+            evt = next(uidEvents[index])
+            connTs.append(evt.ts)
+            connState.append(states.setdefault(evt.state, len(states)))
+            connDetails.append(details.setdefault(tuple(evt.details.items()), len(details)))
+        connections = {'count': len(connTs), 'uids': list(result.connDict), 'states': list(states),
+                       'details': [list(entry) for entry in details], 'ts': add(connTs),
+                       'uid': add(array('i', result.connOrder)), 'state': add(connState), 'detail': add(connDetails)}
+        header = json.dumps({'version': RESULT_VERSION, 'byteorder': sys.byteorder, 'log': logFileName,
+                             'shortname': shortname, 'summary': {'resets': result.summary.resets,
+                                                                 'uids': result.summary.uids},
+                             'signals': signals,
+                             'sigOrder': sigOrder, 'connections': connections}).encode()
+        header += b' ' * (-len(header) % 8)
+        fd.write(RESULT_MAGIC + len(header).to_bytes(8, 'little') + header)
+        for column in columns:
+            fd.write(memoryview(column).cast('B'))
+            fd.write(b'\0' * (-len(column) * column.itemsize % 8))
 
 
 class UniversalParser(object):
@@ -571,8 +1711,42 @@ class UniversalParser(object):
     rsrp = [-80, -90, -100]
     rsrq = [-10, -15, -20]
     ecio = [-6, -10, -20]
+    qualities = ['Excellent', 'Good', 'Fair', 'Poor']
 
     reset_match = 0
+    reset_touched = False  # Set whenever a reset pattern matches, so --jobs knows if a chunk depended on reset_match
+
+    # Event patterns, compiled once.  Every line in range is checked against these, so they must not be rebuilt per call
+    rgxDevState = re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- (?!Service Change)(.*) -> (.*?)'
+                             r'(?:, Reason: (.*))?$')
+    rgxUnplug = re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Unplugged$')
+    rgxPlug = re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Plug event: ok$')
+    rgxConfig = re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Configure Event:(.*)$')
+    rgxSignalQuality = re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- \S*\s*signal(.*)')
+    # signal strings in middle of line all have the form: XXXX:<val>(unit).  RF band doesn't have parens
+    rgxSignalValues = [re.compile(r'{}:(.*?)[\( ]'.format(metric))
+                       for metric in ['RSSI', 'SINR', 'RSRP', 'RSRQ', 'ECIO']]
+    rgxSignalBand = re.compile(r'RFBAND:(.*)')
+    # The 5G NR values newer firmware adds, only searched for in lines with SS- or NR band in them
+    rgxSignalNrValues = [re.compile(r'SS-{}:(.*?)[\( ]'.format(metric)) for metric in ['RSRP', 'SINR', 'RSRQ']]
+    rgxSignalNrBand = re.compile(r'NR ?BAND:(.*)')
+    rgxResets = [
+        re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Resetting$'),
+        re.compile(r'^(\d*-\d*-\d* \d*:\d*:\d*).*cp_stack_mgr -- (.*):.*Device hard reset, hub (.*)$'),
+        re.compile(r'(\d*-\d*-\d* \d*:\d*:\d*).*usb (.*): USB disconnect, device number (.*)$')
+    ]
+    # Every WAN event pattern above in one pattern, only answers whether any of them can match a line containing "WAN:"
+    rgxWanEvent = re.compile(r'^\d*-\d*-\d* \d*:\d*:\d*.*?WAN:.*? -- (?:(?!Service Change).* -> |Unplugged$|'
+                             r'Plug event: ok$|Configure Event:|\S*\s*signal|Resetting$)')
+    # All event patterns as one alternation, in parse function order.  Alternation tries each branch completely before
+    # the next, so the branch that matches is the first parse function that can match the line.
+    rgxEvents = re.compile('|'.join('(?P<{}>{})'.format(name, rgx.pattern) for name, rgx in [
+        ('devstate', rgxDevState), ('unplug', rgxUnplug), ('plug', rgxPlug), ('configure', rgxConfig),
+        ('signal', rgxSignalQuality), ('reset0', rgxResets[0]), ('reset1', rgxResets[1]), ('reset2', rgxResets[2])]))
+    # Position of the parse function in parseLog's parseFuncs for each branch
+    eventIndex = {'devstate': 0, 'unplug': 1, 'plug': 2, 'configure': 3, 'signal': 4,
+                  'reset0': 5, 'reset1': 5, 'reset2': 5}
+    otherIndex = 6  # Position of _parseOtherRegEx
 
     def __init__(self, debug=False):
         self.debug = debug
@@ -582,18 +1756,37 @@ class UniversalParser(object):
         return self.debug
 
     class WanEvent:
-        """Contains all Connection state data and methods"""
+        """Contains all Connection state data and methods.  A long log holds millions of these, so they are slotted,
+           uid and state are interned and details is kept as given, not copied.  Treat details as read-only, the
+           parse functions share them between events (see _details)."""
+        __slots__ = ('ts', 'uid', 'state', 'details')
+        noDetails = {}
 
         def __init__(self, dt, uid, state, details=None):
-            if details is None:
-                details = {}
-            self.dt = datetime.strptime(dt, UniversalParser.timeformat)
-            self.dtstr = dt
-            self.uid = uid
-            self.state = state  # state as string
-            self.details = copy(details)  # Dictionary of additional event details
+            self.ts = parse_ts(dt)  # epoch seconds.  dt and dtstr are only made for output
+            self.uid = sys.intern(uid)
+            self.state = sys.intern(state)  # state as string
+            self.details = details if details is not None else self.noDetails  # Dict of additional event details
             # self.details.update({'State': state})
 
+        @classmethod
+        def fromTs(cls, ts, uid, state, details):
+            """A WanEvent at epoch seconds ts instead of a timestamp string, for ResultFile"""
+            evt = cls.__new__(cls)
+            evt.ts = ts
+            evt.uid = uid
+            evt.state = state
+            evt.details = details
+            return evt
+
+        @property
+        def dt(self):
+            return ts_to_dt(self.ts)
+
+        @property
+        def dtstr(self):
+            return format_ts(self.ts)
+
         def detailFormat(self):
             ret = ''
             for key in self.details:
@@ -607,55 +1800,456 @@ class UniversalParser(object):
         def getCSVHeader():
             return 'datetime,uid,stateEnum,details\n'
 
-        def getCSV(self):
-            return '{},{},{},"{}"\n'.format(self.dt, self.uid, self.state, self.details)
+        def getCSV(self, renderTime=format_ts):
+            return '{},{},{},"{}"\n'.format(renderTime(self.ts), self.uid, self.state, self.details)
 
-        def getList(self):
-            return [self.dt, self.state, self.detailFormat(), self.dtstr]
+        def getList(self, renderTime=ts_to_dt):
+            """renderTime turns the timestamp into the first element, a datetime by default"""
+            return [renderTime(self.ts), self.state, self.detailFormat(), format_ts(self.ts)]
 
     class SignalEvent:
-        """Contains all signal quality data and methods"""
-
-        def __init__(self, dt, uid, rssi=None, sinr=None, rsrp=None, rsrq=None, ecio=None, band=None):
-            self.dt = datetime.strptime(dt, UniversalParser.timeformat)
-            self.dtstr = dt
-            self.uid = uid
+        """Contains all signal quality data and methods.  Metrics are plain floats (None when not in the line) and
+           band a string, qualities are only worked out for output"""
+        __slots__ = ('ts', 'uid', 'rssi', 'sinr', 'rsrp', 'rsrq', 'ecio', 'band', 'ss_rsrp', 'ss_sinr', 'ss_rsrq',
+                     'nr_band')
+
+        def __init__(self, dt, uid, rssi=None, sinr=None, rsrp=None, rsrq=None, ecio=None, band=None, ss_rsrp=None,
+                     ss_sinr=None, ss_rsrq=None, nr_band=None):
+            self.ts = parse_ts(dt)  # epoch seconds.  dt and dtstr are only made for output
+            self.uid = sys.intern(uid)
             self.rssi = rssi
             self.sinr = sinr
             self.rsrp = rsrp
             self.rsrq = rsrq
             self.ecio = ecio
             self.band = band
+            # 5G NR
+            self.ss_rsrp = ss_rsrp
+            self.ss_sinr = ss_sinr
+            self.ss_rsrq = ss_rsrq
+            self.nr_band = nr_band
+
+        @property
+        def dt(self):
+            return ts_to_dt(self.ts)
+
+        @property
+        def dtstr(self):
+            return format_ts(self.ts)
 
         @staticmethod
         def getCSVHeader():
             return 'datetime,uid,RSSI,SINR,RSRP,RSRQ,ECIO,BAND\n'
 
         def getCSV(self):
-            return '{},{},{},{},{},{},{},{}\n'.format(self.dt, self.uid, self.rssi,
-                                                      self.sinr, self.rsrp, self.rsrq, self.ecio, self.band)
+            return '{},{},{},{},{},{},{},{}\n'.format(format_ts(self.ts), self.uid, *self.getList()[1:])
+
+        def getList(self, renderTime=ts_to_dt):
+            """renderTime turns the timestamp into the first element, a datetime by default.  The rest are
+               {'RSSI': (value, quality)} and so on, {'RFBAND': band}, then {'SS-RSRP': value, ..., 'NRBAND': band}
+               with the 5G NR values of the line if it has any"""
+            ret = [renderTime(self.ts)]
+            for metric, val in zip(UniversalParser.SignalColumns.metrics,
+                                   (self.rssi, self.sinr, self.rsrp, self.rsrq, self.ecio)):
+                if val is None:
+                    ret.append({metric: (None, None)})
+                else:
+                    limits = getattr(UniversalParser, metric.lower())
+                    ret.append({metric: (val, UniversalParser.classify([val], limits)[0])})
+            ret.append({'RFBAND': self.band})
+            nr = {field: val for field, val in zip(UniversalParser.SignalColumns.nrFields,
+                                                   (self.ss_rsrp, self.ss_sinr, self.ss_rsrq, self.nr_band))
+                  if val is not None}
+            if nr:
+                ret.append(nr)
+            return ret
+
+    class SignalColumns:
+        """The signal samples of one uid in typed columns that grow as lines are parsed: time in epoch seconds, a float
+           column per metric (NaN when the line didn't have it) and a band code indexing bands (-1 for no band).
+           Qualities and the output lists are only made when the output is rendered.  The 5G NR values get columns
+           (nr) at the first sample that has any: a float column per NR metric and an NR band code column."""
+        metrics = ['RSSI', 'SINR', 'RSRP', 'RSRQ', 'ECIO']
+        nrFields = ['SS-RSRP', 'SS-SINR', 'SS-RSRQ', 'NRBAND']
+
+        def __init__(self, uid, index):
+            self.uid = uid
+            self.index = index  # Position of the uid in ParseResult.sigDict, what ParseResult.sigOrder holds
+            self.ts = array('q')
+            self.values = [array('d') for _ in self.metrics]
+            self.band = array('i')
+            self.bands = []
+            self._bandCodes = {}
+            self._qualities = None
+            self.nr = None
+
+        def __len__(self):
+            return len(self.ts)
+
+        def _bandCode(self, band):
+            if band is None:
+                return -1
+            code = self._bandCodes.get(band)
+            if code is None:
+                code = self._bandCodes[band] = len(self.bands)
+                self.bands.append(band)
+            return code
+
+        def _addNr(self):
+            """Make the NR columns, without values for the samples so far"""
+            self.nr = [array('d', [NAN]) * len(self.ts) for _ in self.nrFields[:3]] + [array('i', [-1]) * len(self.ts)]
+
+        def append(self, evt):
+            if self.nr is not None or evt.ss_rsrp is not None or evt.ss_sinr is not None or \
+                    evt.ss_rsrq is not None or evt.nr_band is not None:
+                if self.nr is None:
+                    self._addNr()
+                for column, val in zip(self.nr, (evt.ss_rsrp, evt.ss_sinr, evt.ss_rsrq)):
+                    column.append(NAN if val is None else val)
+                self.nr[3].append(self._bandCode(evt.nr_band))
+            self.ts.append(evt.ts)
+            for column, val in zip(self.values, (evt.rssi, evt.sinr, evt.rsrp, evt.rsrq, evt.ecio)):
+                column.append(NAN if val is None else val)
+            self.band.append(self._bandCode(evt.band))
+            self._qualities = None
+
+        def extend(self, other):
+            codes = [self._bandCode(band) for band in other.bands]
+            if self.nr is not None or other.nr is not None:
+                if self.nr is None:
+                    self._addNr()
+                theirs = other.nr
+                if theirs is None:
+                    theirs = [array('d', [NAN]) * len(other)] * 3 + [array('i', [-1]) * len(other)]
+                for column, their in zip(self.nr, theirs[:3]):
+                    column.extend(their)
+                self.nr[3].extend(array('i', [codes[code] if code >= 0 else -1 for code in theirs[3]]))
+            self.ts.extend(other.ts)
+            for column, theirs in zip(self.values, other.values):
+                column.extend(theirs)
+            self.band.extend(array('i', [codes[code] if code >= 0 else -1 for code in other.band]))
+            self._qualities = None
+
+        def getQualities(self):
+            """Quality of every sample, a list per metric (None where there is no value).  Classified a column at
+               a time."""
+            if self._qualities is None:
+                self._qualities = [UniversalParser.classify(column, getattr(UniversalParser, metric.lower()))
+                                   for metric, column in zip(self.metrics, self.values)]
+            return self._qualities
+
+        def getLists(self, renderTime=ts_to_dt):
+            """Output lists in the SignalEvent.getList layout, one per sample"""
+            return list(self.iterLists(renderTime))
+
+        def iterLists(self, renderTime=ts_to_dt, indexes=None):
+            """getLists one sample at a time, for the output writers.  Only the samples at indexes, in that order, if
+               given"""
+            metrics = self.metrics
+            bands = self.bands
+            nrFields = self.nrFields
+            columns = [self.ts] + self.values + self.getQualities() + [self.band] + (self.nr or [])
+            samples = zip(*columns)
+            if indexes is not None:
+                samples = ([column[i] for column in columns] for i in indexes)
+            for sample in samples:
+                row = [renderTime(sample[0])]
+                for m, metric in enumerate(metrics):
+                    quality = sample[6 + m]
+                    row.append({metric: (None, None) if quality is None else (sample[1 + m], quality)})
+                row.append({'RFBAND': bands[sample[11]] if sample[11] >= 0 else None})
+                if len(sample) > 12:
+                    nr = {field: val for field, val in zip(nrFields, sample[12:15]) if val == val}
+                    if sample[15] >= 0:
+                        nr['NRBAND'] = bands[sample[15]]
+                    if nr:
+                        row.append(nr)
+                yield row
+
+    class Summary:
+        """Event counts and connection uptime per uid, for the fleet summary and the header table of every output.  Kept
+           while parsing, so every output format has it.  The connection events of a uid drive a state machine: the
+           time from a 'connected' event to the next event of the uid is time connected, like the html plot used to
+           work it out in the browser.  Logs are oldest first or, like NCM ones, newest first, so the state between
+           two events that follow each other in the log is that of the older one."""
+
+        def __init__(self):
+            self.resets = 0
+            # {uid: {'disconnects': n, 'unplugs': n, 'signal': {'RSSI': {'Excellent': n, }, },
+            #        'first': earliest ts, 'last': latest ts, 'head': [ts, state] of the first connection event in log
+            #        order, 'tail': [ts, state] of the last, 'connected': seconds}}.  first and head are None until the
+            # first connection event.  Use asDict for output
+            self.uids = {}
+
+        def _counts(self, uid):
+            counts = self.uids.get(uid)
+            if counts is None:
+                counts = self.uids[uid] = {'disconnects': 0, 'unplugs': 0,
+                                           'signal': {sig: dict.fromkeys(UniversalParser.qualities, 0)
+                                                      for sig in UniversalParser.SignalColumns.metrics},
+                                           'first': None, 'last': None, 'head': None, 'tail': None, 'connected': 0}
+            return counts
+
+        @staticmethod
+        def _connected(prev, event):
+            """Seconds connected between two connection events ([ts, state]) that follow each other in the log"""
+            if event[0] >= prev[0]:
+                return event[0] - prev[0] if prev[1] == 'connected' else 0
+            return prev[0] - event[0] if event[1] == 'connected' else 0
+
+        def addWanEvent(self, evt):
+            counts = self._counts(evt.uid)
+            if evt.state == 'disconnected':
+                counts['disconnects'] += 1
+            elif evt.state == 'unplugged':
+                counts['unplugs'] += 1
+            event = [evt.ts, evt.state]
+            if counts['head'] is None:
+                counts['head'] = event
+                counts['first'] = counts['last'] = evt.ts
+            else:
+                counts['connected'] += self._connected(counts['tail'], event)
+                counts['first'] = min(counts['first'], evt.ts)
+                counts['last'] = max(counts['last'], evt.ts)
+            counts['tail'] = event
+
+        def addSignal(self, evt):
+            """addSignalColumns for one sample, for a summary kept while streaming events (NdjsonSink)"""
+            signal = self._counts(evt.uid)['signal']
+            values = (evt.rssi, evt.sinr, evt.rsrp, evt.rsrq, evt.ecio)
+            for sig, val in zip(UniversalParser.SignalColumns.metrics, values):
+                if val is not None:
+                    signal[sig][UniversalParser.classify([val], getattr(UniversalParser, sig.lower()))[0]] += 1
+
+        def addSignalColumns(self, columns):
+            signal = self._counts(columns.uid)['signal']
+            for sig, qualities in zip(columns.metrics, columns.getQualities()):
+                for quality in UniversalParser.qualities:
+                    signal[sig][quality] += qualities.count(quality)
+
+        def merge(self, other):
+            """Add the counts of the Summary of a later stretch of the log to this one"""
+            self.resets += other.resets
+            for uid, theirs in other.uids.items():
+                ours = self._counts(uid)
+                ours['disconnects'] += theirs['disconnects']
+                ours['unplugs'] += theirs['unplugs']
+                for sig in UniversalParser.SignalColumns.metrics:
+                    for quality in UniversalParser.qualities:
+                        ours['signal'][sig][quality] += theirs['signal'][sig][quality]
+                if theirs['head'] is None:
+                    continue
+                if ours['head'] is None:
+                    ours['head'] = theirs['head']
+                    ours['first'], ours['last'] = theirs['first'], theirs['last']
+                else:
+                    ours['connected'] += self._connected(ours['tail'], theirs['head'])
+                    ours['first'] = min(ours['first'], theirs['first'])
+                    ours['last'] = max(ours['last'], theirs['last'])
+                ours['connected'] += theirs['connected']
+                ours['tail'] = theirs['tail']
+
+        @staticmethod
+        def report(counts):
+            """Output counts of a uid: disconnects, unplugs and signal quality counts, the period from its first to
+               last connection event in time and the share of it spent connected (None without connection events)"""
+            ret = {'disconnects': counts['disconnects'], 'unplugs': counts['unplugs'], 'signal': counts['signal'],
+                   'period': None, 'uptime': None}
+            if counts['first'] is not None:
+                ret['period'] = [format_ts(counts['first']), format_ts(counts['last'])]
+                if counts['last'] != counts['first']:
+                    ret['uptime'] = counts['connected'] / (counts['last'] - counts['first'])
+            return ret
+
+        def asDict(self):
+            return {'resets': self.resets, 'uids': {uid: self.report(counts) for uid, counts in self.uids.items()}}
+
+        @staticmethod
+        def getCSVHeader():
+            return 'uid,from,to,unplugs,disconnects,uptime\n'
+
+        def getCSV(self):
+            """CSV rows of the uids with connection events, no header"""
+            ret = ''
+            for uid, counts in self.uids.items():
+                report = self.report(counts)
+                if report['period']:
+                    ret += '{},{},{},{},{},{}\n'.format(uid, report['period'][0], report['period'][1],
+                                                        report['unplugs'], report['disconnects'],
+                                                        '' if report['uptime'] is None else report['uptime'])
+            return ret
 
-        def getList(self):
-            return [self.dt, self.rssi, self.sinr, self.rsrp, self.rsrq, self.ecio, self.band]
+    class ParseResult:
+        """What parsing a stretch of the common log produces.  Also carries the state from one stretch to the next"""
+
+        def __init__(self, line_num=1, linedate=None):
+            self.sigDict = {}  # {uid: SignalColumns}
+            self.sigOrder = array('i')  # SignalColumns.index of every signal sample in log order, for CSV output
+            self.connDict = {}  # {uid: [WanEvent, ]}
+            self.connOrder = array('i')  # Position of the uid in connDict of every connection event in log order
+            self.connIndex = {}  # {uid: position in connDict}
+            self.line_num = line_num  # Number of the next line
+            self.linedate = linedate  # epoch seconds of the last line with a timestamp
+            self.undatedHead = False  # Lines without a timestamp came before the first one with, linedate mattered
+            # Only used for parallel parsing, see _parseChunkJob
+            self.concise = []  # [(line number, line), ]
+            self.reset_touched = False
+            self.reset_match = 0
+            self.translatorState = None
+            self.translatorUsed = False
+            self.aborted = False
+            self.profile = None  # The job's Profile with --profile
+            self.summary = UniversalParser.Summary()
+
+        def render(self, retType):
+            """Output in the requested format.  Events only get their datetimes/strings here"""
+            if retType in ['json', 'plot', 'csv']:
+                sig_data, conn_data = io.StringIO(), io.StringIO()
+                self.writeSignals('csv' if retType == 'csv' else 'json', sig_data)
+                self.writeConnections('csv' if retType == 'csv' else 'json', conn_data)
+                return sig_data.getvalue(), conn_data.getvalue()
+            if retType == 'dict':
+                return ({uid: self.sigDict[uid].getLists() for uid in self.sigDict},
+                        {uid: [evt.getList() for evt in self.connDict[uid]] for uid in self.connDict})
+
+        def write(self, retType, fd):
+            """Write the output of a csv, json or ndjson data file to fd as it is rendered, a chunk of rows at a time,
+               so the output text is never held whole.  csv and json have the signal quality part, the connection
+               state part and the summary, separated by newlines.  ndjson is one JSON object per event, signal and
+               connection events merged in time order, then the summary."""
+            if retType == 'ndjson':
+                self.writeEvents(fd)
+                fd.write(json.dumps(dict(event='summary', **self.summary.asDict())) + '\n')
+                return
+            self.writeSignals(retType, fd)
+            fd.write('\n')
+            self.writeConnections(retType, fd)
+            fd.write('\n')
+            if retType == 'json':
+                fd.write(json.dumps(self.summary.asDict()))
+            else:
+                fd.write(UniversalParser.Summary.getCSVHeader() + self.summary.getCSV())
+
+        def writeEvents(self, fd):
+            """The event rows of the ndjson output, without the summary"""
+            write_rows(fd, (json.dumps(event) + '\n' for ts, event in heapq.merge(
+                self.iterSigObjects(), self.iterConnObjects(), key=lambda item: item[0])))
+
+        def writeSignals(self, retType, fd):
+            """Signal quality part of the csv or json output.  CSV rows of all uids are interleaved back into log
+               order with sigOrder"""
+            if retType == 'json':
+                write_json_lists(fd, ((uid, columns.iterLists(run_format_ts()))
+                                      for uid, columns in self.sigDict.items()))
+                return
+            fd.write(UniversalParser.SignalEvent.getCSVHeader())
+            uidRows = [columns.iterLists(run_format_ts()) for columns in self.sigDict.values()]
+            uids = list(self.sigDict)
+            write_rows(fd, ('{},{},{},{},{},{},{},{}\n'.format(row[0], uids[index], *row[1:])
+                            for index, row in ((index, next(uidRows[index])) for index in self.sigOrder)))
+
+        def writeConnections(self, retType, fd):
+            """Connection state part of the csv or json output.  CSV rows are in log order, see connOrder"""
+            if retType == 'json':
+                write_json_lists(fd, ((uid, (evt.getList(run_format_ts()) for evt in events))
+                                      for uid, events in self.connDict.items()))
+                return
+            fd.write(UniversalParser.WanEvent.getCSVHeader())
+            uidEvents = [iter(events) for events in self.connDict.values()]
+            renderTime = run_format_ts()
+            write_rows(fd, (evt.getCSV(renderTime) for evt in (next(uidEvents[index]) for index in self.connOrder)))
+
+        def iterSigObjects(self):
+            """(ts, ndjson object) of every signal sample in log order"""
+            uidSamples = [zip(columns.ts, columns.iterLists(run_format_ts())) for columns in self.sigDict.values()]
+            uids = list(self.sigDict)
+            for index in self.sigOrder:
+                ts, row = next(uidSamples[index])
+                event = {'datetime': row[0], 'uid': uids[index], 'event': 'signal'}
+                for metric in row[1:]:
+                    event.update(metric)
+                yield ts, event
+
+        def iterConnObjects(self):
+            """(ts, ndjson object) of every connection event in log order"""
+            uidEvents = [iter(events) for events in self.connDict.values()]
+            renderTime = run_format_ts()
+            for index in self.connOrder:
+                evt = next(uidEvents[index])
+                yield evt.ts, {'datetime': renderTime(evt.ts), 'uid': evt.uid, 'event': 'connection',
+                               'state': evt.state, 'details': evt.details}
+
+        def addWanEvent(self, evt):
+            index = self.connIndex.get(evt.uid)
+            if index is None:
+                index = self.connIndex[evt.uid] = len(self.connDict)
+                self.connDict[evt.uid] = []
+            self.connDict[evt.uid].append(evt)
+            self.connOrder.append(index)
+
+        def extendWanEvents(self, other):
+            """Append the connection events of the ParseResult of a later stretch of the log"""
+            indexes = []
+            for uid, theirs in other.connDict.items():
+                index = self.connIndex.get(uid)
+                if index is None:
+                    index = self.connIndex[uid] = len(self.connDict)
+                    self.connDict[uid] = []
+                self.connDict[uid].extend(theirs)
+                indexes.append(index)
+            self.connOrder.extend(array('i', [indexes[index] for index in other.connOrder]))
+
+        def addSignal(self, evt):
+            columns = self.sigDict.get(evt.uid)
+            if columns is None:
+                columns = self.sigDict[evt.uid] = UniversalParser.SignalColumns(evt.uid, len(self.sigDict))
+            columns.append(evt)
+            self.sigOrder.append(columns.index)
+
+        def extendSignals(self, other):
+            """Append the signal samples of the ParseResult of a later stretch of the log"""
+            indexes = []
+            for uid, theirs in other.sigDict.items():
+                columns = self.sigDict.get(uid)
+                if columns is None:
+                    columns = self.sigDict[uid] = UniversalParser.SignalColumns(uid, len(self.sigDict))
+                columns.extend(theirs)
+                indexes.append(columns.index)
+            self.sigOrder.extend(array('i', [indexes[index] for index in other.sigOrder]))
+
+        def summarize(self):
+            """Add the signal quality counts to summary, once everything is parsed"""
+            for columns in self.sigDict.values():
+                self.summary.addSignalColumns(columns)
 
     class ResetEvent:
+        __slots__ = ('regex', 'reason')
 
         def __init__(self, regex=None, reason=None):
             self.regex = regex
             self.reason = reason
 
+    class LineEvent:
+        """An event of UniversalParser.events.  kind is 'wan', 'signal', 'reset' or 'rule', event the WanEvent,
+           SignalEvent or ResetEvent, or for 'rule' the name of the extra regex that matched.  line_num and line are
+           the common format line it was found in"""
+        __slots__ = ('kind', 'line_num', 'line', 'event')
+
+        def __init__(self, kind, line_num, line, event):
+            self.kind = kind
+            self.line_num = line_num
+            self.line = line
+            self.event = event
+
     @classmethod
     def _parseReset(cls, line):
         """Return information if a 'reset' type event is detected. This also attempts to determine the reason
                     that this reset event occurred"""
-        regexes = [
-            r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Resetting$',
-            r'^(\d*-\d*-\d* \d*:\d*:\d*).*cp_stack_mgr -- (.*):.*Device hard reset, hub (.*)$',
-            r'(\d*-\d*-\d* \d*:\d*:\d*).*usb (.*): USB disconnect, device number (.*)$'
-        ]
-        for index, regex in enumerate(regexes):
-            matchobj = re.match(regex, line)
+        for index, rgx in enumerate(cls.rgxResets):
+            matchobj = rgx.match(line)
             if matchobj:
+                regex = rgx.pattern
+                UniversalParser.reset_touched = True
                 if index == 0:
                     UniversalParser.reset_match = 1
                     return cls.ResetEvent(regex)
@@ -683,11 +2277,21 @@ class UniversalParser(object):
     # Example lines. Parse out time, uid, last state, new state, reason (if given)
     # 2019-04-19 03:37:05 192.168.0.1 S= INFO ﻿WAN:685ca069 -- connecting -> disconnecting
     # 2019-04-19 03:35:51 192.168.0.1 S= INFO ﻿WAN:686be2ac -- connecting -> connected, Reason: Failback
+    _detailsCache = {}
+
+    @classmethod
+    def _details(cls, key, value):
+        """The details dict for an event, shared by every event with the same details.  There are only a handful of
+           states and reasons, so this saves a dict per event"""
+        details = cls._detailsCache.get((key, value))
+        if details is None:
+            details = cls._detailsCache[(key, value)] = {key: sys.intern(value)}
+        return details
+
     @classmethod
     def _parseDevState(cls, line, debug):
         retEvt = None
-        rgxDevState = r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- (?!Service Change)(.*) -> (.*?)(?:, Reason: (.*))?$'
-        matchobj = re.match(rgxDevState, line)
+        matchobj = cls.rgxDevState.match(line)
         if matchobj:
             time = matchobj.group(1)
             uid = matchobj.group(2)
@@ -699,17 +2303,16 @@ class UniversalParser(object):
             reason = matchobj.group(5)
             # details = {'PrevState': prevstate}
             if reason:
-                details = {'Reason': reason}
+                details = cls._details('Reason', reason)
             else:
-                details = {'PrevState': prevstate}
+                details = cls._details('PrevState', prevstate)
             retEvt = cls.WanEvent(time, uid, state, details)
         return retEvt
 
     @classmethod
     def _parseUnplug(cls, line):
         retEvt = None
-        rgxUnplug = r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Unplugged$'
-        matchobj = re.match(rgxUnplug, line)
+        matchobj = cls.rgxUnplug.match(line)
         if matchobj:
             time = matchobj.group(1)
             uid = matchobj.group(2)
@@ -720,8 +2323,7 @@ class UniversalParser(object):
     @classmethod
     def _parsePlug(cls, line):
         retEvt = None
-        rgxPlug = r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Plug event: ok$'
-        matchobj = re.match(rgxPlug, line)
+        matchobj = cls.rgxPlug.match(line)
         if matchobj:
             time = matchobj.group(1)
             uid = matchobj.group(2)
@@ -733,13 +2335,12 @@ class UniversalParser(object):
     @classmethod
     def _parseConfigure(cls, line):
         retEvt = None
-        rgxConfig = r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Configure Event:(.*)$'
-        matchobj = re.match(rgxConfig, line)
+        matchobj = cls.rgxConfig.match(line)
         if matchobj:
             time = matchobj.group(1)
             uid = matchobj.group(2)
             state = "configure"
-            details = {'Reason': matchobj.group(3)}
+            details = cls._details('Reason', matchobj.group(3))
             if int(time[:4]) > 1970:
                 retEvt = cls.WanEvent(time, uid, state, details)
         return retEvt
@@ -747,75 +2348,253 @@ class UniversalParser(object):
     # Given a line return a SignalEvent with all relevant info
     @classmethod
     def _parseSignalQuality(cls, line):
-        """Detect signal quality log lines and interpret the data that is in them. The bounds for what determines
-        'Good', 'Poor', etc. are at the top of this class."""
+        """Detect signal quality log lines and pull out the values in them. What counts as 'Good', 'Poor', etc. is
+        decided with classify when output is made, the bounds are at the top of this class."""
         retEvt = None
-        time = None
-        uid = None
-        rgx_signal_quality = r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- \S*\s*signal(.*)'
-        re_end_str = r'{}:(.*)'  # RF band doesn't have parens
-        re_gen_sig_str = r'{}:(.*?)[\( ]'  # signal strings in middle of line all have the form: XXXX:<val>(unit)
-
-        sig_strs = {
-            # 'RFBAND':[re_end_str, None],
-            'RSSI': [re_gen_sig_str, cls.rssi],
-            'SINR': [re_gen_sig_str, cls.sinr],
-            'RSRP': [re_gen_sig_str, cls.rsrp],
-            'RSRQ': [re_gen_sig_str, cls.rsrq],
-            'ECIO': [re_gen_sig_str, cls.ecio],
-            'RFBAND': [re_end_str, None]
-        }
-        retDict = {
-            'rssi': {"RSSI": (None, None)},
-            'sinr': {"SINR": (None, None)},
-            'rsrp': {"RSRP": (None, None)},
-            'rsrq': {"RSRQ": (None, None)},
-            'ecio': {"ECIO": (None, None)},
-            'rfband': {"RFBAND": None}
-        }
-        matchobj = re.match(rgx_signal_quality, line)
+        matchobj = cls.rgxSignalQuality.match(line)
         if matchobj:
-            for sig_str in sig_strs:
-                time = matchobj.group(1)
-                uid = matchobj.group(2)
-                search_str = sig_strs[sig_str][0].format(sig_str)
-                match_str = re.search(search_str, matchobj.group(3), flags=0)
+            signal = matchobj.group(3)
+            nr = 'SS-' in signal or 'NRBAND' in signal or 'NR BAND' in signal
+            vals = []
+            for rgx in cls.rgxSignalValues:
+                match_str = rgx.search(signal)
+                while nr and match_str and signal[match_str.start() - 3:match_str.start()] == 'SS-':
+                    match_str = rgx.search(signal, match_str.end())  # SS-RSRP isn't the RSRP
                 if not match_str:
+                    vals.append(None)
                     continue
                 val = match_str.group(1)
-                if sig_str == 'RSSI' and val == '0':
+                if val == '0' and rgx is cls.rgxSignalValues[0]:  # RSSI
                     val = '-125'
-                limits = sig_strs[sig_str][1]
-                if not limits:
-                    retDict[sig_str.lower()] = {sig_str: val}
-                    continue
-                val_int = float(val)
-                if val_int >= limits[0]:
-                    quality = "Excellent"
-                elif val_int >= limits[1]:
-                    quality = "Good"
-                elif val_int >= limits[2]:
-                    quality = "Fair"
-                else:
-                    quality = "Poor"
+                vals.append(float(val))
+            match_str = cls.rgxSignalBand.search(signal)
+            vals.append(match_str.group(1) if match_str else None)
+            if nr:
+                cls._parseSignalNr(signal, vals, match_str)
+            retEvt = cls.SignalEvent(matchobj.group(1), matchobj.group(2), *vals)
+        return retEvt
 
-                retDict[sig_str.lower()] = {sig_str: (val_int, quality)}
+    @classmethod
+    def _parseSignalNr(cls, signal, vals, bandmatch):
+        """Add the 5G NR values (SS-RSRP, SS-SINR, SS-RSRQ, NR band) of a signal line to its vals, and cut the RF band
+        (bandmatch, it runs to the end of the line) before the NR fields"""
+        starts = []
+        for rgx in cls.rgxSignalNrValues:
+            match_str = rgx.search(signal)
+            vals.append(float(match_str.group(1)) if match_str else None)
+            if match_str:
+                starts.append(match_str.start())
+        match_str = cls.rgxSignalNrBand.search(signal)
+        vals.append(match_str.group(1) if match_str else None)
+        if match_str:
+            starts.append(match_str.start())
+        ends = [start for start in starts if bandmatch and start > bandmatch.start()]
+        if ends:
+            vals[5] = signal[bandmatch.start(1):min(ends)].rstrip(', ')
 
-            retEvt = cls.SignalEvent(time, uid, retDict['rssi'], retDict['sinr'],
-                                     retDict['rsrp'], retDict['rsrq'], retDict['ecio'], retDict['rfband'])
-        return retEvt
+    @classmethod
+    def classify(cls, values, limits):
+        """Quality of each value in a sequence of floats against limits (see the bounds at the top of this class),
+        None for NaN.  Done for a whole column in one vectorized pass when numpy is installed."""
+        if numpy is not None and len(values):
+            column = numpy.asarray(values, dtype=numpy.float64)
+            index = (column < limits[0]).astype(numpy.int8) + (column < limits[1]) + (column < limits[2])
+            index[numpy.isnan(column)] = 4
+            return numpy.array(cls.qualities + [None], dtype=object)[index].tolist()
+        qualities = cls.qualities
+        excellent, good, fair = limits
+        return [None if val != val else qualities[(val < excellent) + (val < good) + (val < fair)] for val in values]
 
     @classmethod
     def _parseOtherRegEx(cls, line, extra_regexes=None):
         """Captures ERROR level events and any line not starting with a number (usually detail lines relating to errors)
-           Add any other regular expressions that should always be put in concise log file here"""
-        # Add any extra regular expressions passed to the function
+           and the lines of the --regex rules.  Returns the name of the rule that matched, or None"""
         if extra_regexes:
-            for extra in extra_regexes:
-                matchobj = re.search(extra, line)
-                if matchobj:
-                    return True
-        return False
+            return extra_regexes.match(line)
+        return None
+
+    @classmethod
+    def _firstEvent(cls, line):
+        """Return the index (in parseFuncs) of the first event parse function that can match the line, or the index of
+           _parseOtherRegEx if no event pattern matches.  Every event needs one of the literals below, so most lines
+           cost a few substring checks.  Only lines that really are events go through the combined pattern."""
+        if ('WAN:' in line and cls.rgxWanEvent.match(line)) or 'Device hard reset' in line or \
+                'USB disconnect' in line:
+            matchobj = cls.rgxEvents.match(line)
+            if matchobj:
+                return cls.eventIndex[matchobj.lastgroup]
+        return cls.otherIndex
+
+    @classmethod
+    def _iterEvents(cls, lines, extra_args, extra_regexes, result):
+        """The parse loop.  Runs every line of lines through the parse functions, yielding (kind, line number, line,
+           event) for each match: 'wan' with a WanEvent, 'signal' with a SignalEvent, 'reset' with a ResetEvent or
+           'rule' with the name of the extra regex.  result holds the line number/date to start from, and gets them
+           back when the lines are done."""
+        # Functions in list below are tried in order on every line in range, starting from the first that can match
+        # Every function will return either WanEvent or SignalEvent, which have the same methods
+        parseFuncs = [cls._parseDevState, cls._parseUnplug, cls._parsePlug, cls._parseConfigure,
+                      cls._parseSignalQuality, cls._parseReset, cls._parseOtherRegEx]
+        firstEvent = cls._firstEvent
+        parseTs = parse_ts
+        profile = extra_args.get('profile')
+        if profile:
+            parseFuncs = [profile.wrap(func.__name__, func) for func in parseFuncs]
+            firstEvent = profile.wrap('_firstEvent', firstEvent, cls.otherIndex)
+            parseTs = profile.wrap('parse_ts', parseTs)
+            lines = profile.lines('parse.translate', lines)
+        parseDevState, parseSignalQuality, parseReset, parseOtherRegEx = (parseFuncs[0], parseFuncs[4],
+                                                                          parseFuncs[5], parseFuncs[6])
+        kinds = dict.fromkeys(parseFuncs, 'wan')
+        kinds.update({parseSignalQuality: 'signal', parseReset: 'reset', parseOtherRegEx: 'rule'})
+        # Functions left to try when the first possible match is parseFuncs[i].  Earlier ones are known not to match
+        funcsFrom = [parseFuncs[i:] for i in range(len(parseFuncs))]
+        allMatches = extra_args['format'] == 'csv'  # A line can be a connection event and a signal sample in csv
+        debug = extra_args['debug']
+        line_num = result.line_num
+        linedate = result.linedate  # epoch seconds of the last line with a timestamp
+        date_from, date_to = [dt_to_ts(dt) for dt in extra_args['date_range']]
+        try:
+            for line in lines:
+                if '0' < line[0] < '9':
+                    linedate = parseTs(line[:19])
+                elif linedate is None:
+                    result.undatedHead = True
+                if linedate is not None and date_from < linedate < date_to:
+                    for func in funcsFrom[firstEvent(line)]:
+                        if func is parseDevState:
+                            evt = parseDevState(line, debug)
+                        elif func is parseOtherRegEx:
+                            evt = parseOtherRegEx(line, extra_regexes) if extra_regexes else None
+                        else:
+                            evt = func(line)
+                        if evt:  # If evt not None, we've got a new event to add
+                            kind = kinds[func]
+                            yield kind, line_num, line, evt
+                            if kind == 'rule' or kind == 'reset' or not allMatches:
+                                break
+                line_num += 1
+        finally:  # Also when the consumer stops early
+            result.line_num = line_num
+            result.linedate = linedate
+
+    @classmethod
+    def _parseLines(cls, lines, extra_args, extra_regexes, result, concise):
+        """Parse lines with _iterEvents, writing matches with concise(line number, line) and adding events to result,
+           which also holds the line number/date to start from."""
+        addSignal = result.addSignal
+        addWanEvent = result.addWanEvent
+        summary = result.summary
+        for kind, line_num, line, evt in cls._iterEvents(lines, extra_args, extra_regexes, result):
+            if kind == 'rule':
+                concise(line_num, '[{}] {}'.format(evt, line))
+                continue
+            concise(line_num, line)
+            if kind == 'reset':
+                summary.resets += 1
+            elif kind == 'signal':  # Signal samples go in columns whatever the format
+                addSignal(evt)
+            else:
+                summary.addWanEvent(evt)
+                addWanEvent(evt)
+        return result
+
+    @classmethod
+    def _parseChunked(cls, log, extra_args, extra_regexes, ranges, jobs):
+        """Parse the byte ranges of the log in a process pool, then stitch the results together in file order.
+           Every chunk is parsed as if it were the start of the file.  State that crosses a chunk boundary (the
+           reset_match state machine, the date of undated lines, translator state such as the NCM 1969 correction) is
+           then carried over in order, and any chunk whose output depended on the state it started with is parsed
+           again with the right state.  Those are rare, reset sequences and 1969 runs are only a few lines long."""
+        translatorClass = log._fileFormat
+        default = (None, 0, translatorClass().getState())
+        workerArgs = {'format': extra_args['format'], 'debug': extra_args['debug'],
+                      'date_range': extra_args['date_range']}
+        if extra_args.get('profile'):
+            workerArgs['profile'] = True  # Each job gets its own Profile, merged below
+        keepNames = [None] * len(ranges)
+        if log._commonFD:
+            for i in range(len(ranges)):
+                keepFD, keepNames[i] = tempfile.mkstemp(prefix='common_chunk_')
+                os.close(keepFD)
+        chunkJobs = [(log.logFileName, translatorClass.FORMAT, start, end, default, workerArgs, extra_regexes,
+                      keepNames[i]) for i, (start, end) in enumerate(ranges)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=registerFormats, initargs=(LOADED_FORMATS,)) as pool:
+            results = list(pool.map(_parseChunkJob, chunkJobs))
+
+        merged = cls.ParseResult()
+        linedate, reset_match, translatorState = default
+        for job, result in zip(chunkJobs, results):
+            if (result.undatedHead and linedate is not None) or (result.reset_touched and reset_match != 0) or \
+                    (result.translatorUsed and translatorState != default[2]):
+                # Parsed with the wrong starting state, do it again with the real one
+                result = _parseChunkJob(job[:4] + ((linedate, reset_match, translatorState),) + job[5:])
+                linedate, reset_match, translatorState = result.linedate, result.reset_match, result.translatorState
+            else:
+                if result.linedate is not None:
+                    linedate = result.linedate
+                if result.reset_touched:
+                    reset_match = result.reset_match
+                if result.translatorUsed:
+                    translatorState = result.translatorState
+                else:
+                    translatorState = translatorClass.chainState(translatorState, result.translatorState)
+
+            for line_num, line in result.concise:
+                extra_args['fd_concise'].write("{} - {}".format(line_num + merged.line_num - 1, line))
+            merged.line_num += result.line_num - 1
+            merged.extendSignals(result)
+            merged.extendWanEvents(result)
+            merged.summary.merge(result.summary)
+            if result.profile:
+                extra_args['profile'].merge(result.profile)
+            if result.aborted:
+                break
+
+        UniversalParser.reset_match = reset_match
+        for keepName in keepNames:
+            if keepName:
+                with open(keepName) as keepFD:
+                    shutil.copyfileobj(keepFD, log._commonFD)
+                os.remove(keepName)
+        return merged
+
+    @classmethod
+    def _parseCached(cls, log, extra_args, extra_regexes, cache):
+        """parseResult through a ParseCache, adding the log to it first if it isn't there"""
+        entry = cache.load(log)
+        if entry is None:
+            entry = cache.store(log)
+        if log._commonFD:
+            log._commonFD.seek(0)
+            log._commonFD.truncate()
+            with open(entry['common']) as commonFD:
+                shutil.copyfileobj(commonFD, log._commonFD)
+        fd_concise = extra_args['fd_concise']
+
+        def concise(line_num, line):
+            fd_concise.write("{} - {}".format(line_num, line))
+
+        result = cls.ParseResult()
+        candidates = entry['candidates']
+        for start, end, first_line, linedate, end_line in cache.blocks(entry, extra_args['date_range']):
+            if extra_regexes:
+                result.line_num = first_line
+                result.linedate = linedate
+                cls._parseLines(readLines(entry['common'], start, end), extra_args, extra_regexes, result, concise)
+                continue
+            # Only event lines can give output, parse just those, at their line number and date
+            first = bisect.bisect_left(candidates, (first_line,))
+            last = bisect.bisect_left(candidates, (end_line,))
+            for line_num, linedate, line in candidates[first:last]:
+                result.line_num = line_num
+                result.linedate = linedate
+                cls._parseLines((line,), extra_args, extra_regexes, result, concise)
+        result.line_num = entry['line_num']
+        result.linedate = entry['linedate']
+        result.aborted = entry['aborted']
+        result.summarize()
+        return result
 
     # Main parsing funcion
     # Given file name parse it and return the specified format
@@ -823,67 +2602,120 @@ class UniversalParser(object):
     # Output is {uid:[[time,state,details],],}
     @classmethod
     def parseLog(cls, log, extra_args):
-        retTypes = ['dict', 'csv', 'plot', 'json']
-        error_regexes = [r'^(\d*-\d*-\d* \d*:\d*:\d*).*ERROR (.*) -- (.*):(.*)',
-                         r'^[^0-9].*']
+        return cls.parseResult(log, extra_args).render(extra_args['format'])
+
+    @classmethod
+    def extraRegexes(cls, extra_args):
+        """Check the output format and compile the extra regexes, followed by the error ones when -e is given, into
+           RegexRules.  extra_regex entries are (name, pattern) pairs, or patterns, named regex1, regex2..."""
+        retTypes = ['dict', 'csv', 'plot', 'json', 'ndjson', 'bin']
+        error_regexes = [('error', r'^(\d*-\d*-\d* \d*:\d*:\d*).*ERROR (.*) -- (.*):(.*)'),
+                         ('error-detail', r'^[^0-9].*')]
         if extra_args['format'] not in retTypes:
             raise ValueError(' retType must be in {}'.format(retTypes))
-        # Every function in list below will be executed on every line
-        # Every function will return either WanEvent or SignalEvent, which have the same methods
-        parseFuncs = [cls._parseDevState, cls._parseUnplug, cls._parsePlug, cls._parseConfigure,
-                      cls._parseSignalQuality, cls._parseReset, cls._parseOtherRegEx]
-        log.reset()
-        retConnCSV = cls.WanEvent.getCSVHeader()  # Start building string of all parsed data in CSV output format
-        retSigCSV = cls.SignalEvent.getCSVHeader()
-        retSigDict = {}
-        retConnDict = {}
-        line_num = 1
-        flag = 0
-        linedate = None
-        evt = None
-        for line in log:
-            if '0' < line[0] < '9':
-                linedate = datetime.strptime(line[:19], '%Y-%m-%d %H:%M:%S')
-            if linedate and extra_args['date_range'][0] < linedate < extra_args['date_range'][1]:
-                for func in parseFuncs:
-                    if func == cls._parseDevState:
-                        evt = cls._parseDevState(line, extra_args['debug'])
-                    elif func == cls._parseOtherRegEx and (extra_args['error_logging'] or extra_args['extra_regex']):
-                        if extra_args['error_logging'] and not flag:
-                            flag = 1
-                            for extra in error_regexes:
-                                extra_args['extra_regex'].append(extra)
-                        evt = cls._parseOtherRegEx(line, extra_args['extra_regex'])
-                    elif func != cls._parseOtherRegEx:
-                        evt = func(line)
-                    if evt:  # If evt not None, we've got a new event to add
-                        extra_args['fd_concise'].write("{} - {}".format(line_num, line))
-                        if func == cls._parseReset or func == cls._parseOtherRegEx:
-                            break
-                        if extra_args['format'] == 'csv':  # Building CSV output
-                            if func == cls._parseSignalQuality:
-                                retSigCSV += evt.getCSV()
-                            else:
-                                retConnCSV += evt.getCSV()
-                        if extra_args['format'] in ['dict', 'plot', 'json']:  # Here we're building dictionary output
-                            if func == cls._parseSignalQuality:
-                                if evt.uid not in retSigDict:
-                                    retSigDict[evt.uid] = []
-                                retSigDict[evt.uid].append(evt.getList())
-                            else:
-                                if evt.uid not in retConnDict:
-                                    retConnDict[evt.uid] = []
-                                retConnDict[evt.uid].append(evt.getList())
-                            break
-            line_num += 1
-        log.reset()
-        # Return format
-        if extra_args['format'] == 'json' or extra_args['format'] == 'plot':
-            return json.dumps(retSigDict, default=format_dt), json.dumps(retConnDict, default=format_dt)
-        if extra_args['format'] == 'csv':
-            return retSigCSV, retConnCSV
-        if extra_args['format'] == 'dict':
-            return retSigDict, retConnDict
+        extras = [extra if isinstance(extra, (tuple, list)) else ('regex{}'.format(number), extra)
+                  for number, extra in enumerate(extra_args['extra_regex'], 1)]
+        if extra_args['error_logging']:
+            extras += error_regexes
+        return RegexRules(extras)
+
+    @classmethod
+    def events(cls, lines, log_format=None, debug=False, date_range=None, extra_regex=(), error_logging=False,
+               all_matches=False, sinks=()):
+        """Parse lines as they are read, yielding a LineEvent for every event.  For using the parser from other code:
+           nothing is written or kept, so memory doesn't grow with the log, unless a sink keeps something.  lines is a
+           LogFile (opened here if it isn't), an iterable of common format lines, or of lines of the log_format
+           translator (a --format name).  The other options are those of the command line: debug (-d), date_range as
+           [from, to] datetimes (--fromto), extra_regex patterns or (name, pattern) pairs (--regex), error_logging
+           (-e), and all_matches to get every event of a line, not only the first, like -o csv does.
+
+           Every sink gets add(event) for each event before it is yielded, and close() after the last line (see
+           ConciseSink, NdjsonSink and ResultSink).  The reset sequence state is the class's reset_match, so parse
+           one log at a time per process."""
+        if isinstance(lines, LogFile):
+            if lines._sourceFD is None:
+                lines.open()
+            lines.reset()
+        elif log_format:
+            lines = translateLines(lines, TRANSLATORS[log_format]())
+        extra_args = {'format': 'csv' if all_matches else 'json', 'debug': debug, 'error_logging': error_logging,
+                      'extra_regex': list(extra_regex), 'date_range': date_range or [datetime.min, datetime.max]}
+        extra_regexes = cls.extraRegexes(extra_args)
+        UniversalParser.reset_match = 0
+        LineEvent = cls.LineEvent
+        for kind, line_num, line, evt in cls._iterEvents(lines, extra_args, extra_regexes, cls.ParseResult()):
+            event = LineEvent(kind, line_num, line, evt)
+            for sink in sinks:
+                sink.add(event)
+            yield event
+        for sink in sinks:
+            sink.close()
+
+    @classmethod
+    def parseResult(cls, log, extra_args):
+        """parseLog without the output formatting.  Returns the ParseResult, which also has the event summary"""
+        extra_regexes = cls.extraRegexes(extra_args)
+        UniversalParser.reset_match = 0  # Not where the last log of the process left it (--batch workers, --cache)
+        if extra_args.get('cache'):
+            return cls._parseCached(log, extra_args, extra_regexes, extra_args['cache'])
+
+        jobs = extra_args.get('jobs', 1)
+        ranges = log.chunkRanges(jobs * 4) if jobs > 1 and log.chunkable else []
+        if len(ranges) > 1:
+            result = cls._parseChunked(log, extra_args, extra_regexes, ranges, jobs)
+        else:
+            fd_concise = extra_args['fd_concise']
+
+            def concise(line_num, line):
+                fd_concise.write("{} - {}".format(line_num, line))
+
+            log.reset()
+            lines = pipelineLines(log) if extra_args.get('pipeline') else log
+            result = cls._parseLines(lines, extra_args, extra_regexes, cls.ParseResult(), concise)
+            log.reset()
+        result.summarize()
+        return result
+
+
+def _parseRange(fileName, translator, start, end, extra_args, extra_regexes, result, concise, keepFD=None):
+    """Translate the lines of a byte range of a log file with translator and parse them, adding to result.  result
+       holds the state to start from (line number, date, reset_match) and gets the state at the end."""
+    UniversalParser.reset_match = result.reset_match
+    UniversalParser.reset_touched = False
+
+    def translatedLines():
+        for translated_line in translateRange(fileName, translator, start, end):
+            if keepFD:
+                keepFD.write(translated_line)
+            yield translated_line
+
+    UniversalParser._parseLines(translatedLines(), extra_args, extra_regexes, result, concise)
+    result.reset_touched = UniversalParser.reset_touched
+    result.reset_match = UniversalParser.reset_match
+    result.translatorState = translator.getState()
+    result.translatorUsed = translator.stateUsed
+    result.aborted = translator.abort
+    return result
+
+
+def _parseChunkJob(job):
+    """Process pool worker for parseLog with --jobs.  Translate and parse one byte range of a log file, starting from
+       the given (linedate, reset_match, translator state).  Concise lines are numbered from 1 within the chunk."""
+    fileName, fileFormat, start, end, entry, extra_args, extra_regexes, keepName = job
+    linedate, reset_match, translatorState = entry
+    if extra_args.get('profile'):
+        extra_args = dict(extra_args, profile=Profile())
+    translator = TRANSLATORS[fileFormat]()
+    translator.setState(translatorState)
+    keepFD = open(keepName, 'w') if keepName else None
+    result = UniversalParser.ParseResult(1, linedate)
+    result.reset_match = reset_match
+    _parseRange(fileName, translator, start, end, extra_args, extra_regexes, result,
+                lambda line_num, line: result.concise.append((line_num, line)), keepFD)
+    if keepFD:
+        keepFD.close()
+    result.profile = extra_args.get('profile')
+    return result
 
 
 def generate_data(data, fileout=True, fd=None):
@@ -927,30 +2759,568 @@ def generate_data(data, fileout=True, fd=None):
             print(data[0])
 
 
-def parseall(logfile, extra_args):
-    """Calls all the necessary helper functions with the correct arguments"""
-    data = []
+def parseall(logfile, extra_args, shortname=None):
+    """Calls all the necessary helper functions with the correct arguments.  Returns the event summary"""
     sig = UniversalParser()
     # Parse the log with provided arguments, generates signal quality and connection state data objects
-    sig_data, conn_data = sig.parseLog(logfile, extra_args)
+    with profileStage(extra_args, 'parse'):
+        result = sig.parseResult(logfile, extra_args)
+    with profileStage(extra_args, 'output'):
+        writeoutput(result, extra_args, logfile.logFileName, shortname)
+    return result.summary
+
+
+def writeoutput(result, extra_args, logFileName, shortname=None):
+    """Write the signal quality and connection state data of a ParseResult to the data file, or the html plot"""
+    data = []
+    if extra_args["format"] in ['csv', 'json', 'ndjson']:
+        # Written as it is rendered
+        result.write(extra_args["format"], extra_args["fd_data"])
+        return
+    if extra_args["format"] == 'bin':
+        ResultFile.save(result, extra_args["fd_data"], logFileName, shortname or shortName(logFileName))
+        return
     if extra_args["format"] == 'plot':
+        with profileStage(extra_args, 'output.plotdata'):
+            sig_data, conn_data, sigLevels = plotdata(result, shortname or shortName(logFileName))
         data.append(sig_data)
         data.append(conn_data)
-        createhtml(logfile.logFileName, data)
+        data.append(json.dumps(result.summary.asDict()))
+        with profileStage(extra_args, 'output.createhtml'):
+            createhtml(logFileName, data, shortname, sigLevels)
+        return
+    sig_data, conn_data = result.render(extra_args["format"])
+    data.append(sig_data)
+    # Generate output data file
+    generate_data(data, True, extra_args["fd_data"])
+    extra_args["fd_data"].write("\n")
+    data.append(conn_data)
+    data.clear()
+    data.append(conn_data)
+    # Append connection state data to output file
+    generate_data(data, True, extra_args["fd_data"])
+    extra_args["fd_data"].write("\n")
+    data.clear()
+    data.append(json.dumps(result.summary.asDict()))
+    generate_data(data, True, extra_args["fd_data"])
+
+
+# First line of every concise file
+CONCISE_HEADER = '[Line Number in common log (use -k to keep)] - [Time][IP][Level][Source][Info]\n'
+
+
+class ConciseSink(object):
+    """UniversalParser.events sink writing the concise log to fd, like parsing a file does: the header, then
+       '(line number) - (line)' for every event, with [rule] before the line for a match of an extra regex"""
+
+    def __init__(self, fd, header=True):
+        self.fd = fd
+        if header:
+            fd.write(CONCISE_HEADER)
+
+    def add(self, event):
+        if event.kind == 'rule':
+            self.fd.write('{} - [{}] {}'.format(event.line_num, event.event, event.line))
+        else:
+            self.fd.write('{} - {}'.format(event.line_num, event.line))
+
+    def close(self):
+        pass
+
+
+class NdjsonSink(object):
+    """UniversalParser.events sink writing the connection events and signal samples to fd as -o ndjson does, a JSON
+       object per event as it comes (in log order, not merged by time), then the summary.  Only the summary counts
+       are kept, unlike ResultSink"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.summary = UniversalParser.Summary()
+        self.renderTime = run_format_ts()
+
+    def add(self, event):
+        evt = event.event
+        if event.kind == 'wan':
+            self.summary.addWanEvent(evt)
+            self.fd.write(json.dumps({'datetime': self.renderTime(evt.ts), 'uid': evt.uid, 'event': 'connection',
+                                      'state': evt.state, 'details': evt.details}) + '\n')
+        elif event.kind == 'signal':
+            self.summary.addSignal(evt)
+            row = evt.getList(self.renderTime)
+            obj = {'datetime': row[0], 'uid': evt.uid, 'event': 'signal'}
+            for metric in row[1:]:
+                obj.update(metric)
+            self.fd.write(json.dumps(obj) + '\n')
+        elif event.kind == 'reset':
+            self.summary.resets += 1
+
+    def close(self):
+        self.fd.write(json.dumps(dict(event='summary', **self.summary.asDict())) + '\n')
+
+
+class ResultSink(object):
+    """UniversalParser.events sink collecting the events in a ParseResult (result), which renders every -o format.
+       Given retType, that output is written on close: to fd for the formats with a data file, the html plot named
+       after shortname or logFileName"""
+
+    def __init__(self, retType=None, fd=None, logFileName='log', shortname=None):
+        self.retType = retType
+        self.fd = fd
+        self.logFileName = logFileName
+        self.shortname = shortname
+        self.result = UniversalParser.ParseResult()
+
+    def add(self, event):
+        if event.kind == 'wan':
+            self.result.summary.addWanEvent(event.event)
+            self.result.addWanEvent(event.event)
+        elif event.kind == 'signal':
+            self.result.addSignal(event.event)
+        elif event.kind == 'reset':
+            self.result.summary.resets += 1
+
+    def close(self):
+        self.result.summarize()
+        if self.retType:
+            writeoutput(self.result, {'format': self.retType, 'fd_data': self.fd}, self.logFileName, self.shortname)
+
+
+def dataFileMode(retType):
+    """open() mode of the data file of an output format"""
+    return 'wb' if retType == 'bin' else 'w+'
+
+
+def loadfile(resultFileName, other_args):
+    """Write the data file or html plot of a result file saved with -o bin, without parsing the log again.  Files
+       are named after the log the result came from.  Returns the ResultFile"""
+    if other_args["format"] == 'bin':
+        raise Exception("{} is already a result file, use --load with another -o".format(resultFileName))
+    with profileStage(other_args, 'load'):
+        resultFile = ResultFile(resultFileName)
+        result = resultFile.parseResult()
+    extra_args = dict(other_args, fd_data=False)
+    if other_args["format"] != 'plot':
+        extra_args["fd_data"] = open("data_{}.{}".format(resultFile.shortname, other_args["format"]), 'w+')
+    with profileStage(other_args, 'output'):
+        writeoutput(result, extra_args, resultFile.logFileName, resultFile.shortname)
+    if extra_args["fd_data"]:
+        extra_args["fd_data"].close()
+    return resultFile
+
+
+def parsefile(logFileName, other_args, keep=False, shortname=None):
+    """Detect the format of one log file (unless other_args has a log_format) and parse it, writing data_, concise_
+       and html output named after shortname (default the file name).  Returns the event summary, the format and the
+       detection confidence"""
+    if shortname is None:
+        shortname = shortName(logFileName)
+    lf = LogFile(logFileName, other_args.get("log_format"))
+    with profileStage(other_args, 'detect'):
+        lf.open(keep)
+    fd_data = False
+    # Only create the data file if a different output format is specified
+    if other_args["format"] != 'plot':
+        fd_data = open("data_{}.{}".format(shortname, other_args["format"]), dataFileMode(other_args["format"]))
+    fd_concise = open("concise_{}".format(shortname), 'w+')
+    # Create a header on the concise log file
+    fd_concise.write(CONCISE_HEADER)
+    extra_args = dict(other_args, fd_data=fd_data, fd_concise=fd_concise,
+                      extra_regex=list(other_args["extra_regex"]))
+    # Begin Parsing
+    summary = parseall(lf, extra_args, shortname)
+    if other_args.get("profile"):
+        other_args["profile"].countTranslator(lf)
+
+    lf.reset()
+    lf.close()
+    if fd_data:
+        fd_data.close()
+    fd_concise.close()
+    return summary, lf._fileFormat.__name__, lf.formatConfidence
+
+
+def mergefiles(logFileNames, other_args, keep=False, shortname='merged'):
+    """Parse several logs as one timeline (see mergeLogs), writing data_, concise_ and html output named after
+       shortname, and common_ with -k.  Each log's format is detected unless other_args has a log_format.  Returns the
+       event summary"""
+    logs = [LogFile(logFileName, other_args.get("log_format")) for logFileName in logFileNames]
+    for log in logs:
+        log.open()
+    lines = mergeLogs(logs, [shortName(name) for name in batchnames(logFileNames)])
+    commonFD = open("common_{}".format(shortname), 'w') if keep else None
+    if commonFD:
+        def keptLines(lines):
+            for line in lines:
+                commonFD.write(line)
+                yield line
+        lines = keptLines(lines)
+    fd_data = None
+    if other_args["format"] != 'plot':
+        fd_data = open("data_{}.{}".format(shortname, other_args["format"]), dataFileMode(other_args["format"]))
+    fd_concise = open("concise_{}".format(shortname), 'w')
+    sink = ResultSink(other_args["format"], fd_data, ' + '.join(logFileNames), shortname)
+    for _ in UniversalParser.events(lines, debug=other_args["debug"], date_range=other_args["date_range"],
+                                    extra_regex=other_args["extra_regex"],
+                                    error_logging=other_args["error_logging"],
+                                    all_matches=other_args["format"] == 'csv', sinks=[ConciseSink(fd_concise), sink]):
+        pass
+    for log in logs:
+        log.close()
+    for fd in [commonFD, fd_data, fd_concise]:
+        if fd:
+            fd.close()
+    return sink.result.summary
+
+
+# Output files of this script, skipped when a batch directory or glob picks them up
+OUTPUT_PREFIXES = ('data_', 'concise_', 'common_', 'checkpoint_', 'fleet_summary', 'plot_')
+
+
+def batchfiles(pattern):
+    """Log files in a directory, or matching a glob pattern (** for subdirectories).  Every file in a zip archive is
+       a log of its own (see splitArchivePath)"""
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
     else:
-        data.append(sig_data)
-        # Generate output data file
-        generate_data(data, True, extra_args["fd_data"])
-        extra_args["fd_data"].write("\n")
-        data.append(conn_data)
-        data.clear()
-        data.append(conn_data)
-        # Append connection state data to output file
-        generate_data(data, True, extra_args["fd_data"])
+        paths = glob.glob(pattern, recursive=True)
+    logs = []
+    for path in paths:
+        if os.path.isfile(path) and zipfile.is_zipfile(path):
+            logs.extend(path + '/' + member for member in archiveMembers(path))
+        elif os.path.isfile(path):
+            logs.append(path)
+    return sorted(path for path in logs
+                  if not os.path.basename(path).startswith(OUTPUT_PREFIXES) and not path.endswith('.html'))
+
+
+def batchnames(paths):
+    """Output names for the batch files.  The file name, unless two files share it, then the path below the common
+       directory with / replaced by _"""
+    basenames = [os.path.basename(path) for path in paths]
+    if len(paths) > 1:
+        root = os.path.commonpath([os.path.abspath(path) for path in paths])
+    names = []
+    for path, basename in zip(paths, basenames):
+        if basenames.count(basename) > 1:
+            names.append(os.path.relpath(os.path.abspath(path), root).replace(os.sep, '_'))
+        else:
+            names.append(basename)
+    return names
+
+
+def _parseBatchFile(job):
+    """Process pool worker for parsebatch.  A file that can't be parsed is reported in the summary, not raised"""
+    logFileName, shortname, other_args, keep = job
+    try:
+        summary, fileFormat, confidence = parsefile(logFileName, other_args, keep, shortname)
+    except Exception as e:
+        return {'file': logFileName, 'error': str(e)}
+    return dict(summary.asDict(), file=logFileName, format=fileFormat, confidence=round(confidence, 3))
+
+
+def parsebatch(pattern, other_args, keep=False, jobs=1):
+    """Parse every log file of a directory or glob, one file per worker process, and write fleet_summary.json with
+       the disconnects, unplugs, resets and signal quality counts of each router/uid.  Never opens a browser."""
+    paths = batchfiles(pattern)
+    if not paths:
+        raise Exception("No log files found for {}".format(pattern))
+    names = batchnames(paths)
+    # Each file is parsed in a single process, the pool is already busy with other files
+    fileArgs = dict(other_args, jobs=1)
+    batchJobs = [(path, name, fileArgs, keep) for path, name in zip(paths, names)]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=registerFormats, initargs=(LOADED_FORMATS,)) as pool:
+        routers = dict(zip(names, pool.map(_parseBatchFile, batchJobs)))
+
+    totals = {'routers': len(routers), 'failed': 0, 'disconnects': 0, 'unplugs': 0, 'resets': 0}
+    for name, router in routers.items():
+        if 'error' in router:
+            totals['failed'] += 1
+            print("{}: {}".format(router['file'], router['error']))
+            continue
+        totals['resets'] += router['resets']
+        for counts in router['uids'].values():
+            totals['disconnects'] += counts['disconnects']
+            totals['unplugs'] += counts['unplugs']
+    with open('fleet_summary.json', 'w') as fd:
+        json.dump({'totals': totals, 'routers': routers}, fd, indent=1)
+    return totals
+
+
+def _lastLineEnd(fileName, start, end):
+    """Byte offset just past the last newline between start and end, start if there is none.  Searches backwards, so
+       only the incomplete last line is read."""
+    with open(fileName, 'rb') as fd:
+        pos = end
+        while pos > start:
+            block = max(start, pos - 65536)
+            fd.seek(block)
+            newline = fd.read(pos - block).rfind(b'\n')
+            if newline >= 0:
+                return block + newline + 1
+            pos = block
+    return start
+
+
+# A pass that didn't rewrite the data file or html of a followed log (they are rewritten whole, ndjson aside) is
+# written once at least FOLLOW_REWRITE_FACTOR times as long as the last rewrite took has gone by since it ended
+FOLLOW_REWRITE_FACTOR = 10
+
+
+def _loadCheckpoint(checkpointName, logFileName, options, files):
+    """The saved follow progress for logFileName, or None if there is none that fits: other options, the log was
+       replaced or truncated since, or one of files ({checkpoint key: file name}, the files the checkpoint goes on
+       writing) is missing or shorter than the size the checkpoint has for it"""
+    try:
+        with open(checkpointName, 'rb') as fd:
+            checkpoint = pickle.load(fd)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None
+    if checkpoint.get('options') != options or os.path.getsize(logFileName) < checkpoint['offset']:
+        return None
+    with open(logFileName, 'rb') as fd:
+        if fd.read(len(checkpoint['head'])) != checkpoint['head']:
+            return None
+    for key, fileName in files.items():
+        if not os.path.isfile(fileName) or os.path.getsize(fileName) < checkpoint[key]:
+            print("{} is missing or shorter than when {} was saved, starting over".format(fileName, checkpointName))
+            return None
+    return checkpoint
+
+
+def _loadFollowEvents(eventsName, size):
+    """The ParseResult of the events of every follow pass saved in the first size bytes of eventsName"""
+    result = UniversalParser.ParseResult()
+    with open(eventsName, 'rb') as fd:
+        while fd.tell() < size:
+            part = pickle.load(fd)
+            result.extendSignals(part)
+            result.extendWanEvents(part)
+    return result
+
+
+def followfile(logFileName, other_args, keep=False, interval=2.0):
+    """Parse a log file that is still being written, like the WANTester syslog-listener output, then keep parsing
+       what is appended to it every interval seconds until interrupted.  Only complete lines are read.  The concise
+       (and common) files are appended to.  So is an ndjson data file, its summary line is written again after the
+       new rows; other data files and the html are rewritten whole, at most as often as FOLLOW_REWRITE_FACTOR lets.
+       The parse state is saved to checkpoint_{filename} after every pass with new lines, and the events of the pass
+       appended to checkpoint_{filename}.events for the outputs that are rewritten whole, so following again with the
+       same options resumes where it stopped instead of starting over."""
+    shortname = shortName(logFileName)
+    if not isPlainFile(logFileName):
+        raise Exception("{} is compressed or in an archive, only plain log files can be followed".format(logFileName))
+    lf = LogFile(logFileName, other_args.get("log_format"))
+    lf.open()  # Only to detect the format, lines are read by byte offset from here on
+    lf.close()
+    translatorClass = lf._fileFormat
+    if not lf.chunkable:
+        raise Exception("{} logs can't be followed, their lines depend on the whole file".format(
+            translatorClass.__name__))
+    extra_args = dict(other_args, jobs=1)
+    extra_regexes = UniversalParser.extraRegexes(extra_args)
+    options = {key: other_args[key] for key in ['format', 'debug', 'error_logging', 'extra_regex', 'date_range']}
+    options.update(translator=translatorClass.__name__, keep=keep)
+    appendData = extra_args["format"] == 'ndjson'
+
+    checkpointName = "checkpoint_{}".format(shortname)
+    eventsName = checkpointName + '.events'
+    conciseName, commonName = "concise_{}".format(shortname), "common_{}".format(shortname)
+    dataName = "data_{}.{}".format(shortname, extra_args["format"])
+    files = {'concise': conciseName}
+    if keep:
+        files['common'] = commonName
+    files.update({'data': dataName} if appendData else {'events': eventsName})
+    checkpoint = _loadCheckpoint(checkpointName, logFileName, options, files)
+    if checkpoint:
+        print("Resuming {} from byte {}".format(logFileName, checkpoint['offset']))
+        mode = 'r+'
+    else:
+        checkpoint = {'options': options, 'offset': 0, 'head': b'', 'line_num': 1, 'linedate': None,
+                      'reset_match': 0, 'translatorState': translatorClass().getState(),
+                      'summary': UniversalParser.Summary(), 'concise': 0, 'common': 0, 'data': 0, 'events': 0}
+        mode = 'w+'
+    # Drop what was written after the checkpoint was saved
+    fds = {key: open(fileName, mode) for key, fileName in files.items() if key != 'events'}
+    if 'events' in files:
+        fds['events'] = open(eventsName, mode + 'b')
+    for key, fd in fds.items():
+        fd.seek(checkpoint[key])
+        fd.truncate()
+    fd_concise, keepFD = fds['concise'], fds.get('common')
+    if not checkpoint['concise']:
+        # Create a header on the concise log file
+        fd_concise.write(CONCISE_HEADER)
+    summary = checkpoint['summary']
+    result = None
+    if not appendData:
+        result = _loadFollowEvents(eventsName, checkpoint['events'])
+        result.summary = summary
+
+    def concise(line_num, line):
+        fd_concise.write("{} - {}".format(line_num, line))
+
+    rewriteEnd, rewriteSeconds = 0.0, 0.0
+
+    def rewrite():
+        nonlocal rewriteEnd, rewriteSeconds
+        start = time.monotonic()
+        if extra_args["format"] == 'plot':
+            writeoutput(result, extra_args, logFileName, shortname)
+        else:
+            with open(dataName, dataFileMode(extra_args["format"])) as fd_data:
+                writeoutput(result, dict(extra_args, fd_data=fd_data), logFileName, shortname)
+        rewriteEnd = time.monotonic()
+        rewriteSeconds = rewriteEnd - start
+
+    print("Following {}, Ctrl+C to stop\n".format(logFileName))
+    first = True
+    pending = False  # New lines the rewritten outputs don't have yet
+    try:
+        while True:
+            offset = checkpoint['offset']
+            end = _lastLineEnd(logFileName, offset, os.path.getsize(logFileName))
+            if end > offset or first:
+                # Only this pass's events are parsed into part, the state comes from the checkpoint
+                part = UniversalParser.ParseResult(checkpoint['line_num'], checkpoint['linedate'])
+                part.reset_match = checkpoint['reset_match']
+                part.summary = summary
+                translator = translatorClass()
+                translator.setState(checkpoint['translatorState'])
+                _parseRange(logFileName, translator, offset, end, extra_args, extra_regexes, part, concise, keepFD)
+                part.summarize()
+                if appendData:
+                    fd_data = fds['data']
+                    fd_data.seek(checkpoint['data'])
+                    fd_data.truncate()
+                    part.writeEvents(fd_data)
+                    fd_data.flush()
+                    checkpoint['data'] = os.fstat(fd_data.fileno()).st_size
+                    fd_data.write(json.dumps(dict(event='summary', **summary.asDict())) + '\n')
+                else:
+                    result.extendSignals(part)
+                    result.extendWanEvents(part)
+                    part.summary = None  # Saved in the checkpoint
+                    pickle.dump(part, fds['events'])
+                    pending = True
+                for fd in fds.values():
+                    fd.flush()
+                with open(logFileName, 'rb') as fd:
+                    checkpoint['head'] = fd.read(min(end, 1024))
+                checkpoint.update(offset=end, line_num=part.line_num, linedate=part.linedate,
+                                  reset_match=part.reset_match, translatorState=part.translatorState,
+                                  **{key: os.fstat(fd.fileno()).st_size for key, fd in fds.items() if key != 'data'})
+                with open(checkpointName + '.tmp', 'wb') as fd:
+                    pickle.dump(checkpoint, fd)
+                os.replace(checkpointName + '.tmp', checkpointName)
+                if part.aborted:
+                    print("Parsing stopped early, see above")
+                    break
+            elif os.path.getsize(logFileName) < offset:
+                print("{} got shorter, it was replaced or truncated.  Delete {} to start over".format(
+                    logFileName, checkpointName))
+                break
+            if pending and (first or time.monotonic() - rewriteEnd >= FOLLOW_REWRITE_FACTOR * rewriteSeconds):
+                rewrite()
+                pending = False
+            if first and extra_args["format"] == 'plot':
+                webbrowser.open('{}.html'.format(shortname))
+            first = False
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pending:
+            rewrite()
+        for fd in fds.values():
+            fd.close()
 
 
 # Creates the html file that will display the data
-def createhtml(filename, data):
+# Signal samples of a uid are downsampled for the html plot when there are more than 2 * PLOT_BUCKETS of them.  Level 0
+# splits the log period into PLOT_BUCKETS buckets, each level below splits every bucket of the one above in PLOT_ZOOM.
+PLOT_BUCKETS = 1000
+PLOT_ZOOM = 8
+
+
+def bucketpicks(columns, indexes):
+    """The samples that keep the shape of the samples at indexes (in time order) in a plot: the first, the last, and
+       the lowest and highest value of every metric.  In time order"""
+    picks = {indexes[0], indexes[-1]}
+    for column in columns.values:
+        values = [(column[i], i) for i in indexes if column[i] == column[i]]
+        if values:
+            picks.add(min(values)[1])
+            picks.add(max(values)[1])
+    ts = columns.ts
+    return sorted(picks, key=lambda i: (ts[i], i))
+
+
+def plotlevels(columns):
+    """Downsampled levels of the signal samples of one uid, for the html plot.  Level L has PLOT_ZOOM ** L tiles, each
+       a PLOT_BUCKETS bucket slice of the log period, holding the bucketpicks of every bucket.  The last level is deep
+       enough for its tiles to hold every sample, about 2 * PLOT_BUCKETS each.  Returns (start, span, levels,
+       {(level, tile): [sample index, ]}), indexes in time order.  Levels is 0 when there are too few samples to need
+       downsampling."""
+    count = len(columns)
+    ts = columns.ts
+    order = sorted(range(count), key=ts.__getitem__)
+    start = ts[order[0]] if count else 0
+    span = max(ts[order[-1]] - start, 1) if count else 1
+    levels = 0
+    while count > 2 * PLOT_BUCKETS * PLOT_ZOOM ** levels:
+        levels += 1
+    if not levels:
+        return start, span, 0, {(0, 0): order}
+
+    def runs(parts):
+        """Split order into runs of samples in the same of parts equal slices of the log period, {part: [index, ]}"""
+        ret = {}
+        for i in order:
+            ret.setdefault(min((ts[i] - start) * parts // span, parts - 1), []).append(i)
+        return ret
+
+    tiles = {(levels, tile): indexes for tile, indexes in runs(PLOT_ZOOM ** levels).items()}
+    buckets = {bucket: bucketpicks(columns, indexes)
+               for bucket, indexes in runs(PLOT_BUCKETS * PLOT_ZOOM ** (levels - 1)).items()}
+    for level in range(levels - 1, -1, -1):
+        for bucket in sorted(buckets):
+            tiles.setdefault((level, bucket // PLOT_BUCKETS), []).extend(buckets[bucket])
+        if level:
+            parents = {}
+            for bucket in sorted(buckets):
+                parents.setdefault(bucket // PLOT_ZOOM, []).extend(buckets[bucket])
+            buckets = {bucket: bucketpicks(columns, indexes) for bucket, indexes in parents.items()}
+    return start, span, levels, tiles
+
+
+def plotdata(result, shortname):
+    """The signal quality and connection state JSON of the html plot, and the downsampling levels (see plotlevels) of
+       the uids that have them.  The signal JSON has level 0 of those, the finer levels are written to
+       {shortname}_plot/plot_{uid number}_{level}_{tile}.js for the page to load as it is zoomed in"""
+    tileDir = "{}_plot".format(shortname)
+    if os.path.isdir(tileDir):
+        shutil.rmtree(tileDir)
+    sigLevels = {}
+    sig_data = {}
+    for index, (uid, columns) in enumerate(result.sigDict.items()):
+        start, span, levels, tiles = plotlevels(columns)
+        if not levels:
+            sig_data[uid] = columns.iterLists(run_format_ts())
+            continue
+        sigLevels[uid] = {'index': index, 'start': start, 'span': span, 'levels': levels}
+        sig_data[uid] = columns.iterLists(run_format_ts(), tiles.pop((0, 0)))
+        os.makedirs(tileDir, exist_ok=True)
+        for (level, tile), indexes in tiles.items():
+            with open(os.path.join(tileDir, "plot_{}_{}_{}.js".format(index, level, tile)), 'w') as fd:
+                fd.write("sigTile({}, {}, {}, {});\n".format(
+                    index, level, tile, json.dumps(list(columns.iterLists(run_format_ts(), indexes)))))
+    sig_fd, conn_fd = io.StringIO(), io.StringIO()
+    write_json_lists(sig_fd, sig_data.items())
+    result.writeConnections('json', conn_fd)
+    return sig_fd.getvalue(), conn_fd.getvalue(), sigLevels
+
+
+def createhtml(filename, data, shortname=None, sigLevels=None):
     html = """<!DOCTYPE html>
         <html lang="en">
 
@@ -1034,6 +3404,90 @@ def createhtml(filename, data):
               <div id="connPlot" style="margin-left: 50%;"></div>
             </div>
             <script>
+            //Signal samples of uids with many of them are downsampled, see plotlevels in UniversalLogParser.py.
+            //The page has level 0, finer levels are loaded from sigTileDir as the plot is zoomed in
+            var sigLevels = {};
+            var sigTileDir = {};
+            var sigTiles = {{}};
+            function sigTile(uidIndex, level, tile, rows) {{
+              sigTiles[uidIndex + '_' + level + '_' + tile] = rows;
+            }}
+            //Load plot_{{name}}.js, a tile with no samples has no file
+            function loadTile(name) {{
+              return new Promise((resolve) => {{
+                if (sigTiles[name]) {{
+                  resolve();
+                  return;
+                }}
+                var script = document.createElement('script');
+                script.src = encodeURIComponent(sigTileDir) + '/plot_' + name + '.js';
+                script.onload = resolve;
+                script.onerror = resolve;
+                document.head.appendChild(script);
+              }});
+            }}
+            //'YYYY-mm-dd HH:MM:SS' from the plot axis to naive epoch seconds, like the python script's
+            function stampSeconds(stamp) {{
+              stamp = String(stamp);
+              return Date.parse(stamp.substring(0, 10) + 'T' + (stamp.substring(11, 23) || '00:00:00') + 'Z') / 1000;
+            }}
+            function sigArrays(rows) {{
+              var arrays = {{dates: [], rssi: [], sinr: [], rsrp: [], rsrq: [], bands: []}};
+              for (var i = 0; i < rows.length; i++) {{
+                arrays.dates.push(rows[i][0]);
+                arrays.rssi.push(rows[i][1]['RSSI'][0]);
+                arrays.sinr.push(rows[i][2]['SINR'][0]);
+                arrays.rsrp.push(rows[i][3]['RSRP'][0]);
+                arrays.rsrq.push(rows[i][4]['RSRQ'][0]);
+                arrays.bands.push(rows[i][6]['RFBAND']);
+              }}
+              return arrays;
+            }}
+            //Swap in the level that has about a plot width of buckets for the zoomed range, level 0 when zoomed out
+            function zoomSignals(plotId, levels, coarse) {{
+              var shown = '0';
+              var requests = 0;
+              document.getElementById(plotId).on('plotly_relayout', async function(event) {{
+                var range = event['xaxis.range'] || [event['xaxis.range[0]'], event['xaxis.range[1]']];
+                var rows = coarse;
+                var want = '0';
+                if (range[0] !== undefined && range[1] !== undefined) {{
+                  var from = stampSeconds(range[0]) - levels.start;
+                  var to = stampSeconds(range[1]) - levels.start;
+                  var level = Math.min(levels.levels,
+                                       Math.max(0, Math.floor(Math.log(levels.span / (to - from)) / Math.log({}))));
+                  if (level > 0) {{
+                    var tiles = Math.pow({}, level);
+                    var first = Math.max(0, Math.floor(from * tiles / levels.span) - 1);
+                    var last = Math.min(tiles - 1, Math.floor(to * tiles / levels.span) + 1);
+                    want = level + '_' + first + '_' + last;
+                    var names = [];
+                    for (var tile = first; tile <= last; tile++) {{
+                      names.push(levels.index + '_' + level + '_' + tile);
+                    }}
+                  }}
+                }}
+                else if (!event['xaxis.autorange']) {{
+                  return;
+                }}
+                if (want == shown) {{
+                  return;
+                }}
+                var request = ++requests;
+                if (want != '0') {{
+                  await Promise.all(names.map(loadTile));
+                  if (request != requests) {{
+                    return;
+                  }}
+                  rows = [].concat(...names.map(name => sigTiles[name] || []));
+                }}
+                shown = want;
+                var arrays = sigArrays(rows);
+                Plotly.restyle(plotId, {{x: [arrays.dates, arrays.dates, arrays.dates, arrays.dates],
+                                        y: [arrays.rssi, arrays.rsrp, arrays.rsrq, arrays.sinr],
+                                        text: [arrays.bands, arrays.bands, arrays.bands, arrays.bands]}}, [0, 1, 2, 3]);
+              }});
+            }}
             function Open() {{
                 window.open("usb_log.txt.html", "_blank");
             }}
@@ -1065,6 +3519,7 @@ def createhtml(filename, data):
                   var text = await readFileAsync(event);
                   sessionStorage.setItem("text0", text[0]);
                   sessionStorage.setItem("text1", text[1]);
+                  sessionStorage.setItem("text2", text[2] || "");
                   window.open(window.location.pathname, "_blank");
                 }} catch (err) {{
                   console.log(err);
@@ -1083,6 +3538,7 @@ def createhtml(filename, data):
                   var text = await readFileAsync(event, fromload);
                   sessionStorage.setItem("text0", text[0]);
                   sessionStorage.setItem("text1", text[1]);
+                  sessionStorage.setItem("text2", text[2] || "");
                   window.open(window.location.pathname, "_blank");
                 }} catch (err) {{
                   console.log(err);
@@ -1092,11 +3548,12 @@ def createhtml(filename, data):
               // Data in the page so that it will display on load
               if (fromload) {{
                 if(sessionStorage.getItem("text0")) {{
-                  var text = [sessionStorage.getItem("text0"),sessionStorage.getItem("text1")];
+                  var text = [sessionStorage.getItem("text0"),sessionStorage.getItem("text1"),
+                              sessionStorage.getItem("text2")];
                   fromload = 0;  
                 }}
                 else {{
-                    var text = [{},{}];
+                    var text = [{},{},{}];
                 }}
               }}
               var dates = [];
@@ -1125,9 +3582,12 @@ def createhtml(filename, data):
               if (fromload) {{
                 var sigQualObj = text[0];
                 var connStateObj = text[1];
+                var summaryObj = text[2];
               }} else {{
                 var sigQualObj = JSON.parse(text[0]);
                 var connStateObj = JSON.parse(text[1]);
+                //json files from before the summary was added don't have it
+                var summaryObj = JSON.parse(text[2] || '{{"uids": {{}}}}');
               }}
               //Clear header table 
               if (document.getElementById("header_table").rows.length > 1) {{
@@ -1239,11 +3699,8 @@ def createhtml(filename, data):
                                                          'toggleSpikelines',
                                                          'hoverClosestCartesian',
                                                          'hoverCompareCartesian'], displaylogo: false}});
-                var state_counts = {{}};
-                for (var i = 0; i < states.length; i++) {{
-                  var num = states[i];
-                  state_counts[num] = state_counts[num] ? state_counts[num] + 1 : 1;
-                }}
+                //Header table from the summary the python script worked out while parsing
+                var counts = summaryObj['uids'][uids[index]] || {{}};
                 var table = document.getElementById("header_table");
                 var row = table.insertRow(index+1);
                 var cell1 = row.insertCell(0);
@@ -1252,34 +3709,10 @@ def createhtml(filename, data):
                 var cell4 = row.insertCell(3);
                 var cell5 = row.insertCell(4);
                 cell1.innerHTML = uids[index];
-                cell2.innerHTML = dates[0] + " - " + dates[dates.length - 1];
-                if(state_counts[0] === undefined) {{
-                    cell3.innerHTML = 0;
-                }}
-                else {{
-                    cell3.innerHTML = state_counts[0];
-                }}
-                if(state_counts[3] === undefined) {{
-                    cell4.innerHTML = 0;
-                }}
-                else {{
-                    cell4.innerHTML = state_counts[3];
-                }}
-                var connected_time = 0;
-                let absolute_start = new Date(dates[0]);
-                let absolute_end = new Date(dates[dates.length - 1]);
-                let total_time = absolute_end - absolute_start;
-                for (var i = 0; i < states.length; i++) {{
-                    if (states[i] == 8) {{
-                        if (dates[i] != dates[dates.length - 1]) {{
-                            let start_date = new Date(dates[i]);
-                            let end_date = new Date(dates[i+1]);
-                            connected_time += (end_date - start_date);
-                        }}
-                    }}
-                }}
-                let uptime = connected_time/total_time;
-                cell5.innerHTML = (uptime * 100).toFixed(2) + "%";
+                cell2.innerHTML = counts['period'] ? counts['period'][0] + " - " + counts['period'][1] : "";
+                cell3.innerHTML = counts['unplugs'] === undefined ? "" : counts['unplugs'];
+                cell4.innerHTML = counts['disconnects'] === undefined ? "" : counts['disconnects'];
+                cell5.innerHTML = counts['uptime'] == null ? "" : (counts['uptime'] * 100).toFixed(2) + "%";
                 dates.length = 0;
                 states.length = 0;
                 reasons.length = 0;
@@ -1480,6 +3913,9 @@ def createhtml(filename, data):
                                                          'toggleSpikelines',
                                                          'hoverClosestCartesian',
                                                          'hoverCompareCartesian'], displaylogo: false}});
+                if (fromload && sigLevels[uids[index]]) {{
+                  zoomSignals('sigPlot' + uids[index], sigLevels[uids[index]], sigQualObj[uids[index]]);
+                }}
                 rssi_vals.length = 0;
                 sinr_vals.length = 0;
                 rsrp_vals.length = 0;
@@ -1494,8 +3930,10 @@ def createhtml(filename, data):
 
           </body>
         </html>
-        """.format(filename, data[0], data[1])
-    fd = open("{}.html".format(filename.split("/")[-1]), 'w')
+        """.format(filename, json.dumps(sigLevels or {}),
+                   json.dumps("{}_plot".format(shortname or filename.split("/")[-1])), PLOT_ZOOM, PLOT_ZOOM,
+                   data[0], data[1], data[2])
+    fd = open("{}.html".format(shortname or filename.split("/")[-1]), 'w')
     fd.write(html)
     fd.close()
 
@@ -1510,10 +3948,14 @@ if __name__ == "__main__":
     # Arguments added using argparse package
     parser = argparse.ArgumentParser(description=help_str)
     parser.add_argument('filename', nargs='?', help='name of log file to parse')
-    parser.add_argument('-o', default='plot', help='Output format. plot, dict, csv, or json(default plot).\n Only'
-                                                   ' plot creates a webpage plot. The other options generate a data '
-                                                   'file in the specified format. json outputs are plottable from the'
-                                                   '"choose a different file to plot" button on the page')
+    parser.add_argument('-o', default='plot', help='Output format. plot, dict, csv, json, ndjson or bin(default '
+                                                   'plot).\n'
+                                                   ' Only plot creates a webpage plot. The other options generate a '
+                                                   'data file in the specified format. json outputs are plottable '
+                                                   'from the "choose a different file to plot" button on the page. '
+                                                   'ndjson has one JSON object per event, in time order. bin '
+                                                   'saves the parse result in a binary file that --load renders '
+                                                   'again without the log')
     parser.add_argument('-k', default=False, action='store_const', const=True, help='Keep the common format log file. '
                                                                                     'This is useful since line numbers in the concise output refrence the common log format')
     parser.add_argument('-d', default=False, action='store_const', const=True, help='Use if there are debug lines in '
@@ -1523,6 +3965,9 @@ if __name__ == "__main__":
     parser.add_argument('--regex', default=False, action='store_const', const=True, help='Use to enter a menu '
                                                                                          'where additional regular '
                                                                                          'expressions can be supplied')
+    parser.add_argument('--regex-file', help='File of more regular expressions for the concise log file, one per '
+                                             'line, or a name, a tab and the expression.  Concise lines they match '
+                                             'start with [name]')
     parser.add_argument('--fromto', nargs='*', help='Specify a date and time range in the form {from} - {to}'
                                                     'Where {from} and/or {to} are of the form '
                                                     '(year)-(month)-(day) (24-hour):(minute):(second)'
@@ -1530,7 +3975,52 @@ if __name__ == "__main__":
                                                     'MUST STILL HAVE THE DASH '
                                                     'Ex: --fromto 2019-04-24 13:03:43 - 2019-04-25 02:22:15 '
                                                     'Ex: --fromto - 2020-07-17 13:21:44')
+    parser.add_argument('--format', help='Format of the log file ({}, or one from --format-file), skips detecting '
+                                         'it. Use when a log is detected as the wrong format'.format(
+                                             ', '.join(TRANSLATORS)))
+    parser.add_argument('--format-file', help='JSON file of more log formats, {name: spec}.  See compileSpec and '
+                                              'FORMAT_SPECS in UniversalLogParser.py for what a spec has')
+    parser.add_argument('--jobs', type=int, default=1, help='Parse with this many processes. Pieces of the log are '
+                                                            'translated and parsed in parallel, which helps on very '
+                                                            'large logs')
+    parser.add_argument('--pipeline', default=False, action='store_const', const=True,
+                        help='Translate the log in a second process while this one parses it, so reading, '
+                             'decompressing and translating overlap with the parse.  For one process, --jobs '
+                             'splitting the log takes over from it')
+    parser.add_argument('--batch', help='Parse every log in this directory or glob (quote it) instead of one file. '
+                                        'Writes the usual files for each log and a fleet_summary.json with the '
+                                        'disconnects, unplugs, resets and signal quality of each router/uid. '
+                                        '--jobs logs are parsed at a time, no browser is opened')
+    parser.add_argument('--cache', default=False, action='store_const', const=True,
+                        help='Keep the translated log and its event lines in a cache, so parsing the same file again '
+                             '(with any options) is much faster')
+    parser.add_argument('--cache-dir', help='Cache directory (default ~/.cache/UniversalLogParser)')
+    parser.add_argument('--cache-size', type=int, default=2048, help='Cache size limit in MB, least recently used '
+                                                                     'logs are removed past it (default 2048)')
+    parser.add_argument('--follow', default=False, action='store_const', const=True,
+                        help='Keep parsing what is appended to the log (e.g. a WANTester syslog-listener file) '
+                             'until Ctrl+C.  Progress is saved to checkpoint_{filename}, following again with the '
+                             'same options resumes from there')
+    parser.add_argument('--merge', nargs='+', metavar='FILE',
+                        help='Parse these logs as one timeline instead of one file, e.g. the router UI export, NCM '
+                             'log, USB log and syslog of an incident.  Their lines are merged by time, each tagged '
+                             'with [its file name] after the timestamp.  The output files are named merged')
+    parser.add_argument('--load', help='Write the -o output of a data_{filename}.bin result file saved with -o bin, '
+                                       'instead of parsing a log')
+    parser.add_argument('--interval', type=float, default=2.0, help='Seconds between checks for new lines with '
+                                                                    '--follow (default 2)')
+    parser.add_argument('--profile', nargs='?', const='-', help='Report where the time went: wall and CPU time of '
+                                                                'each stage, calls, matches and time of each parse '
+                                                                'function, and the lines each translator missed. '
+                                                                'To stderr, or as JSON to the file given')
     args = parser.parse_args()
+    if args.format_file:
+        loadFormats(args.format_file)
+    if args.format and args.format not in TRANSLATORS:
+        parser.error('argument --format: invalid choice: {!r} (choose from {})'.format(
+            args.format, ', '.join(TRANSLATORS)))
+    if args.profile and (args.batch or args.follow or args.merge):
+        parser.error('--profile works on one log file or --load')
     # Determining if the date range supplied has lower and/or upper bounds
     if args.fromto:
         if args.fromto[0] == '-':
@@ -1546,7 +4036,7 @@ if __name__ == "__main__":
         startdate = datetime.min
         enddate = datetime.max
     print("Running...\n\n")
-    if args.filename:
+    if args.filename or args.batch or args.load or args.merge:
         logFileName = args.filename
     else:
         logFileName = input("Enter log file name: ")
@@ -1560,39 +4050,42 @@ if __name__ == "__main__":
                 break
             else:
                 extra_regex.append(entry)
-    fd_data = False
-    fd_concise = False
-
-    lf = LogFile(logFileName)
-    lf.open(args.k)
-
-    if '/' in logFileName:
-        shortname = logFileName.split("/")[-1]
-    else:
-        shortname = logFileName
-    # Only create the data file if a different output format is specified
-    if args.o != 'plot':
-        fd_data = open("data_{}.{}".format(shortname, args.o), 'w+')
-    fd_concise = open("concise_{}".format(shortname), 'w+')
-    # Create a header on the concise log file
-    fd_concise.write('[Line Number in common log (use -k to keep)] - [Time][IP][Level][Source][Info]\n')
+    if args.regex_file:
+        extra_regex += loadRegexFile(args.regex_file)
     other_args = {
         "format": args.o,
         "debug": args.d,
         "error_logging": args.e,
-        "fd_data": fd_data,
-        "fd_concise": fd_concise,
         "extra_regex": extra_regex,
-        "date_range": [startdate, enddate]
+        "date_range": [startdate, enddate],
+        "jobs": args.jobs,
+        "pipeline": args.pipeline,
+        "log_format": args.format,
+        "cache": ParseCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache else None,
+        "profile": Profile() if args.profile else None
     }
-    # Begin Parsing
-    parseall(lf, other_args)
-    # Open the edited html file in browser
-    webbrowser.open('{}.html'.format(shortname))
-
-    lf.reset()
-    lf.close()
-    if fd_data:
-        fd_data.close()
-    fd_concise.close()
+    if args.batch:
+        totals = parsebatch(args.batch, other_args, args.k, args.jobs)
+        print("Parsed {} of {} logs: {} disconnects, {} unplugs, {} resets. See fleet_summary.json\n\n".format(
+            totals['routers'] - totals['failed'], totals['routers'], totals['disconnects'], totals['unplugs'],
+            totals['resets']))
+    elif args.merge:
+        mergefiles(args.merge, other_args, args.k)
+        if args.o == 'plot':
+            webbrowser.open('merged.html')
+    elif args.follow:
+        followfile(logFileName, other_args, args.k, args.interval)
+    elif args.load:
+        resultFile = loadfile(args.load, other_args)
+        if args.o == 'plot':
+            webbrowser.open('{}.html'.format(resultFile.shortname))
+    else:
+        parsefile(logFileName, other_args, args.k)
+        # Open the edited html file in browser
+        webbrowser.open('{}.html'.format(shortName(logFileName)))
+    if args.profile == '-':
+        other_args["profile"].report(sys.stderr)
+    elif args.profile:
+        with open(args.profile, 'w') as fd:
+            json.dump(other_args["profile"].asDict(), fd, indent=1)
     print("Complete\n\n")
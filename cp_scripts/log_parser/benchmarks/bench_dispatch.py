@@ -0,0 +1,104 @@
+"""Benchmark for the UniversalParser.parseLog line dispatcher.
+
+Generates a synthetic common-format log and reports lines/second for the old per-line cascade (every parse function
+runs re.match with a pattern string on every line) and for parseLog's keyword-gated dispatcher.
+
+usage: python3 bench_dispatch.py [--lines N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UniversalLogParser import UniversalParser  # noqa: E402
+
+# Roughly what a router log looks like: mostly noise, an event every few dozen lines
+NOISE = ['{} 192.168.0.1 S= INFO ﻿kernel -- [ 71.060060] ltc4266 0-002f: pse core: registered port 0\n',
+         '{} 192.168.0.1 S= INFO ﻿cp_stack_mgr -- INFO  ncm_intel_modem.c(2544) int1: step: 219,  status: 0\n',
+         '{} 192.168.0.1 S= INFO ﻿httpserver -- Accepted web login from local address 192.168.0.5\n',
+         '{} 192.168.0.1 S= DEBUG ﻿udhcpc[4977] -- Received DHCP offer\n',
+         '{} 192.168.0.1 S= INFO ﻿WAN:685ca069 -- Service Change: modem is now on LTE\n']
+EVENTS = ['{} 192.168.0.1 S= INFO ﻿WAN:685ca069 -- connecting -> connected, Reason: Failback\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:685ca069 -- signal Internal 10M-B on port int1: SS: 82%, RSSI:-84(dBm), '
+          'SINR:1.0(dB), RSRP:-107(dB), RSRQ:-8(dB), RFBAND: Band 12, Service: LTE\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:685ca069 -- Unplugged\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:685ca069 -- Plug event: ok\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:685ca069 -- Resetting\n']
+
+
+def synthetic_lines(count):
+    """Yield count common-format lines, one event every 40 lines, one second apart every 10 lines"""
+    start = datetime(2019, 4, 19, 3, 37, 5)
+    for i in range(count):
+        stamp = (start + timedelta(seconds=i // 10)).strftime('%Y-%m-%d %H:%M:%S')
+        if i % 40 == 0:
+            yield EVENTS[(i // 40) % len(EVENTS)].format(stamp)
+        else:
+            yield NOISE[i % len(NOISE)].format(stamp)
+
+
+class ListLog(object):
+    """Minimal stand-in for LogFile over a list of common format lines"""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def reset(self):
+        pass
+
+
+LEGACY_PATTERNS = [r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- (?!Service Change)(.*) -> (.*?)(?:, Reason: (.*))?$',
+                   r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Unplugged$',
+                   r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Plug event: ok$',
+                   r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Configure Event:(.*)$',
+                   r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- \S*\s*signal(.*)',
+                   r'^(\d*-\d*-\d* \d*:\d*:\d*).*WAN:(.*) -- Resetting$',
+                   r'^(\d*-\d*-\d* \d*:\d*:\d*).*cp_stack_mgr -- (.*):.*Device hard reset, hub (.*)$',
+                   r'(\d*-\d*-\d* \d*:\d*:\d*).*usb (.*): USB disconnect, device number (.*)$']
+
+
+def legacy_cascade(lines, date_range):
+    """The dispatch cost of parseLog before the dispatcher: strptime and every pattern string on every line"""
+    hits = 0
+    for line in lines:
+        linedate = datetime.strptime(line[:19], '%Y-%m-%d %H:%M:%S')
+        if date_range[0] < linedate < date_range[1]:
+            for pattern in LEGACY_PATTERNS:
+                if re.match(pattern, line):
+                    hits += 1
+                    break
+    return hits
+
+
+def dispatcher(lines, date_range):
+    extra_args = {'format': 'dict', 'debug': False, 'error_logging': False, 'extra_regex': [],
+                  'date_range': date_range, 'fd_concise': open(os.devnull, 'w')}
+    UniversalParser.parseLog(ListLog(lines), extra_args)
+    extra_args['fd_concise'].close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the parseLog line dispatcher')
+    parser.add_argument('--lines', type=int, default=10000000, help='Number of synthetic lines (default 10M)')
+    args = parser.parse_args()
+
+    print('Generating {} lines...'.format(args.lines))
+    lines = list(synthetic_lines(args.lines))
+    date_range = [datetime.min, datetime.max]
+
+    for name, func in [('legacy cascade', legacy_cascade), ('dispatcher', dispatcher)]:
+        start = time.perf_counter()
+        func(lines, date_range)
+        elapsed = time.perf_counter() - start
+        print('{:>15}: {:8.2f} s  {:12,.0f} lines/s'.format(name, elapsed, len(lines) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Memory benchmark for the parsed event objects.
+
+Parses a synthetic log where every line is an event (state changes, unplugs, configure events and signal readings)
+and reports the memory tracemalloc sees held by the parse result, and the peak while parsing.  The same events are
+also built as the old event objects (a datetime and a date string per event, a copy of the details dict, nested
+{'RSSI': (value, quality)} dicts per signal reading, all in instance __dict__s) for comparison.
+
+The log lines are generated while parsing, so they are not part of either number.
+
+usage: python3 bench_memory.py [--events N]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from copy import copy
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UniversalLogParser import UniversalParser  # noqa: E402
+
+UIDS = ['685ca069', '47025ecf', '46d497c6']
+EVENTS = ['{} 192.168.0.1 S= INFO ﻿WAN:{} -- connecting -> connected, Reason: Failback\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:{} -- connected -> disconnected\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:{} -- signal Internal 10M-B on port int1: SS: 82%, RSSI:-84(dBm), '
+          'SINR:1.0(dB), RSRP:-107(dB), RSRQ:-8(dB), RFBAND: Band 12, Service: LTE\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:{} -- Unplugged\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:{} -- Configure Event: modem reconfigured\n',
+          '{} 192.168.0.1 S= INFO ﻿WAN:{} -- signal Internal 10M-B on port int1: SS: 60%, RSSI:-71(dBm), '
+          'SINR:14.0(dB), RSRP:-95(dB), RSRQ:-12(dB), RFBAND: Band 2, Service: LTE\n']
+
+
+def synthetic_lines(count):
+    """Yield count common-format lines, each one an event, one second apart"""
+    start = datetime(2019, 4, 19, 3, 37, 5)
+    for i in range(count):
+        stamp = (start + timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S')
+        yield EVENTS[i % len(EVENTS)].format(stamp, UIDS[i % len(UIDS)])
+
+
+class GeneratedLog(object):
+    """Minimal stand-in for LogFile that generates its lines as they are read"""
+
+    def __init__(self, count):
+        self.count = count
+
+    def __iter__(self):
+        return synthetic_lines(self.count)
+
+    def reset(self):
+        pass
+
+
+class LegacyWanEvent:
+    """WanEvent as it was: instance dict, datetime and string per event, copied details"""
+
+    def __init__(self, dt, uid, state, details=None):
+        if details is None:
+            details = {}
+        self.dt = datetime.strptime(dt, UniversalParser.timeformat)
+        self.dtstr = dt
+        self.uid = uid
+        self.state = state
+        self.details = copy(details)
+
+
+class LegacySignalEvent:
+    """SignalEvent as it was: instance dict, datetime and string per event, a dict per metric"""
+
+    def __init__(self, dt, uid, rssi=None, sinr=None, rsrp=None, rsrq=None, ecio=None, band=None):
+        self.dt = datetime.strptime(dt, UniversalParser.timeformat)
+        self.dtstr = dt
+        self.uid = uid
+        self.rssi = rssi
+        self.sinr = sinr
+        self.rsrp = rsrp
+        self.rsrq = rsrq
+        self.ecio = ecio
+        self.band = band
+
+
+def legacy_events(log):
+    """Build the old per-uid event lists from the same lines"""
+    sigDict = {}
+    connDict = {}
+    for line in log:
+        matchobj = UniversalParser.rgxSignalQuality.match(line)
+        if matchobj:
+            # getList has the old {'RSSI': (value, quality)} dicts, made fresh for every event like before
+            signal = UniversalParser._parseSignalQuality(line).getList()[1:]
+            evt = LegacySignalEvent(matchobj.group(1), matchobj.group(2), *signal)
+            sigDict.setdefault(evt.uid, []).append(evt)
+            continue
+        matchobj = UniversalParser.rgxDevState.match(line)
+        if matchobj:
+            if matchobj.group(5):
+                details = {'Reason': matchobj.group(5)}
+            else:
+                details = {'PrevState': matchobj.group(3)}
+            evt = LegacyWanEvent(matchobj.group(1), matchobj.group(2), matchobj.group(4), details)
+        else:
+            matchobj = UniversalParser.rgxUnplug.match(line)
+            if matchobj:
+                evt = LegacyWanEvent(matchobj.group(1), matchobj.group(2), 'unplugged')
+            else:
+                matchobj = UniversalParser.rgxConfig.match(line)
+                evt = LegacyWanEvent(matchobj.group(1), matchobj.group(2), 'configure', {'Reason': matchobj.group(3)})
+        connDict.setdefault(evt.uid, []).append(evt)
+    return sigDict, connDict
+
+
+def current_events(log):
+    extra_args = {'format': 'dict', 'debug': False, 'error_logging': False, 'extra_regex': [],
+                  'date_range': [datetime.min, datetime.max], 'fd_concise': open(os.devnull, 'w')}
+    result = UniversalParser.parseResult(log, extra_args)
+    extra_args['fd_concise'].close()
+    return result
+
+
+def measure(func, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(GeneratedLog(count))
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the memory held by parsed events')
+    parser.add_argument('--events', type=int, default=1000000,
+                        help='Number of synthetic events (default 1M).  The legacy objects need ~1 GB per million '
+                             'and tracemalloc makes building them slow')
+    args = parser.parse_args()
+
+    print('{} events'.format(args.events))
+    for name, func in [('legacy objects', legacy_events), ('current', current_events)]:
+        held, peak, elapsed = measure(func, args.events)
+        print('{:>15}: held {:8.1f} MB  peak {:8.1f} MB  {:6.2f} s  {:5.0f} bytes/event'.format(
+            name, held / 1e6, peak / 1e6, elapsed, held / args.events))
+
+
+if __name__ == '__main__':
+    main()
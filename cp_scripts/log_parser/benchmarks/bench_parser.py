@@ -0,0 +1,174 @@
+"""Throughput and memory benchmark of every translator, stage by stage.
+
+For each format a synthetic log (synthlogs.py) of the given sizes is generated, or reused from --dir, and these stages
+are timed on it, each in a fresh process so peak memory is its own:
+
+     detect: LogFile.open, which samples the file and scores every translator on it
+  translate: reading the log through its translator into common format lines
+   tokenize: finding the events in the common format lines (_firstEvent and the parse function it picks, the
+             dispatch of the parse loop without collecting results).  The lines are translated to a file first,
+             outside the timing
+   parseLog: UniversalParser.parseLog end to end, translation included, into json
+   pipeline: parseLog with --pipeline, translation in a second process.  Only faster than parseLog with a CPU free
+             for it
+
+Lines/s and MB/s are of the whole source log for every stage.  Peak is the maximum RSS of the stage's process, with
+how much of it came after the imports in brackets.  --save writes the results as json, --compare prints the change
+against saved results.
+
+usage: python3 bench_parser.py [--formats syslog,ncm] [--sizes 10MB,1GB] [--stages detect,parseLog] [--dir DIR]
+                               [--save FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UniversalLogParser import LogFile, UniversalParser  # noqa: E402
+import synthlogs  # noqa: E402
+
+STAGES = ['detect', 'translate', 'tokenize', 'parseLog', 'pipeline']
+
+
+def peak_mb():
+    # ru_maxrss is kB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def stage_detect(fileName, fileFormat):
+    log = LogFile(fileName)
+    log.open()
+    log.close()
+    if log._fileFormat is not LogFile(fileName, fileFormat)._fileFormat:
+        raise Exception('{} detected as {}'.format(fileName, log._fileFormat.__name__))
+
+
+def stage_translate(fileName, fileFormat):
+    log = LogFile(fileName, fileFormat)
+    log.open()
+    for _ in log:
+        pass
+    log.close()
+
+
+def stage_tokenize(fileName, fileFormat, commonName):
+    parseFuncs = [UniversalParser._parseDevState, UniversalParser._parseUnplug, UniversalParser._parsePlug,
+                  UniversalParser._parseConfigure, UniversalParser._parseSignalQuality, UniversalParser._parseReset]
+    parseDevState = parseFuncs[0]
+    funcsFrom = [parseFuncs[i:] for i in range(len(parseFuncs))] + [[]]
+    firstEvent = UniversalParser._firstEvent
+    events = 0
+    with open(commonName) as fd:
+        for line in fd:
+            for func in funcsFrom[firstEvent(line)]:
+                if func(line, False) if func is parseDevState else func(line):
+                    events += 1
+                    break
+    return events
+
+
+def stage_parseLog(fileName, fileFormat, pipeline=False):
+    extra_args = {'format': 'json', 'debug': False, 'error_logging': False, 'extra_regex': [],
+                  'date_range': [datetime.min, datetime.max], 'fd_concise': open(os.devnull, 'w'),
+                  'pipeline': pipeline}
+    log = LogFile(fileName, fileFormat)
+    log.open()
+    UniversalParser.parseLog(log, extra_args)
+    log.close()
+    extra_args['fd_concise'].close()
+
+
+def stage_pipeline(fileName, fileFormat):
+    stage_parseLog(fileName, fileFormat, True)
+
+
+def run_stage(stage, fileName, fileFormat):
+    """Run one stage in this process and print its result as json"""
+    args = (fileName, fileFormat)
+    if stage == 'tokenize':
+        commonName = fileName + '.common'
+        if not os.path.exists(commonName):
+            log = LogFile(fileName, fileFormat)
+            log.open()
+            with open(commonName, 'w') as fd:
+                fd.writelines(log)
+            log.close()
+        args += (commonName,)
+    base = peak_mb()
+    start = time.perf_counter()
+    globals()['stage_' + stage](*args)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'peak': peak_mb(), 'base': base}))
+
+
+def measure(stage, fileName, fileFormat):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-stage', stage, fileFormat, fileName],
+                         stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(out.decode().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark translation and parsing of every log format')
+    parser.add_argument('--formats', default=','.join(synthlogs.FORMATS), help='Comma separated, default all')
+    parser.add_argument('--sizes', default='10MB', help='Comma separated log sizes, e.g. 10MB,1GB (default 10MB)')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma separated, default all')
+    parser.add_argument('--dir', help='Where the synthetic logs are kept, so later runs reuse them.  Default a '
+                                      'temporary directory removed afterwards')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='Write the results to this json file')
+    parser.add_argument('--compare', help='Show the change against the results saved in this json file')
+    parser.add_argument('--run-stage', nargs=3, metavar=('STAGE', 'FORMAT', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        stage, fileFormat, fileName = args.run_stage
+        run_stage(stage, fileName, fileFormat)
+        return
+
+    tempDir = None
+    if not args.dir:
+        tempDir = tempfile.TemporaryDirectory()
+        args.dir = tempDir.name
+    os.makedirs(args.dir, exist_ok=True)
+    old = {}
+    if args.compare:
+        with open(args.compare) as fd:
+            old = json.load(fd)
+    results = {}
+    print('{:>9} {:>7} {:>9}: {:8} {:>13} {:>8} {:>14}'.format('format', 'size', 'stage', 'seconds', 'lines/s', 'MB/s',
+                                                               'peak (+base)'))
+    for size in args.sizes.split(','):
+        for fileFormat in args.formats.split(','):
+            fileName = os.path.join(args.dir, 'synth_{}_{}_{}.log'.format(fileFormat, size, args.seed))
+            if not os.path.exists(fileName):
+                synthlogs.generate(fileFormat, fileName, synthlogs.parse_size(size), args.seed)
+            with open(fileName, 'rb') as fd:
+                lines = sum(chunk.count(b'\n') for chunk in iter(lambda: fd.read(1 << 20), b''))
+            megabytes = os.path.getsize(fileName) / 1e6
+            for stage in args.stages.split(','):
+                key = '{} {} {}'.format(fileFormat, size, stage)
+                result = results[key] = measure(stage, fileName, fileFormat)
+                seconds = result['seconds']
+                change = ''
+                if key in old:
+                    change = '  {:+6.1f}% time  {:+6.1f}% peak'.format(
+                        100 * (seconds / old[key]['seconds'] - 1), 100 * (result['peak'] / old[key]['peak'] - 1))
+                print('{:>9} {:>7} {:>9}: {:8.3f} {:13,.0f} {:8.1f} {:8.1f} (+{:.1f}) MB{}'.format(
+                    fileFormat, size, stage, seconds, lines / seconds, megabytes / seconds, result['peak'],
+                    result['peak'] - result['base'], change))
+    if args.save:
+        with open(args.save, 'w') as fd:
+            json.dump(results, fd, indent=1)
+    if tempDir:
+        tempDir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
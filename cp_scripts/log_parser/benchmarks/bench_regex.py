@@ -0,0 +1,88 @@
+"""Benchmark of RegexRules, the --regex/--regex-file/-e rules of the concise file, against searching every pattern.
+
+The lines are those of a synthetic syslog (synthlogs.py), the rules a mix of plain text, patterns with a required
+literal and patterns without one.  Before timing, the prefilter is checked: requiredLiteral of every pattern in
+LITERALS must be the expected text, and on every line RegexRules must give the same rule as searching the patterns in
+order, for the timed rules and for the escape rules (\\x41, \\101, \\N{...}, whose digits and names are no plain text).
+
+usage: python3 bench_regex.py [--lines N] [--repeat N] [--seed N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UniversalLogParser import RegexRules, requiredLiteral  # noqa: E402
+import synthlogs  # noqa: E402
+
+RULES = [('plain', 'Failed web login'), ('literal', r'Received DHCP offer from 10\.\d+'),
+         ('escaped', r'registered port \d as port\d'), ('none', r'\d{3}\.\d+\.0\.1\b'),
+         ('optional', r'Unplug(ged)? by user'), ('alternation', r'hard reset|USB disconnect')]
+ESCAPES = [('hex', r'\x41BCDEF'), ('octal', r'\101XYZ'), ('backref', r'(sta)tus: \1'),
+           ('unicode', r'\u0041BCDE'), ('wide', r'\U00000041BCDE'), ('named', r'\N{LATIN CAPITAL LETTER A}BCDE'),
+           ('zero', r'\0CDEFG')]
+ESCAPE_LINES = ['ABCDEF', 'AXYZ', 'status: sta', 'ABCDE', '\0CDEFG', '41BCDEF', '01XYZ']
+# pattern: the literal a line has to contain for the pattern to match
+LITERALS = {'Failed web login': 'Failed web login', r'Received DHCP offer from 10\.\d+': 'Received DHCP offer from 10.',
+            r'Unplug(ged)? by user': ' by user', r'hard reset|USB disconnect': '', r'(sta)tus: \1': 'tus: ',
+            r'\x41BCDEF': 'BCDEF', r'\101XYZ': 'XYZ', r'\u0041BCDE': 'BCDE', r'\U00000041BCDE': 'BCDE',
+            r'\0CDEFG': 'CDEFG', r'\N{LATIN CAPITAL LETTER A}BCDE': 'BCDE'}
+
+
+def search_all(rules):
+    """The rules searched one by one, the way they were before RegexRules"""
+    compiled = [(name, re.compile(pattern).search) for name, pattern in rules]
+
+    def match(line):
+        for name, search in compiled:
+            if search(line):
+                return name
+        return None
+    return match
+
+
+def check(lines):
+    for pattern, literal in LITERALS.items():
+        if requiredLiteral(pattern) != literal:
+            raise Exception('requiredLiteral({!r}) is {!r}, not {!r}'.format(pattern, requiredLiteral(pattern),
+                                                                             literal))
+    for rules, checked in [(RULES, lines), (ESCAPES, ESCAPE_LINES + lines[:1000])]:
+        prefiltered, searched = RegexRules(rules).match, search_all(rules)
+        for line in checked:
+            if prefiltered(line) != searched(line):
+                raise Exception('RegexRules gives {!r}, searching {!r} on {!r}'.format(
+                    prefiltered(line), searched(line), line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the concise file regex rules')
+    parser.add_argument('--lines', type=int, default=200000, help='Log lines to match (default 200000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each, the fastest counts (default 5)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lines = []
+    for stamp, level, source, message in synthlogs.lines(rng):
+        lines.append(synthlogs.syslog(stamp, level, source, message))
+        if len(lines) == args.lines:
+            break
+    check(lines)
+    seconds = {'searched': [], 'RegexRules': []}
+    for _ in range(args.repeat):
+        for name, match in [('searched', search_all(RULES)), ('RegexRules', RegexRules(RULES).match)]:
+            start = time.perf_counter()
+            for line in lines:
+                match(line)
+            seconds[name].append(time.perf_counter() - start)
+    for name, times in seconds.items():
+        print('{:>10}: {:8.2f} us/line {:13,.0f} lines/s'.format(name, min(times) / len(lines) * 1e6,
+                                                                 len(lines) / min(times)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark of UniversalParser._parseSignalQuality, the signal line parser, against the one before 5G NR support.
+
+Both search each line with a regex per metric (RSSI, SINR, RSRP, RSRQ, ECIO) and one for the RF band.  The current one
+also reads the SS-RSRP, SS-SINR, SS-RSRQ and NR band fields, only in lines that have them.  Both are run on the same
+signal-heavy common format lines: 4G readings as the routers log them (synthlogs.SIGNAL, with and without ECIO), 3G
+ones, 5G NSA readings with the NR fields, and other layouts of the fields (commas without a space, no comma before the
+first field).  On every line the 4G fields of the two must be equal (on 5G lines the legacy RF band runs on over the
+NR fields), and on the 5G lines the current one must also have the NR fields.
+
+usage: python3 bench_signal.py [--lines N] [--repeat N] [--seed N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UniversalLogParser import UniversalParser  # noqa: E402
+import synthlogs  # noqa: E402
+
+SignalEvent = UniversalParser.SignalEvent
+rgxSignalQuality = UniversalParser.rgxSignalQuality
+rgxSignalValues = [re.compile(r'{}:(.*?)[\( ]'.format(metric)) for metric in ['RSSI', 'SINR', 'RSRP', 'RSRQ', 'ECIO']]
+rgxSignalBand = re.compile(r'RFBAND:(.*)')
+
+LINE = '{} 192.168.0.1 S= INFO WAN:{} -- {}\n'
+SIGNAL_ECIO = ('signal MC400LP6 (SIM1) on port modem1: {ss}%, RSSI:{rssi}(dBm), SINR:{sinr:.1f}(dB), RSRP:{rsrp}(dB), '
+               'RSRQ:{rsrq}(dB), ECIO:{ecio}(dB), RFBAND: Band {band}')
+SIGNAL_3G = 'signal MC7354 (SIM1) on port modem1: {ss}%, RSSI:{rssi}(dBm), ECIO:{ecio}(dB), RFBAND: WCDMA {band}'
+SIGNAL_5G = ('signal MC400LP6 (SIM1) on port modem1: {ss}%, RSSI:{rssi}(dBm), SINR:{sinr:.1f}(dB), RSRP:{rsrp}(dB), '
+             'RSRQ:{rsrq}(dB), RFBAND: Band {band}, SS-RSRP:{ss_rsrp}(dBm), SS-SINR:{ss_sinr:.1f}(dB), '
+             'SS-RSRQ:{ss_rsrq}(dB), NRBAND: n{nr_band}')
+# Layouts the fields are also found in: commas without a space, and the first field right after the modem name
+SIGNAL_COMMA = ('signal MC400LP6 (SIM1) on port modem1: {ss}%,RSSI:{rssi}(dBm),SINR:{sinr:.1f}(dB),RSRP:{rsrp}(dB),'
+                'RSRQ:{rsrq}(dB),RFBAND: Band {band},Service: LTE')
+SIGNAL_BARE = ('signal MC400LP6 on port modem1: RSSI:{rssi}(dBm), SINR:{sinr:.1f}(dB), RSRP:{rsrp}(dB), '
+               'RFBAND: Band {band}')
+LAYOUTS = [('4G', synthlogs.SIGNAL), ('4G', SIGNAL_ECIO), ('3G', SIGNAL_3G), ('5G', SIGNAL_5G),
+           ('other', SIGNAL_COMMA), ('other', SIGNAL_BARE)]
+FIELDS_4G = ('ts', 'uid', 'rssi', 'sinr', 'rsrp', 'rsrq', 'ecio', 'band')
+FIELDS_5G = ('ss_rsrp', 'ss_sinr', 'ss_rsrq', 'nr_band')
+
+
+def legacy_parse(line):
+    """_parseSignalQuality before the 5G NR fields"""
+    matchobj = rgxSignalQuality.match(line)
+    if not matchobj:
+        return None
+    vals = []
+    for regex in rgxSignalValues:
+        valmatch = regex.search(matchobj.group(3))
+        if valmatch:
+            val = valmatch.group(1)
+            if val == '0' and regex is rgxSignalValues[0]:
+                val = '-125'
+            vals.append(float(val))
+        else:
+            vals.append(None)
+    bandmatch = rgxSignalBand.search(matchobj.group(3))
+    return SignalEvent(matchobj.group(1), matchobj.group(2), *vals, bandmatch.group(1) if bandmatch else None)
+
+
+def signal_lines(count, seed):
+    """count (kind, line) signal lines of the LAYOUTS in turn"""
+    rng = random.Random(seed)
+    lines = []
+    for stamp, _, _, _ in synthlogs.lines(rng):
+        values = dict(ss=rng.randint(40, 100), rssi=rng.choice([0, rng.randint(-100, -45)]), sinr=rng.uniform(-5, 25),
+                      rsrp=rng.randint(-120, -70), rsrq=rng.randint(-20, -5), ecio=rng.randint(-15, -2),
+                      band=rng.choice([2, 4, 12, 13, 66]), ss_rsrp=rng.randint(-120, -70), ss_sinr=rng.uniform(-5, 30),
+                      ss_rsrq=rng.randint(-20, -5), nr_band=rng.choice([41, 71, 77]))
+        kind, text = LAYOUTS[len(lines) % len(LAYOUTS)]
+        lines.append((kind, LINE.format(stamp.strftime('%Y-%m-%d %H:%M:%S'), rng.choice(synthlogs.MODEMS),
+                                        text.format(**values))))
+        if len(lines) == count:
+            return lines
+
+
+def check(lines):
+    for kind, line in lines:
+        new, old = UniversalParser._parseSignalQuality(line), legacy_parse(line)
+        fields = FIELDS_4G
+        if kind == '5G':
+            # The legacy band runs on to the end of the line, over the 5G fields
+            fields = FIELDS_4G[:-1]
+            if not old.band.startswith(new.band + ', SS-RSRP:') or None in [getattr(new, f) for f in FIELDS_5G]:
+                raise Exception('5G values missing on ' + line)
+        if [getattr(new, field) for field in fields] != [getattr(old, field) for field in fields]:
+            raise Exception('Signal values differ from the legacy parser on ' + line)
+
+
+def best(funcs, lines, repeat):
+    """Fastest of repeat runs of each func over lines, in seconds.  The funcs take turns, so a slow spell of the
+       machine doesn't fall on one only"""
+    seconds = [[] for _ in funcs]
+    for _ in range(repeat):
+        for func, times in zip(funcs, seconds):
+            start = time.perf_counter()
+            for line in lines:
+                func(line)
+            times.append(time.perf_counter() - start)
+    return [min(times) for times in seconds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the signal line parser against the legacy one')
+    parser.add_argument('--lines', type=int, default=20000, help='Signal lines to parse (default 20000)')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs of each, the fastest counts (default 20)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    lines = signal_lines(args.lines, args.seed)
+    check(lines)
+    print('{:>6} {:>8}: {:>8} {:>13} {:>8}'.format('lines', 'parser', 'us/line', 'lines/s', 'speedup'))
+    for kind in ['4G', '3G', '5G', 'other', 'all']:
+        subset = [line for lineKind, line in lines if kind in ('all', lineKind)]
+        legacy, current = best([legacy_parse, UniversalParser._parseSignalQuality], subset, args.repeat)
+        for name, seconds in [('legacy', legacy), ('current', current)]:
+            print('{:>6} {:>8}: {:8.2f} {:13,.0f} {:>8}'.format(
+                kind, name, seconds / len(subset) * 1e6, len(subset) / seconds,
+                '{:.2f}x'.format(legacy / current) if name == 'current' else ''))
+
+
+if __name__ == '__main__':
+    main()
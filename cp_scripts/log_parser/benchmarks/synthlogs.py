@@ -0,0 +1,170 @@
+"""Synthetic logs in every format UniversalLogParser translates, for the benchmarks.
+
+Every format gets the same kind of content: mostly noise (kernel, cp_stack_mgr, httpserver, udhcpc, netcloud and WAN
+lines that aren't events, Service Change lines included), with signal readings, WAN state changes, unplug/plug and
+configure events and modem resets (WAN Resetting, Device hard reset, USB disconnect) mixed in at about the rate real
+router logs have them.  Each format is written the way its translator expects it, header included: the router UI
+export header, the NCM export header with CRLF lines and newest lines first, the USB record separators, the local UI
+clock line and 12 hour times, the csv header, and the year-less syslog of OtherTranslater.
+
+The content only depends on the seed, so logs of the same format, size and seed are the same.
+
+usage: python3 synthlogs.py [--seed N] FORMAT SIZE OUTPUT
+       FORMAT is a UniversalLogParser --format name, SIZE is bytes with an optional k, MB or GB suffix (e.g. 100MB)
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+# The --format names of UniversalLogParser.TRANSLATORS
+FORMATS = ['syslog', 'routerui', 'ncm', 'usb', 'localui', 'csv', 'other']
+START = datetime(2019, 4, 24, 12, 51, 16)
+MODEMS = ['47025ecf', '1f1b4ed4']
+UIDS = MODEMS + ['wan']
+NOISE = [('INFO', 'kernel', '[{uptime:.6f}] ltc4266 0-002f: pse core: registered port {port} as port{port}'),
+         ('INFO', 'cp_stack_mgr', 'INFO  ncm_intel_modem.c(2544) int1: ncm_intel_attach_process() step: {step},  '
+                                  'status: 0'),
+         ('INFO', 'httpserver', 'Accepted web login from local address 192.168.0.{host}, user: admin'),
+         ('WARNING', 'httpserver', 'Failed web login attempt ({step}/6) from local address 192.168.0.{host}'),
+         ('DEBUG', 'udhcpc[4977]', 'Received DHCP offer from 10.{host}.0.1'),
+         ('INFO', 'netcloud', 'Updated status.ecm.info.Group'),
+         ('INFO', 'WAN:{uid}', 'The cell id for the MC400LP6 (SIM1) on port modem1 is {cell} (0x{cell:x})'),
+         ('INFO', 'WAN:{uid}', 'Service Change : Not Reported -> LTE, 100%, RSSI: -45(dBm), SINR: 12.6, RSRP: -70'),
+         ('INFO', 'WAN:{uid}.ConnectorMgr', 'disconnectDone....SignalVerify'),
+         ('INFO', 'policy.FailoverFailback', 'connected -> wait_for_next (primary: mdm-{uid}, next_dev: None)')]
+SIGNAL = ('signal MC400LP6 (SIM1) on port modem1: {ss}%, RSSI:{rssi}(dBm), SINR:{sinr:.1f}(dB), RSRP:{rsrp}(dB), '
+          'RSRQ:{rsrq}(dB), RFBAND: Band {band}')
+STATES = [('connected', 'disconnecting', ''), ('disconnecting', 'disconnected', ', Reason: Unready'),
+          ('disconnected', 'connecting', ''), ('connecting', 'connected', ', Reason: Failback')]
+
+
+def messages(rng):
+    """Endless (level, source, message) stream.  About 1 line in 25 is a signal reading, 1 in 100 starts a WAN state
+       change sequence, and unplugs, configure events and resets are rarer"""
+    while True:
+        roll = rng.random()
+        uid = rng.choice(MODEMS)
+        if roll < 0.04:
+            yield 'INFO', 'WAN:' + uid, SIGNAL.format(ss=rng.randint(40, 100), rssi=rng.randint(-100, -45),
+                                                      sinr=rng.uniform(-5, 25), rsrp=rng.randint(-120, -70),
+                                                      rsrq=rng.randint(-20, -5), band=rng.choice([2, 4, 12, 13, 66]))
+        elif roll < 0.05:
+            for before, after, reason in STATES:
+                yield 'INFO', 'WAN:' + rng.choice(UIDS), '{} -> {}{}'.format(before, after, reason)
+        elif roll < 0.052:
+            yield 'INFO', 'WAN:' + uid, 'Unplugged'
+            yield 'INFO', 'WAN:' + uid, 'Plug event: ok'
+        elif roll < 0.053:
+            yield 'INFO', 'WAN:' + uid, 'Configure Event: modem reconfigured'
+        elif roll < 0.0535:
+            yield 'INFO', 'WAN:' + uid, 'Resetting'
+            yield 'INFO', 'cp_stack_mgr', 'modem1: WAN Device hard reset, hub 2:3'
+            yield 'INFO', 'kernel', '[{:.6f}] usb 1-1.3: USB disconnect, device number {}'.format(
+                rng.uniform(100, 200000), rng.randint(2, 12))
+        else:
+            level, source, message = rng.choice(NOISE)
+            fields = dict(uid=uid, uptime=rng.uniform(0, 200000), port=rng.randint(0, 3), step=rng.randint(1, 230),
+                          host=rng.randint(2, 254), cell=rng.randint(1000000, 9999999))
+            yield level, source.format(**fields), message.format(**fields)
+
+
+def lines(rng, direction=1):
+    """Endless (time, level, source, message) stream, time going forward (or backwards with direction -1) by a few
+       seconds at most per line"""
+    seconds = 0
+    for level, source, message in messages(rng):
+        seconds += direction * rng.choice([0, 0, 0, 1, 1, 2, 5])
+        yield START + timedelta(seconds=seconds), level, source, message
+
+
+def syslog(stamp, level, source, message):
+    return '{} 192.168.0.1 S= {} ﻿{} -- {}\n'.format(stamp.strftime('%Y-%m-%d %H:%M:%S'), level, source, message)
+
+
+def routerui(stamp, level, source, message):
+    return '{}|{}|{}|{}\n'.format(stamp.strftime('%a %b %d %H:%M:%S %Y'), level, source, message)
+
+
+def ncm(stamp, level, source, message):
+    return '{}|{:>8}|{:>12}|{}\r\n'.format(stamp.strftime('%Y-%m-%d %H:%M:%S'), level, source, message)
+
+
+def usb(stamp, level, source, message):
+    uptime = int((stamp - START).total_seconds()) + 28433
+    return '{} user.{} {}: {}\x1e\n'.format(uptime, level.lower(), source, message)
+
+
+def localui(stamp, level, source, message):
+    return '{} {} {} {}\n'.format(stamp.strftime('%I:%M:%S %p'), level, source, message)
+
+
+def csv(stamp, level, source, message):
+    if ',' in message:
+        message = '"{}"'.format(message)
+    return '{}-06:00,{},{},{}\n'.format(stamp.strftime('%Y-%m-%dT%H:%M:%S'), level, source, message)
+
+
+def other(stamp, level, source, message):
+    if source.startswith('WAN:'):
+        source = 'WAN: ' + source[4:]
+    return '{} 192.168.0.1 ﻿{}: {}\n'.format(stamp.strftime('%b %d %H:%M:%S'), source, message)
+
+
+HEADERS = {
+    'routerui': 'Firmware Type: RELEASE\nFirmware Version: 7.1.60.05dbb99\n'
+                'Firmware Build Date: Tue Dec  3 01:28:01 UTC 2019\nProduct Name: AER2200-600M\n\n',
+    'ncm': 'Date: Fri Apr 26 2019 16:32:26 GMT-0600 (Mountain Daylight Time)\r\n\r\nECM Info\r\n========\r\n'
+           'Name: AER2200-ef2\r\nProduct: AER2200\r\nNetCloud OS: 7.0.40\r\n\r\n',
+    'localui': '\nFW Version: 7.0.40\n\n{} INFO clock System time set to: {} {} UTC\n'.format(
+        START.strftime('%I:%M:%S %p'), (START + timedelta(hours=6)).strftime('%H:%M:%S'), START.strftime('%m/%d/%y')),
+    'csv': 'timestamp,levelname,source,message\n',
+}
+RENDER = {'syslog': syslog, 'routerui': routerui, 'ncm': ncm, 'usb': usb, 'localui': localui, 'csv': csv,
+          'other': other}
+
+
+def generate(fileFormat, fileName, size, seed=0):
+    """Write a synthetic log of fileFormat of at least size bytes.  Returns the number of lines and bytes written"""
+    rng = random.Random(seed)
+    render = RENDER[fileFormat]
+    header = HEADERS.get(fileFormat, '')
+    written = len(header.encode())
+    count = header.count('\n')
+    with open(fileName, 'w', encoding='utf-8', newline='') as fd:
+        fd.write(header)
+        chunk = []
+        for stamp, level, source, message in lines(rng, -1 if fileFormat == 'ncm' else 1):
+            line = render(stamp, level, source, message)
+            chunk.append(line)
+            written += len(line) + (2 if '﻿' in line else 0)  # The BOM is 3 bytes in UTF-8
+            if len(chunk) == 4096 or written >= size:
+                fd.write(''.join(chunk))
+                count += len(chunk)
+                chunk = []
+                if written >= size:
+                    break
+    return count, written
+
+
+def parse_size(text):
+    """'10MB', '2GB', '500k' or a number of bytes"""
+    text = text.strip().upper().rstrip('B')
+    for suffix, factor in [('K', 1024), ('M', 1024 ** 2), ('G', 1024 ** 3)]:
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic log for the benchmarks')
+    parser.add_argument('format', choices=FORMATS)
+    parser.add_argument('size', help='Size in bytes, or with a k, MB or GB suffix')
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    count, written = generate(args.format, args.output, parse_size(args.size), args.seed)
+    print('{}: {:,} lines, {:,} bytes'.format(args.output, count, written))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Fixtures of the UniversalLogParser tests.  Run them with python3 -m pytest in this directory or the one above.
+
+The parser writes its output files (data_, concise_, common_...) in the working directory, the run fixture runs it
+in a new directory for every call and hands back what it wrote.
+"""
+import itertools
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+LOG_DIR = os.path.join(HERE, '..')
+
+
+@pytest.fixture
+def log():
+    """log(name): path of a log of the repository, e.g. 'log1.log' (NCM) or 'logs/sys_log.log'"""
+    return lambda name: os.path.join(LOG_DIR, name)
+
+
+@pytest.fixture
+def options():
+    """options(**changes): the other_args of the command line defaults (-o csv, no -e/-d/--fromto...), changed by
+       changes, e.g. options(format='json', date_range=[start, end])"""
+    def make(**changes):
+        other_args = {'format': 'csv', 'debug': False, 'error_logging': False, 'extra_regex': [],
+                      'date_range': [datetime.min, datetime.max], 'jobs': 1, 'pipeline': False, 'log_format': None,
+                      'cache': None, 'profile': None}
+        other_args.update(changes)
+        return other_args
+    return make
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    """run(func, *args, **kwargs): call func in a new empty working directory.  Returns {file name: contents} of the
+       files in it afterwards"""
+    counter = itertools.count()
+
+    def call(func, *args, **kwargs):
+        directory = tmp_path / 'run{}'.format(next(counter))
+        directory.mkdir()
+        with monkeypatch.context() as patch:
+            patch.chdir(directory)
+            func(*args, **kwargs)
+        return {path.name: path.read_bytes() for path in directory.iterdir() if path.is_file()}
+    return call
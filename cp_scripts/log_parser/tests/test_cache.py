@@ -0,0 +1,92 @@
+"""ParseCache (--cache): parses through the cache give the files a parse without it does, the block index for
+--fromto, and least recently used eviction"""
+import os
+import shutil
+from datetime import datetime
+
+import pytest
+
+from UniversalLogParser import LogFile, ParseCache, dt_to_ts, parse_ts, parsefile, ts_to_dt
+
+WINDOW = [datetime(2020, 11, 5, 9, 0, 0), datetime(2020, 11, 5, 12, 0, 0)]
+
+
+@pytest.fixture
+def ncmLog(tmp_path, log):
+    """A copy of log1.log (an NCM support log, newest first), its cache key is its own"""
+    path = str(tmp_path / 'log1.log')
+    shutil.copy(log('log1.log'), path)
+    return path
+
+
+@pytest.mark.parametrize('changes', [{}, {'error_logging': True}, {'format': 'json', 'debug': True},
+                                     {'date_range': WINDOW}, {'date_range': WINDOW, 'error_logging': True}],
+                         ids=['csv', 'e', 'json-d', 'fromto', 'fromto-e'])
+def test_cached_parse_is_the_same(tmp_path, monkeypatch, run, ncmLog, options, changes):
+    monkeypatch.setattr(ParseCache, 'blockLines', 1024)  # log1.log has 14 blocks
+    cache = ParseCache(str(tmp_path / 'cache'))
+    expected = run(parsefile, ncmLog, options(**changes), True)
+    stored = run(parsefile, ncmLog, options(cache=cache, **changes), True)
+    loaded = run(parsefile, ncmLog, options(cache=cache, **changes), True)
+    assert stored == expected
+    assert loaded == expected
+
+
+def test_blocks_of_a_window(tmp_path, monkeypatch, ncmLog):
+    monkeypatch.setattr(ParseCache, 'blockLines', 1024)
+    lf = LogFile(ncmLog)
+    lf.open()
+    entry = ParseCache(str(tmp_path / 'cache')).store(lf)
+    lf.close()
+    blocks = ParseCache.blocks(entry, WINDOW)
+    start, end = [dt_to_ts(dt) for dt in WINDOW]
+    with open(entry['common'], 'rb') as fd:
+        common = fd.read()
+    lines = common.decode().splitlines(True)
+    inWindow = [number for number, line in enumerate(lines, 1)
+                if '0' < line[0] < '9' and start < parse_ts(line[:19]) < end]
+    assert inWindow
+    # The blocks skip part of the log, don't touch, and have every dated line of the window
+    assert sum(blockEnd - blockStart for blockStart, blockEnd, _, _, _ in blocks) < len(common)
+    assert all(a[1] < b[0] for a, b in zip(blocks, blocks[1:]))
+    for number in inWindow:
+        assert any(firstLine <= number < endLine for _, _, firstLine, _, endLine in blocks)
+    for blockStart, blockEnd, firstLine, _, endLine in blocks:
+        assert common[blockStart:blockEnd].count(b'\n') == endLine - firstLine
+
+
+def test_blocks_merge_and_skip():
+    # [(byte offset, first line number, date before, lowest date, highest date), ], then the end of the log
+    entry = {'index': [(0, 1, None, 100, 200), (10, 5, 200, 300, 400), (20, 9, 400, None, None),
+                       (30, 13, 400, 500, 600), (40, 17, 600, None, None)]}
+    window = [ts_to_dt(ts) for ts in (150, 350)]
+    assert ParseCache.blocks(entry, window) == [[0, 20, 1, None, 9]]
+    window = [ts_to_dt(ts) for ts in (450, 550)]
+    assert ParseCache.blocks(entry, window) == [[30, 40, 13, 400, 17]]
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = ParseCache(str(tmp_path / 'cache'), maxSize=0)
+    for used, key in enumerate(['old', 'middle', 'new']):
+        for path in cache._paths(key):
+            with open(path, 'w') as fd:
+                fd.write('x' * 100)
+            os.utime(path, (used, used))
+    cache.maxSize = 450
+    cache.evict()
+    assert sorted(os.listdir(cache.directory)) == ['middle.common', 'middle.events', 'new.common', 'new.events']
+    cache.maxSize = 0
+    cache.evict(keep='middle')
+    assert sorted(os.listdir(cache.directory)) == ['middle.common', 'middle.events']
+
+
+def test_load_marks_the_entry_used(tmp_path, ncmLog):
+    cache = ParseCache(str(tmp_path / 'cache'))
+    lf = LogFile(ncmLog)
+    lf.open()
+    cache.store(lf)
+    for path in cache._paths(cache.key(lf)):
+        os.utime(path, (0, 0))
+    assert cache.load(lf)['line_num'] > 1
+    assert all(os.path.getmtime(path) > 0 for path in cache._paths(cache.key(lf)))
+    lf.close()
@@ -0,0 +1,75 @@
+"""Compressed logs: gzip, bzip2 and xz files and zip members are parsed as they are read, giving the files a parse of
+the plain log does"""
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import zipfile
+
+import pytest
+
+from UniversalLogParser import LogFile, isPlainFile, parsefile, shortName
+
+COMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+@pytest.fixture(params=['log1.log', 'logs/sys_log.log', 'logs/usb_log.txt'])
+def plain(request, tmp_path, log):
+    """A copy of a log of the repository in tmp_path"""
+    path = str(tmp_path / os.path.basename(request.param))
+    shutil.copy(log(request.param), path)
+    return path
+
+
+def compressed(plain, suffix):
+    with open(plain, 'rb') as source, COMPRESSORS[suffix](plain + suffix, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    return plain + suffix
+
+
+@pytest.mark.parametrize('suffix', sorted(COMPRESSORS))
+@pytest.mark.parametrize('changes', [{}, {'error_logging': True, 'format': 'json'}, {'jobs': 2}],
+                         ids=['csv', 'e-json', 'jobs'])
+def test_compressed_parse_is_the_same(run, options, plain, suffix, changes):
+    expected = run(parsefile, plain, options(**changes), True)
+    unpacked = run(parsefile, compressed(plain, suffix), options(**changes), True)
+    assert unpacked == expected  # Named without the suffix
+
+
+@pytest.mark.parametrize('changes', [{}, {'error_logging': True, 'format': 'json'}], ids=['csv', 'e-json'])
+def test_zip_member_parse_is_the_same(tmp_path, run, options, plain, changes):
+    bundle = str(tmp_path / 'bundle.zip')
+    with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(plain, 'logs/' + os.path.basename(plain))
+        zf.writestr('readme.txt', 'Not a log\n')
+    expected = run(parsefile, plain, options(**changes), True)
+    member = run(parsefile, bundle + '/logs/' + os.path.basename(plain), options(**changes), True)
+    assert member == expected
+
+
+def test_single_file_zip(tmp_path, run, options, plain):
+    bundle = str(tmp_path / 'bundle.zip')
+    with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(plain, os.path.basename(plain))
+    expected = run(parsefile, plain, options(), True)
+    single = run(parsefile, bundle, options(), True)
+    name = os.path.basename(plain)
+    assert {fileName.replace('bundle.zip', name): contents for fileName, contents in single.items()} == expected
+
+
+def test_zip_of_several_files_needs_a_member(tmp_path, plain):
+    bundle = str(tmp_path / 'bundle.zip')
+    with zipfile.ZipFile(bundle, 'w') as zf:
+        zf.write(plain, 'a.log')
+        zf.write(plain, 'b.log')
+    with pytest.raises(Exception, match='has 2 files'):
+        LogFile(bundle).open()
+
+
+def test_names_and_plain_files(plain):
+    assert isPlainFile(plain)
+    for suffix in COMPRESSORS:
+        name = compressed(plain, suffix)
+        assert not isPlainFile(name)
+        assert shortName(name) == os.path.basename(plain)
@@ -0,0 +1,102 @@
+"""--follow: a log parsed while it grows, stopped and resumed from its checkpoint, gives the files a parse of the
+whole log does"""
+import os
+import pickle
+import shutil
+import time
+
+import pytest
+
+from UniversalLogParser import followfile, parsefile
+
+
+@pytest.fixture
+def growing(tmp_path, monkeypatch, log):
+    """follow(appends): followfile of grow.log (-k) in the directory follow, with its sleeps appending the byte
+       strings of appends to the log in turn, then stopping it with Ctrl+C.  The whole log is full"""
+    with open(log('logs/sys_log.log'), 'rb') as fd:
+        full = fd.read() + b'\n'  # Its last line has no newline, follow would wait for the rest of it
+    directory = tmp_path / 'follow'
+    directory.mkdir()
+    growName = str(directory / 'grow.log')  # Followed as grow.log, like the parse of parsedLikeFull
+
+    def follow(other_args, appends):
+        appends = list(appends)
+
+        def sleep(seconds):
+            if not appends:
+                raise KeyboardInterrupt
+            with open(growName, 'ab') as fd:
+                fd.write(appends.pop(0))
+        with monkeypatch.context() as patch:
+            patch.chdir(directory)
+            patch.setattr(time, 'sleep', sleep)
+            followfile('grow.log', other_args, True, 0)
+        return {name: (directory / name).read_bytes() for name in os.listdir(directory)}
+    follow.full = full
+    follow.directory = directory
+    return follow
+
+
+def parsedLikeFull(run, full, other_args):
+    """The files of a parse of full, as grow.log in the working directory"""
+    def parse():
+        with open('grow.log', 'wb') as fd:
+            fd.write(full)
+        parsefile('grow.log', other_args, True)
+    return run(parse)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'json', 'ndjson', 'bin'])
+def test_follow_and_resume(run, options, growing, capsys, fmt):
+    full = growing.full
+    third = len(full) // 3
+    (growing.directory / 'grow.log').write_bytes(full[:third])
+    # The second piece ends in the middle of a line, which is only read once it is complete
+    growing(options(format=fmt, error_logging=True), [full[third:2 * third + 17]])
+    with open(str(growing.directory / 'grow.log'), 'ab') as fd:
+        fd.write(full[2 * third + 17:])
+    followed = growing(options(format=fmt, error_logging=True), [])
+    assert 'Resuming grow.log' in capsys.readouterr().out
+    expected = parsedLikeFull(run, full, options(format=fmt, error_logging=True))
+    for name, contents in expected.items():
+        assert followed[name] == contents, name
+
+
+def test_checkpoint_has_the_state_not_the_events(options, growing):
+    full = growing.full
+    (growing.directory / 'grow.log').write_bytes(full)
+    files = growing(options(format='ndjson'), [])
+    checkpoint = pickle.loads(files['checkpoint_grow.log'])
+    assert checkpoint['offset'] == len(full)
+    assert checkpoint['line_num'] == full.count(b'\n') + 1
+    assert b'ParseResult' not in files['checkpoint_grow.log']
+    assert 'checkpoint_grow.log.events' not in files  # ndjson rows are appended to the data file
+
+
+@pytest.mark.parametrize('missing', ['concise_grow.log', 'common_grow.log', 'checkpoint_grow.log.events'])
+def test_resume_without_a_file_starts_over(run, options, growing, capsys, missing):
+    full = growing.full
+    half = len(full) // 2
+    (growing.directory / 'grow.log').write_bytes(full[:half])
+    growing(options(), [])
+    os.remove(str(growing.directory / missing))
+    with open(str(growing.directory / 'grow.log'), 'ab') as fd:
+        fd.write(full[half:])
+    followed = growing(options(), [])
+    assert 'starting over' in capsys.readouterr().out
+    for name, contents in parsedLikeFull(run, full, options()).items():
+        assert followed[name] == contents, name
+
+
+def test_resume_with_a_shorter_file_starts_over(options, growing, capsys):
+    full = growing.full
+    (growing.directory / 'grow.log').write_bytes(full)
+    growing(options(), [])
+    concise = str(growing.directory / 'concise_grow.log')
+    shutil.copy(concise, concise + '.old')
+    with open(concise, 'r+') as fd:
+        fd.truncate(100)
+    followed = growing(options(), [])
+    assert 'starting over' in capsys.readouterr().out
+    assert followed['concise_grow.log'] == followed['concise_grow.log.old']
@@ -0,0 +1,112 @@
+"""compileSpec, registerFormat and loadFormats: log formats described by specs (--format-file)"""
+import json
+import os
+import time
+
+import pytest
+
+import UniversalLogParser
+from UniversalLogParser import (FORMAT_SPECS, TRANSLATORS, LogFile, compileSpec, loadFormats, parsefile,
+                                translateLines, translateRange)
+
+# The README example, without the UTC conversion
+PIPES = {'regex': r'^\[(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})\] (\w+) ([^:]+): (.*)\n',
+         'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4},
+         'timestamp': '%d/%m/%Y %H:%M:%S', 'transforms': {'source': [['strip_suffix', ':']]},
+         'drop': {'before': '1971', 'level': '^DEBUG$'}}
+# Router events, with the WAN:uid source the parser looks for
+EVENTS = {'regex': r'^\[(\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})\] (\w+) (\S+): (.*)\n',
+          'fields': {'timestamp': 1, 'level': 2, 'source': 3, 'message': 4}, 'timestamp': '%d/%m/%Y %H:%M:%S'}
+
+
+@pytest.fixture(autouse=True)
+def translators(monkeypatch):
+    """Formats registered by a test are gone after it"""
+    monkeypatch.setattr(UniversalLogParser, 'TRANSLATORS', dict(TRANSLATORS))
+    monkeypatch.setattr(UniversalLogParser, 'LOADED_FORMATS', [])
+
+
+def test_translate_line():
+    translator = compileSpec('pipes', PIPES)()
+    assert type(translator).__name__ == 'PipesTranslator' and type(translator).FORMAT == 'pipes'
+    assert translator.translateLine('[24/04/2019 12:00:02] INFO wanmgr: Link up\n') == \
+        '2019-04-24 12:00:02 0.0.0.0 S= INFO wanmgr -- Link up\n'
+    assert translator.translateLine('[24/04/2019 12:00:02] DEBUG wanmgr: Link up\n') is None
+    assert translator.translateLine('[01/01/1970 00:00:09] INFO wanmgr: Link up\n') is None
+    assert translator.translateLine('not a line of the format\n') is None
+
+
+def test_fixed_fields_and_transforms():
+    spec = {'regex': r'^(\S+ \S+) "(.*)" (.*)\n', 'fields': {'timestamp': 1, 'source': 'modem', 'message': 2,
+                                                              'ip': 3, 'level': 'NOTICE'},
+            'transforms': {'message': [['replace', '{', '('], ['strip_prefix', 'msg=']]}}
+    translator = compileSpec('fixed', spec)()
+    assert translator.translateLine('2019-04-24 12:00:02 "msg={x}" 10.0.0.1\n') == \
+        '2019-04-24 12:00:02 10.0.0.1 S= NOTICE modem -- (x}\n'
+
+
+def test_utc_timestamps_are_made_local(monkeypatch):
+    translator = compileSpec('pipes', dict(PIPES, utc=True))()
+    with monkeypatch.context() as patch:
+        patch.setenv('TZ', 'America/Denver')
+        time.tzset()
+        line = translator.translateLine('[24/04/2019 12:00:02] INFO wanmgr: Link up\n')
+    time.tzset()
+    assert line.startswith('2019-04-24 06:00:02 ')
+
+
+@pytest.mark.parametrize('spec, error', [
+    ({}, 'has no regex'),
+    (dict(PIPES, timestamp='sundial'), 'unknown timestamp sundial'),
+    (dict(PIPES, fields={'timestamp': 1, 'source': 3}), 'fields has no message'),
+    (dict(PIPES, fields={'timestamp': '2019', 'source': 3, 'message': 4}), 'has to be a group number'),
+    (dict(PIPES, transforms={'source': [['upper']]}), 'Unknown transform upper'),
+    (dict(PIPES, transforms={'ip': [['unquote']]}), 'ip is not a group field'),
+    (dict(PIPES, drop={'ip': 'x'}), 'ip is not a group field'),
+])
+def test_bad_specs(spec, error):
+    with pytest.raises(Exception, match=error):
+        compileSpec('pipes', spec)
+
+
+def test_passthrough():
+    translator = compileSpec('common', FORMAT_SPECS['syslog'])()
+    line = '2019-04-24 12:51:16 192.168.0.1 S= WARNING httpserver -- Failed web login\n'
+    assert translator.translateLine(line) == line
+
+
+@pytest.mark.parametrize('name', ['logs/usb_log.txt', 'logs/router_ui_export.txt', 'log1.log',
+                                  'logs/local_ui_support.log'])
+def test_buffered_translation_is_line_by_line(log, name):
+    # translateRange runs the BUFFER_REGEX of spec translators over pieces of the file
+    lf = LogFile(log(name))
+    lf.open()
+    translatorClass = lf._fileFormat
+    lf.close()
+    with open(log(name)) as fd:
+        expected = list(translateLines(fd, translatorClass()))
+    assert expected
+    assert list(translateRange(log(name), translatorClass(), 0, os.path.getsize(log(name)))) == expected
+
+
+def test_registered_formats_are_only_in_translators(tmp_path):
+    formatFile = tmp_path / 'formats.json'
+    formatFile.write_text(json.dumps({'pipes': PIPES}))
+    assert loadFormats(str(formatFile)) == ['pipes']
+    assert UniversalLogParser.TRANSLATORS['pipes'].SPEC == PIPES
+    assert UniversalLogParser.LOADED_FORMATS == [('pipes', PIPES)]
+    assert not hasattr(UniversalLogParser, 'PipesTranslator')
+
+
+def test_parse_a_loaded_format(tmp_path, run, options):
+    formatFile = tmp_path / 'formats.json'
+    formatFile.write_text(json.dumps({'events': EVENTS}))
+    loadFormats(str(formatFile))
+    logFile = tmp_path / 'events.log'
+    logFile.write_text('[24/04/2019 12:00:00] INFO WAN:abc: connecting -> connected\n'
+                       '[24/04/2019 12:00:01] INFO WAN:abc: signal X on port m: 90%, RSSI:-60(dBm), SINR:9.0(dB), '
+                       'RFBAND: Band 2\n'
+                       '[24/04/2019 12:00:09] INFO WAN:abc: Unplugged\n')
+    data = run(parsefile, str(logFile), options(log_format='events'))['data_events.log.csv'].decode()
+    assert '2019-04-24 12:00:00,abc,connected,' in data and '2019-04-24 12:00:09,abc,unplugged,' in data
+    assert "2019-04-24 12:00:01,abc,{'RSSI': (-60.0, 'Excellent')},{'SINR': (9.0," in data
@@ -0,0 +1,49 @@
+"""--jobs: a log parsed in pieces by a process pool gives the files a parse in one process does"""
+import os
+
+import pytest
+
+from UniversalLogParser import LogFile, parsefile
+
+
+@pytest.fixture
+def smallChunks(monkeypatch):
+    """Pieces of 4 KB instead of 4 MB, so the logs of the repository are split.  Holds the ranges of the last split"""
+    chunkRanges = LogFile.chunkRanges
+    split = []
+
+    def small(self, count, minSize=4096):
+        split[:] = chunkRanges(self, count, minSize)
+        return split
+    monkeypatch.setattr(LogFile, 'chunkRanges', small)
+    return split
+
+
+@pytest.mark.parametrize('name', ['log1.log', 'logs/sys_log.log', 'logs/router_ui_export.txt'])
+@pytest.mark.parametrize('changes', [{}, {'error_logging': True}, {'format': 'json', 'debug': True},
+                                     {'format': 'ndjson'}], ids=['csv', 'e', 'json-d', 'ndjson'])
+def test_jobs_parse_is_the_same(run, log, options, smallChunks, name, changes):
+    expected = run(parsefile, log(name), options(**changes), True)
+    parallel = run(parsefile, log(name), options(jobs=2, **changes), True)
+    assert len(smallChunks) > 4
+    assert sorted(parallel) == sorted(expected)
+    for fileName, contents in expected.items():
+        assert parallel[fileName] == contents, fileName
+
+
+def test_small_log_is_one_piece(log):
+    lf = LogFile(log('logs/sys_log.log'))
+    lf.open()
+    assert lf.chunkRanges(8) == [(0, os.path.getsize(log('logs/sys_log.log')))]
+    lf.close()
+
+
+def test_pieces_are_whole_lines(log):
+    lf = LogFile(log('log1.log'))
+    lf.open()
+    ranges = lf.chunkRanges(16, minSize=1000)
+    lf.close()
+    with open(log('log1.log'), 'rb') as fd:
+        data = fd.read()
+    assert len(ranges) == 16 and ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(a[1] == b[0] and data[b[0] - 1:b[0]] == b'\n' for a, b in zip(ranges, ranges[1:]))
@@ -0,0 +1,68 @@
+"""mergeLogs and --merge: several logs of an incident parsed as one timeline"""
+import pytest
+
+from UniversalLogParser import LogFile, mergeLogs, mergefiles, parsefile
+
+LINE = '2019-04-24 {} 192.168.0.1 S= INFO WAN:{} -- {}\n'
+
+
+@pytest.fixture
+def logs(tmp_path):
+    """Two common format logs of the same hour, one oldest first with a traceback, one newest first"""
+    router = tmp_path / 'router.log'
+    router.write_text(LINE.format('13:00:00', 'aaa', 'connecting -> connected') +
+                      LINE.format('13:00:10', 'aaa', 'connected -> disconnected') +
+                      'Traceback (most recent call last):\n  File "wan.py", line 1\n' +
+                      LINE.format('13:00:20', 'aaa', 'disconnected -> connecting') +
+                      LINE.format('13:00:30', 'aaa', 'Unplugged'))
+    ncm = tmp_path / 'ncm.log'
+    ncm.write_text(LINE.format('13:00:25', 'bbb', 'connecting -> connected') +
+                   LINE.format('13:00:20', 'bbb', 'disconnected -> connecting') +
+                   LINE.format('13:00:05', 'bbb', 'connected -> disconnected'))
+    return [str(router), str(ncm)]
+
+
+def mergedLines(fileNames):
+    opened = [LogFile(fileName) for fileName in fileNames]
+    for lf in opened:
+        lf.open()
+    lines = list(mergeLogs(opened, ['r', 'n']))
+    for lf in opened:
+        lf.close()
+    return lines
+
+
+def test_lines_are_merged_by_time(logs):
+    lines = mergedLines(logs)
+    assert len(lines) == 9
+    dated = [line for line in lines if '0' < line[0] < '9']
+    stamps = [line[:19] for line in dated]
+    assert stamps == sorted(stamps)
+    # Tagged after the timestamp, the newest first log was turned around
+    assert [line[20:23] for line in dated] == ['[r]', '[n]', '[r]', '[r]', '[n]', '[n]', '[r]']
+    # The traceback stays after its line, the same second keeps the order of the logs
+    assert lines[3].startswith('Traceback') and lines[4].startswith('  File')
+    assert lines[5].startswith('2019-04-24 13:00:20 [r]') and lines[6].startswith('2019-04-24 13:00:20 [n]')
+
+
+def test_last_line_without_newline(logs):
+    with open(logs[0], 'a') as fd:
+        fd.write(LINE.format('13:00:40', 'aaa', 'Plug event: ok').rstrip('\n'))
+    lines = mergedLines(logs)
+    assert all(line.endswith('\n') for line in lines)
+    assert lines[-1].startswith('2019-04-24 13:00:40 [r]')
+
+
+def test_merge_writes_the_events_of_every_log(run, options, logs):
+    files = run(mergefiles, logs, options(format='csv'), True)
+    assert sorted(files) == ['common_merged', 'concise_merged', 'data_merged.csv']
+    data = files['data_merged.csv'].decode()
+    for uid, state in [('aaa', 'unplugged'), ('aaa', 'connecting'), ('bbb', 'connected'), ('bbb', 'disconnected')]:
+        assert ',{},{},'.format(uid, state) in data
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'json', 'ndjson'])
+def test_merging_one_log_is_parsing_it(run, log, options, fmt):
+    merged = run(mergefiles, [log('logs/sys_log.log')], options(format=fmt))
+    parsed = run(parsefile, log('logs/sys_log.log'), options(format=fmt))
+    assert merged['data_merged.' + fmt] == parsed['data_sys_log.log.' + fmt]
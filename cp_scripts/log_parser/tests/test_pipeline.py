@@ -0,0 +1,38 @@
+"""--pipeline: a log translated by another process while it is parsed gives the files a plain parse does"""
+import os
+import shutil
+
+import pytest
+
+from UniversalLogParser import LogFile, parsefile, pipelineLines
+
+
+@pytest.mark.parametrize('name', ['log1.log', 'logs/sys_log.log', 'logs/usb_log.txt', 'logs/local_ui_support.log'])
+@pytest.mark.parametrize('changes', [{}, {'error_logging': True}, {'format': 'json', 'debug': True}],
+                         ids=['csv', 'e', 'json-d'])
+def test_pipeline_parse_is_the_same(run, log, options, name, changes):
+    expected = run(parsefile, log(name), options(**changes), True)
+    piped = run(parsefile, log(name), options(pipeline=True, **changes), True)
+    assert sorted(piped) == sorted(expected)
+    for fileName, contents in expected.items():
+        assert piped[fileName] == contents, fileName
+
+
+def test_lines_are_those_of_the_log(log):
+    lf = LogFile(log('logs/router_ui_export.txt'))
+    lf.open()
+    expected = list(lf)
+    lf.reset()
+    assert list(pipelineLines(lf, batchSize=7, depth=2)) == expected
+    lf.close()
+
+
+def test_translating_error_is_raised(tmp_path, log):
+    name = str(tmp_path / 'gone.log')
+    shutil.copy(log('logs/sys_log.log'), name)
+    lf = LogFile(name)
+    lf.open()
+    os.remove(name)  # Still open here, but the translating process can't open it
+    with pytest.raises(FileNotFoundError):
+        list(pipelineLines(lf))
+    lf.close()
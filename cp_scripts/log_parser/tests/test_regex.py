@@ -0,0 +1,66 @@
+"""requiredLiteral and RegexRules, the concise file rules of --regex, --regex-file and -e"""
+import re
+
+import pytest
+
+from UniversalLogParser import RegexRules, loadRegexFile, parsefile, requiredLiteral
+
+
+@pytest.mark.parametrize('pattern, literal', [
+    ('Failed web login', 'Failed web login'),
+    (r'Received DHCP offer from 10\.\d+', 'Received DHCP offer from 10.'),
+    (r'Unplug(ged)? by user', ' by user'),
+    (r'modem[0-9]+ reset', ' reset'),
+    (r'Link is (up|down)', 'Link is '),
+    (r'colou?r change', 'r change'),
+    (r'hard reset|USB disconnect', ''),
+    (r'\d{3}\.\d+\.0\.1\b', '.0.1'),
+    (r'ab\d+', ''),
+    # The digits, hex digits and names of escapes are not plain text
+    (r'\x41BCDEF', 'BCDEF'),
+    (r'\101XYZ', 'XYZ'),
+    (r'\0CDEFG', 'CDEFG'),
+    (r'(sta)tus: \1', 'tus: '),
+    (r'\u0041BCDE', 'BCDE'),
+    (r'\U00000041BCDE', 'BCDE'),
+    (r'\N{LATIN CAPITAL LETTER A}BCDE', 'BCDE'),
+    (r'[]x]yz and more', 'yz and more'),
+])
+def test_required_literal(pattern, literal):
+    assert requiredLiteral(pattern) == literal
+
+
+RULES = [('plain', 'Failed web login'), ('literal', r'Received DHCP offer from 10\.\d+'),
+         ('optional', r'Unplug(ged)? by user'), ('alternation', r'hard reset|USB disconnect'),
+         ('none', r'\d{3}\.\d+\.0\.1\b'), ('ignorecase', r'(?i)modem RESET'), ('hex', r'\x41BCDEF'),
+         ('octal', r'\101XYZ'), ('backref', r'(sta)tus: \1'), ('named', r'\N{LATIN CAPITAL LETTER A}BCDE'),
+         ('zero', r'\0CDEFG')]
+LINES = ['Failed web login from 10.0.0.2', 'Received DHCP offer from 10.1.2.3', 'Received DHCP offer from 11.1.2.3',
+         'Unplugged by user', 'Unplug by user', 'Unplu by user', 'hard reset', 'USB disconnect on port 2',
+         'ping 192.168.0.1 failed', 'Modem Reset', 'ABCDEF', '41BCDEF', 'AXYZ', '01XYZ', 'status: sta', 'ABCDE',
+         '\0CDEFG', 'CDEFG', 'nothing to see']
+
+
+def test_rules_match_like_searching_in_order():
+    rules = RegexRules(RULES)
+    for line in LINES:
+        expected = next((name for name, pattern in RULES if re.search(pattern, line)), None)
+        assert rules.match(line) == expected, line
+
+
+def test_bad_pattern_raises():
+    with pytest.raises(re.error):
+        RegexRules([('bad', 'unclosed (group')])
+
+
+def test_regex_file(tmp_path):
+    regexFile = tmp_path / 'rules.txt'
+    regexFile.write_text('# comment\n\nlogin\tFailed web login\nDHCP offer\n')
+    assert loadRegexFile(str(regexFile)) == [('login', 'Failed web login'), ('rules.txt:4', 'DHCP offer')]
+
+
+def test_concise_lines_name_the_rule(run, log, options):
+    files = run(parsefile, log('logs/sys_log.log'), options(extra_regex=[('dhcp', 'DHCP')]))
+    concise = files['concise_sys_log.log'].decode().splitlines()
+    tagged = [line for line in concise if '[dhcp]' in line]
+    assert tagged and all('DHCP' in line for line in tagged)
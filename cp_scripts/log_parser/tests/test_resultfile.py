@@ -0,0 +1,55 @@
+"""ResultFile: a parse saved with -o bin and rendered again with --load gives the data file the parse gives"""
+import pytest
+
+from UniversalLogParser import ResultFile, loadfile, parsefile
+
+NR_LINES = [
+    '2021-03-02 10:00:{:02} 192.168.0.1 S= INFO WAN:5g0 -- signal MC400LP6 (SIM1) on port modem1: 90%, RSSI:-51(dBm), '
+    'SINR:{}.5(dB), RSRP:-80(dB), RSRQ:-9(dB), RFBAND: Band 66, SS-RSRP:-88(dBm), SS-SINR:21.0(dB), '
+    'SS-RSRQ:-11(dB), NRBAND: n71\n',
+    '2021-03-02 10:00:{:02} 192.168.0.1 S= INFO WAN:5g0 -- signal MC400LP6 (SIM1) on port modem1: 80%, RSSI:-61(dBm), '
+    'SINR:{}.0(dB), RSRP:-95(dB), RSRQ:-12(dB), RFBAND: Band 2\n',
+    '2021-03-02 10:00:{:02} 192.168.0.1 S= INFO WAN:5g0 -- connecting -> connected\n',
+]
+
+
+@pytest.fixture
+def nrLog(tmp_path):
+    """A common format log with 5G NR signal values"""
+    path = tmp_path / 'nr.log'
+    path.write_text(''.join(NR_LINES[i % 3].format(i, i % 20) for i in range(60)))
+    return str(path)
+
+
+@pytest.fixture(params=['log1.log', 'logs/sys_log.log', 'nr.log'])
+def logFile(request, log, nrLog):
+    """An NCM log, a common format one, and one with 5G NR signal values"""
+    return nrLog if request.param == 'nr.log' else log(request.param)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'json', 'ndjson', 'dict'])
+def test_load_renders_like_the_parse(tmp_path, run, options, logFile, fmt):
+    name = logFile.split('/')[-1]
+    saved = run(parsefile, logFile, options(format='bin'))
+    resultName = tmp_path / ('data_{}.bin'.format(name))
+    resultName.write_bytes(saved['data_{}.bin'.format(name)])
+    loaded = run(loadfile, str(resultName), options(format=fmt))
+    parsed = run(parsefile, logFile, options(format=fmt))
+    assert loaded['data_{}.{}'.format(name, fmt)] == parsed['data_{}.{}'.format(name, fmt)]
+
+
+def test_nr_values_are_kept(tmp_path, run, options, nrLog):
+    saved = run(parsefile, nrLog, options(format='bin'))
+    resultName = tmp_path / 'data_nr.log.bin'
+    resultName.write_bytes(saved['data_nr.log.bin'])
+    loaded = run(loadfile, str(resultName), options(format='ndjson'))['data_nr.log.ndjson'].decode()
+    assert '"SS-RSRP": -88.0' in loaded and '"NRBAND": " n71"' in loaded
+
+
+def test_not_a_result_file(tmp_path, options):
+    path = tmp_path / 'data_x.bin'
+    path.write_bytes(b'not a result file at all')
+    with pytest.raises(Exception, match='not a result file'):
+        ResultFile(str(path))
+    with pytest.raises(Exception, match='already a result file'):
+        loadfile(str(path), options(format='bin'))